@@ -0,0 +1,126 @@
+"Track the cold-start import time of compile_results.py"
+
+import csv
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+app = typer.Typer()
+
+COMPILE_SCRIPT = Path(__file__).resolve().parent / "compile_results.py"
+DEFAULT_RECORD = "startup_times.csv"
+# Modules that should only be imported when they are needed
+HEAVY_MODULES = ["altair", "powergenome", "yaml"]
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|( +)(\S+)")
+
+
+def parse_import_times(stderr):
+    """Cumulative import time (in seconds) of every module from `python -X importtime`.
+
+    Returns a dictionary of module name: seconds and the total time of top-level
+    imports.
+    """
+    module_times = {}
+    total = 0.0
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match is None:
+            continue
+        seconds = int(match.group(1)) / 1e6
+        module_times[match.group(3)] = seconds
+        # Top-level imports have a single space before the module name
+        if len(match.group(2)) == 1:
+            total += seconds
+
+    return module_times, total
+
+
+def time_command(args, cwd=None, repeat=3):
+    """Run compile_results.py with `args` in a new interpreter `repeat` times.
+
+    Returns a list of (wall time, total import time, module import times) for
+    each run.
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", str(COMPILE_SCRIPT), *args],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+        )
+        wall_time = time.perf_counter() - start
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"compile_results.py {' '.join(args)} failed:\n{result.stderr[-2000:]}"
+            )
+        module_times, import_time = parse_import_times(result.stderr)
+        runs.append((wall_time, import_time, module_times))
+
+    return runs
+
+
+def summarize(name, runs, top=10):
+    "Print the median times and slowest imports, and return a record for the csv"
+    wall_time = statistics.median(r[0] for r in runs)
+    import_time = statistics.median(r[1] for r in runs)
+    module_times = runs[-1][2]
+    heavy = [m for m in HEAVY_MODULES if m in module_times]
+
+    print(f"{name}: {wall_time:.2f} s total, {import_time:.2f} s importing modules")
+    if heavy:
+        print(f"  Heavy modules imported: {', '.join(heavy)}")
+    top_modules = sorted(
+        (m for m in module_times if "." not in m),
+        key=module_times.get,
+        reverse=True,
+    )[:top]
+    for module in top_modules:
+        print(f"  {module_times[module]:6.3f} s  {module}")
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "benchmark": name,
+        "wall_time_s": round(wall_time, 3),
+        "import_time_s": round(import_time, 3),
+        "heavy_modules": " ".join(heavy),
+    }
+
+
+@app.command()
+def main(
+    study_folder: Optional[Path] = None,
+    repeat: int = 3,
+    top: int = 10,
+    record: Path = Path(DEFAULT_RECORD),
+):
+    """Time `compile_results.py --help` and (with a study folder) an Excel-only compile.
+
+    Every run starts a new Python interpreter. Results are appended to `record` so
+    that changes in startup time can be tracked. The Excel-only compile writes its
+    usual output files to the study folder.
+    """
+    records = [summarize("--help", time_command(["--help"], repeat=repeat), top)]
+    if study_folder is not None:
+        runs = time_command(["--no-figures"], cwd=study_folder, repeat=repeat)
+        records.append(summarize("excel only", runs, top))
+
+    write_header = not record.exists()
+    with open(record, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(records[0]))
+        if write_header:
+            writer.writeheader()
+        writer.writerows(records)
+
+
+if __name__ == "__main__":
+    app()
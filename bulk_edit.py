@@ -0,0 +1,343 @@
+"Create sensitivity cases by applying a YAML file of edits to the inputs of base cases"
+
+import fnmatch
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import typer
+
+from case_registry import parse_case_name
+from input_store import read_input_csv
+
+app = typer.Typer()
+
+EDIT_WORKERS = 4
+DEFAULT_NAME = "{case_id}_{year}_{description}_{variant}"
+# Folders in a base case that are not copied to new cases
+SKIP_FOLDERS = ["Results"]
+# Unedited files in this folder with these suffixes are linked to the base case.
+# Other files (e.g. Run.sh and GenX_settings.yml) are copied, since scripts such as
+# create_run_files rewrite them in place.
+LINK_FOLDER = "Inputs"
+LINK_SUFFIXES = [".csv"]
+OPERATIONS = ["scale", "add", "set"]
+
+
+def load_edit_config(path):
+    """Read base cases, variants and their edits from a YAML file.
+
+    `bases` is a list of base case folders (glob patterns are allowed) relative
+    to the folder of the YAML file. Each entry under `variants` is a list of edits
+    or a mapping with `edits` and an optional `id` (see `variant_id`). Edits under
+    the top-level `edits` are applied to every variant before the variant's own
+    edits.
+    """
+    import yaml
+
+    path = Path(path)
+    config = yaml.safe_load(path.read_text()) or {}
+    root = path.resolve().parent
+
+    bases = []
+    for pattern in config.get("bases") or []:
+        matches = sorted(f for f in root.glob(pattern) if f.is_dir())
+        if not matches:
+            raise ValueError(f"No base case folders match {pattern} in {path}")
+        bases.extend(matches)
+    if not bases:
+        raise ValueError(f"{path} does not have any base cases")
+
+    common_edits = config.get("edits") or []
+    variants = {}
+    variant_ids = {}
+    for name, variant in (config.get("variants") or {}).items():
+        if isinstance(variant, dict):
+            if "id" in variant:
+                variant_ids[name] = str(variant["id"])
+            variant = variant.get("edits") or []
+        variants[name] = [check_edit(e, path) for e in common_edits + variant]
+    if not variants:
+        raise ValueError(f"{path} does not have any variants")
+
+    return {
+        "bases": bases,
+        "variants": variants,
+        "variant_ids": variant_ids,
+        "output": root / config.get("output", "."),
+        "name": config.get("name", DEFAULT_NAME),
+    }
+
+
+def check_edit(edit, path=None):
+    "Make sure an edit has a file, columns and exactly one operation"
+    operations = [op for op in OPERATIONS if op in edit]
+    if "file" not in edit or "columns" not in edit or len(operations) != 1:
+        raise ValueError(
+            f"Edits need a file, columns, and one of {OPERATIONS} "
+            f"({edit} in {path})"
+        )
+
+    return edit
+
+
+def variant_id(variant, variant_ids=None):
+    """Text added to the case id of a base case for a variant.
+
+    It is the variant's configured `id`, or the variant name without
+    underscores or other characters that can't be in a case id.
+    """
+    variant_ids = variant_ids or {}
+    if variant in variant_ids:
+        return variant_ids[variant]
+
+    return re.sub(r"[^0-9A-Za-z]", "", variant)
+
+
+def case_name(template, base_folder, variant, variant_ids=None):
+    """Folder name of a new case.
+
+    Fields of the template are folder, base_case_id, case_id (the base case id
+    followed by the variant id), year, description and variant.
+    """
+    base_case_id, year, description = parse_case_name(base_folder.name)
+
+    return template.format(
+        folder=base_folder.name,
+        base_case_id=base_case_id,
+        case_id=f"{base_case_id}{variant_id(variant, variant_ids)}",
+        year=year,
+        description=description.replace(" ", "_").replace("w/", "with"),
+        variant=variant,
+    )
+
+
+def match_columns(df, columns, file_name):
+    "Columns of `df` that match a name or glob pattern (e.g. Load_MW_z*)"
+    if isinstance(columns, str):
+        columns = [columns]
+    matched = []
+    for pattern in columns:
+        cols = fnmatch.filter(df.columns, pattern)
+        if not cols:
+            raise ValueError(f"No columns in {file_name} match {pattern}")
+        matched.extend(c for c in cols if c not in matched)
+
+    return matched
+
+
+def row_mask(df, where, file_name):
+    """Boolean array of the rows selected by `where`.
+
+    `where` maps column names to values. String values select rows that contain
+    the string (the same as the resource name maps in compile_results), lists
+    select rows equal to any of the values, and other values select equal rows.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for col, value in (where or {}).items():
+        if col not in df.columns:
+            raise ValueError(f"{file_name} does not have a column {col}")
+        if isinstance(value, str):
+            mask &= df[col].astype(str).str.contains(value).to_numpy()
+        elif isinstance(value, list):
+            mask &= df[col].isin(value).to_numpy()
+        else:
+            mask &= (df[col] == value).to_numpy()
+
+    return mask
+
+
+def set_rows(df, mask, col, values):
+    """Set the values of the selected rows of a column.
+
+    Integer columns stay integers if the new values are whole numbers. Otherwise
+    the column becomes an object column so that the other rows keep their
+    integer values when written.
+    """
+    if pd.api.types.is_integer_dtype(df[col].dtype):
+        if pd.api.types.is_numeric_dtype(values) and (values % 1 == 0).all():
+            values = values.astype(df[col].dtype)
+        else:
+            df[col] = df[col].astype(object)
+    df.loc[mask, col] = values
+
+
+def apply_edits(df, edits, file_name):
+    """Return a copy of `df` with every edit applied.
+
+    Each edit scales, adds to, or sets the values of the matched columns in the
+    selected rows. Other rows are not changed. Rows with missing values are left
+    missing. Scaled and added values are rounded to `round` decimals (default 6).
+    """
+    df = df.copy()
+    for edit in edits:
+        cols = match_columns(df, edit["columns"], file_name)
+        mask = row_mask(df, edit.get("where"), file_name)
+        if "set" in edit:
+            values = pd.DataFrame(edit["set"], index=df.index[mask], columns=cols)
+        else:
+            values = df.loc[mask, cols].astype(float)
+            if "scale" in edit:
+                values = values * edit["scale"]
+            else:
+                values = values + edit["add"]
+            values = values.round(edit.get("round", 6))
+        for col in cols:
+            set_rows(df, mask, col, values[col])
+
+    return df
+
+
+def link_or_copy(source, dest):
+    "Hard link `dest` to `source`, or copy it if the link can't be made"
+    try:
+        os.link(source, dest)
+    except OSError:
+        shutil.copy2(source, dest)
+
+
+def write_csv(df, path):
+    # Remove any existing file (which may be a hard link to another case's input)
+    # so that the new data doesn't change other cases.
+    if path.exists() or path.is_symlink():
+        path.unlink()
+    df.to_csv(path, index=False)
+
+
+def is_linked(rel_path):
+    "True if an unedited file (relative to the case folder) is linked, not copied"
+    rel_path = Path(rel_path)
+
+    return rel_path.parts[0] == LINK_FOLDER and rel_path.suffix in LINK_SUFFIXES
+
+
+def plan_case(base_folder, dest_folder, edits):
+    """List the files of a new case.
+
+    Returns a list of (source, destination, edits, link) where edits are the
+    edits for that file and link is True for unedited files that are linked to
+    the base case (see `is_linked`).
+    """
+    file_edits = {}
+    for edit in edits:
+        file_edits.setdefault(Path(edit["file"]).as_posix(), []).append(edit)
+
+    base_files = {
+        path.relative_to(base_folder).as_posix(): path
+        for path in sorted(base_folder.rglob("*"))
+        if path.is_file() and path.relative_to(base_folder).parts[0] not in SKIP_FOLDERS
+    }
+    missing = set(file_edits) - set(base_files)
+    if missing:
+        raise ValueError(f"Edited files {sorted(missing)} are not in {base_folder}")
+
+    tasks = []
+    for rel_path, source in base_files.items():
+        edits = file_edits.get(rel_path, [])
+        link = not edits and is_linked(rel_path)
+        tasks.append((source, dest_folder / rel_path, edits, link))
+
+    return tasks
+
+
+def check_case_ids(bases, dest_folders):
+    """Make sure every new case has an id and year that no other case uses.
+
+    Cases are looked up by id and year (see `case_registry`), so a new case that
+    shares them with a base case, another new case, or another folder where the
+    cases are written would be mistaken for that case.
+    """
+    others = list(bases)
+    for folder in sorted({dest.parent for dest in dest_folders}):
+        if folder.is_dir():
+            others.extend(f for f in sorted(folder.iterdir()) if f.is_dir())
+    used = {}
+    for other in others:
+        if other not in dest_folders:
+            used.setdefault(parse_case_name(other.name)[:2], other)
+    for dest in dest_folders:
+        case_id, year = parse_case_name(dest.name)[:2]
+        if year is None:
+            raise ValueError(
+                f"New case {dest.name} isn't named <case_id>_<year>_<description>"
+            )
+        if (case_id, year) in used:
+            raise ValueError(
+                f"New case {dest.name} has the same case id and year as "
+                f"{used[(case_id, year)]}, use a different name or variant id"
+            )
+        used[(case_id, year)] = dest
+
+
+def create_cases(config, overwrite=False, workers=EDIT_WORKERS):
+    """Create a case for every base case and variant in the config.
+
+    Base files are parsed once (see `input_store.read_input_csv`), edited files
+    are written in `workers` threads, other input csv files are hard linked to
+    the base case, and the remaining files are copied. Existing cases are skipped
+    unless `overwrite` is True. Raises a ValueError before writing anything if a
+    new case would have the same case id and year as another case. Returns a
+    list of the new case folders.
+    """
+    case_folders = {}
+    for base_folder in config["bases"]:
+        for variant in config["variants"]:
+            name = case_name(
+                config["name"], base_folder, variant, config.get("variant_ids")
+            )
+            case_folders[(base_folder, variant)] = config["output"] / name
+    check_case_ids(config["bases"], list(case_folders.values()))
+
+    tasks = []
+    new_cases = []
+    for (base_folder, variant), dest_folder in case_folders.items():
+        if dest_folder.exists() and not overwrite:
+            print(f"{dest_folder.name} already exists, skipping it")
+            continue
+        new_cases.append(dest_folder)
+        tasks.extend(plan_case(base_folder, dest_folder, config["variants"][variant]))
+
+    for folder in {dest.parent for _, dest, _, _ in tasks}:
+        folder.mkdir(parents=True, exist_ok=True)
+
+    def write_file(task):
+        source, dest, edits, link = task
+        if edits:
+            df = apply_edits(read_input_csv(source), edits, source.name)
+            write_csv(df, dest)
+        else:
+            if dest.exists() or dest.is_symlink():
+                dest.unlink()
+            if link:
+                link_or_copy(source, dest)
+            else:
+                shutil.copy2(source, dest)
+
+    if workers < 2:
+        for task in tasks:
+            write_file(task)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(write_file, tasks))
+
+    return new_cases
+
+
+@app.command()
+def main(config_path: Path, overwrite: bool = False, workers: int = EDIT_WORKERS):
+    """Create sensitivity cases from the base cases and edits in a YAML file.
+
+    See sensitivity_edits.yml for an example.
+    """
+    config = load_edit_config(config_path)
+    new_cases = create_cases(config, overwrite=overwrite, workers=workers)
+    for folder in new_cases:
+        print(f"Created {folder}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,149 @@
+"Parse case folder names once and index the cases by id, year and description"
+
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import pandas as pd
+
+
+class CaseInfo(NamedTuple):
+    case_id: str
+    year: Optional[int]
+    description: str
+    folder: Path
+
+    @property
+    def inputs_folder(self):
+        return self.folder / "Inputs"
+
+    @property
+    def results_folder(self):
+        return self.folder / "Results"
+
+
+def parse_case_name(name):
+    """Split a folder name of the form <case_id>_<year>_<description>.
+
+    Returns a tuple of (case_id, year, description). The description has
+    underscores replaced by spaces and "with" replaced by "w/", which is the case
+    name used in figures and Excel files. The year is None if the second part of
+    the name isn't an integer.
+    """
+    parts = name.split("_")
+    case_id = parts[0]
+    try:
+        year = int(parts[1])
+    except (IndexError, ValueError):
+        year = None
+    description = " ".join(parts[2:]).replace("with", "w/").strip()
+
+    return case_id, year, description
+
+
+def clean_case_name(name):
+    return parse_case_name(name)[2]
+
+
+class CaseRegistry:
+    "Typed table of cases with constant time lookups by id, year and description"
+
+    def __init__(self, folders):
+        self.cases = []
+        for folder in sorted(Path(f) for f in folders):
+            case_id, year, description = parse_case_name(folder.name)
+            self.cases.append(CaseInfo(case_id, year, description, folder))
+
+        self._by_id = {}
+        self._by_year = {}
+        self._by_description = {}
+        self._by_id_year = {}
+        for case in self.cases:
+            self._by_id.setdefault(case.case_id, []).append(case)
+            self._by_year.setdefault(case.year, []).append(case)
+            self._by_description.setdefault(case.description, []).append(case)
+            self._by_id_year.setdefault((case.case_id, case.year), []).append(case)
+
+    @classmethod
+    def from_results(cls, path):
+        "Cases are all of the folders under `path` that contain a Results folder"
+        return cls(f.parent for f in Path(path).rglob("Results"))
+
+    def __iter__(self):
+        return iter(self.cases)
+
+    def __len__(self):
+        return len(self.cases)
+
+    def __getitem__(self, idx):
+        return self.cases[idx]
+
+    @property
+    def table(self):
+        table = pd.DataFrame(
+            {
+                "case_id": pd.Categorical([c.case_id for c in self.cases]),
+                "year": pd.array([c.year for c in self.cases], dtype="Int64"),
+                "description": pd.Categorical([c.description for c in self.cases]),
+                "folder": [c.folder for c in self.cases],
+            }
+        )
+
+        return table
+
+    @property
+    def case_ids(self):
+        return list(self._by_id)
+
+    @property
+    def descriptions(self):
+        return [case.description for case in self.cases]
+
+    def by_id(self, case_id):
+        return self._by_id.get(case_id, [])
+
+    def by_year(self, year):
+        return self._by_year.get(year, [])
+
+    def by_description(self, description):
+        return self._by_description.get(description, [])
+
+    def get(self, case_id, year=None):
+        """Return the single case matching `case_id` (and `year`), or None.
+
+        Raises a ValueError if more than one case matches.
+        """
+        if year is not None:
+            matches = self._by_id_year.get((case_id, year), [])
+            if len(matches) > 1:
+                folders = ", ".join(str(case.folder) for case in matches)
+                raise ValueError(
+                    f"Case id {case_id} is used by more than one {year} case: {folders}"
+                )
+            return matches[0] if matches else None
+        matches = self.by_id(case_id)
+        if len(matches) > 1:
+            raise ValueError(
+                f"Case id {case_id} is used in multiple years, specify the year."
+            )
+
+        return matches[0] if matches else None
+
+
+@lru_cache()
+def _cached_registry(path):
+    return CaseRegistry.from_results(path)
+
+
+def find_cases(year, root=None):
+    """Registry of all cases with a Results folder under <root>/<year>.
+
+    Folders are only searched the first time a year is requested. Call
+    `find_cases.cache_clear()` if case folders are added or renamed afterwards.
+    """
+    root = Path.cwd() if root is None else Path(root)
+
+    return _cached_registry((root / f"{year}").resolve())
+
+
+find_cases.cache_clear = _cached_registry.cache_clear
@@ -2,13 +2,43 @@
 
 import os
 from pathlib import Path
+from typing import Optional
+
+import numpy as np
 import pandas as pd
 import typer
 
-import altair as alt
-
-from powergenome.nrelatb import investment_cost_calculator
-from zone_trade_attribute_costs import calc_all_costs
+from case_registry import find_cases
+from figure_batch import (
+    DEFAULT_FIGURE_CONFIG,
+    FIGURE_WORKERS,
+    YEARLY_FIGURES,
+    build_work_plan,
+    load_figure_config,
+    run_work_plan,
+)
+from figure_data import FIGURE_CACHE_DIR, FigureCache, FigureData, make_data_tidy
+import input_store
+from input_store import read_input_csv
+from investment_costs import (
+    SPUR_LINE_COLUMNS,
+    calc_spur_line_costs,
+    combine_spur_line_data,
+    read_spur_line_data,
+    summarize_spur_line_data,
+)
+from network_topology import case_topology, check_topologies
+import prefetch
+from prefetch import read_case_csv, read_case_files
+import progress
+from progress import Progress
+from results_store import (
+    connect,
+    write_results_store,
+    write_year,
+    year_fingerprints,
+)
+from time_weights import hour_weights, weighted_sum
 
 app = typer.Typer()
 
@@ -41,33 +71,6 @@ ZONE_MAP = {
     6: "WECC_NW",
     7: "WECC_SNV",
 }
-POLICY_ORDER = [
-    "No Policy",
-    "Emissions Cap w/ RPS",
-    "WRA CES w/ RPS",
-    "Tech CES w/ RPS",
-    "RPS only",
-    "Emissions Cap",
-    "WRA CES",
-    "Tech CES",
-]
-SENSITIVITY_ORDER = [
-    "No Policy",
-    "WRA CES",
-    "WRA CES w/ RPS",
-    "Coal Phaseout",
-    "Coal Phaseout No New Gas",
-    "No New Gas",
-    "Slower AZ load growth",
-    "Half WECC load growth",
-    "Limits transmission",
-    "High EV penetration",
-    "Low cost nuclear",
-    "Low gas prices",
-    "Low cost CCS",
-    "High cost CCS",
-    "Low cost renewables",
-]
 RESOURCE_ORDER = [
     "Coal",
     "NGCC",
@@ -82,285 +85,341 @@ RESOURCE_ORDER = [
     "Onshore Wind",
     "Offshore Wind",
 ][::-1]
-RESOURCE_COLOR_SCALE = alt.Scale(
-    domain=RESOURCE_ORDER,
-    range=[
-        "#8c564b",  # coal
-        "#bcbd22",  # NGCC
-        "#dbdb8d",  # NGCT
-        "#9467bd",  # other renewables
-        "#7f7f7f",  # Nuclear
-        "#c7c7c7",  # CCS
-        "#1f77b4",  # hydro
-        "#aec7e8",  # pumped hydro
-        "#c5b0d5",  # battery
-        "#d62728",  # solar
-        "#17becf",  # onshore wind
-        "#9edae5",  # offshore wind
-    ][::-1],
-)
-RESOURCE_COLORS = alt.Color("Resource Name", scale=RESOURCE_COLOR_SCALE)
+RESOURCE_COLOR_RANGE = [
+    "#8c564b",  # coal
+    "#bcbd22",  # NGCC
+    "#dbdb8d",  # NGCT
+    "#9467bd",  # other renewables
+    "#7f7f7f",  # Nuclear
+    "#c7c7c7",  # CCS
+    "#1f77b4",  # hydro
+    "#aec7e8",  # pumped hydro
+    "#c5b0d5",  # battery
+    "#d62728",  # solar
+    "#17becf",  # onshore wind
+    "#9edae5",  # offshore wind
+][::-1]
 RESOURCE_ORDER_DICT = {
     resource: idx for idx, resource in enumerate(RESOURCE_ORDER[::-1])
 }
+CAPACITY_CATEGORIES = {
+    "EndCap": "Final Capacity",
+    "StartCap": "Start Capacity",
+    "RetCap": "Retired Capacity",
+    "NewCap": "New Capacity",
+    "EndEnergyCap": "Final Energy Capacity",
+    "EndChargeCap": "Final Charge Capacity",
+    "StartEnergyCap": "Start Energy Capacity",
+    "RetEnergyCap": "Retired Energy Capacity",
+    "NewEnergyCap": "New Energy Capacity",
+    "StartChargeCap": "Start Charge Capacity",
+    "RetChargeCap": "Retired Charge Capacity",
+    "NewChargeCap": "New Charge Capacity",
+}
+# Shared categorical dtypes for the keys of results. Categories are sorted so that
+# grouped results are in the same order as they would be with string keys.
+REGION_DTYPE = pd.CategoricalDtype(sorted(set(ZONE_MAP.values())))
+RESOURCE_NAME_DTYPE = pd.CategoricalDtype(
+    sorted(set(RESOURCE_MAP.values()) | set(RESOURCE_ORDER))
+)
+
+
+def resource_colors():
+    "Altair color encoding for resource names"
+    import altair as alt
+
+    scale = alt.Scale(domain=RESOURCE_ORDER, range=RESOURCE_COLOR_RANGE)
+
+    return alt.Color("Resource Name", scale=scale)
 
 
 def find_years():
     years = [
-        int(f.name)
-        for f in os.scandir(Path.cwd())
-        if f.is_dir() and "__" not in f.name and "." not in f.name
+        int(f.name) for f in os.scandir(Path.cwd()) if f.is_dir() and f.name.isdigit()
     ]
     years = sorted(years)
 
     return years
 
 
-def make_data_tidy(df, value_name, id_vars=["Resource Name"]):
-    tidy = df.reset_index().melt(
-        id_vars=id_vars, var_name="Case", value_name=value_name
-    )
-    return tidy
+def clean_tx_line_name(line_series):
+    clean_names = line_series.str.replace("_to_", " to ")
 
+    return clean_names
 
-def clean_case_name(name):
-    clean_name = " ".join(name.split("_")[2:]).replace("with", "w/").strip()
 
-    return clean_name
+def map_resource_name(df):
+    # Match each unique resource once and map the names back to every row
+    resources = pd.Series(df["Resource"].unique()).astype(str)
+    names = pd.Series(None, index=resources.values, dtype=object)
+    for key, value in RESOURCE_MAP.items():
+        names[resources.str.contains(key).values] = value
+    df["Resource Name"] = df["Resource"].astype(str).map(names)
 
+    return df
 
-def clean_tx_line_name(line_series):
-    clean_names = line_series.str.replace("_to_", " to ")
 
-    return clean_names
+def case_dtype(cases):
+    "Categorical dtype with the descriptions of `cases` as categories"
+    return pd.CategoricalDtype(sorted(set(cases.descriptions)))
 
 
-def find_results_folders(year):
-    cwd = Path.cwd()
+def set_key_dtypes(df, case_dtype=None):
+    """Convert Region, Resource Name and Case columns to the shared categorical dtypes.
 
-    results_folders = list((cwd / f"{year}").rglob("Results"))
-    results_folders.sort()
+    Frames from different cases keep their categorical keys when they are
+    concatenated because the dtypes (and categories) are the same. Group by
+    categorical keys with `observed=True` so that only keys in the data are used,
+    and sort the results because older versions of pandas return observed groups
+    in the order they appear.
+    """
+    key_dtypes = {"Region": REGION_DTYPE, "Resource Name": RESOURCE_NAME_DTYPE}
+    if case_dtype is not None:
+        key_dtypes["Case"] = case_dtype
 
-    return results_folders
+    return df.astype({col: dtype for col, dtype in key_dtypes.items() if col in df})
 
 
-def map_resource_name(df):
-    df["Resource Name"] = None
-    for key, value in RESOURCE_MAP.items():
-        df.loc[df["Resource"].str.contains(key), "Resource Name"] = value
+def summarize_capacity(case, capacity_df):
+    "Capacity results of a case with Case, R_ID and Region columns"
+    capacity_df["Case"] = case.description
+    capacity_df["R_ID"] = capacity_df.index + 1
+    capacity_df["Region"] = capacity_df["Zone"].map(ZONE_MAP).astype(REGION_DTYPE)
+    capacity_df = capacity_df.drop(columns=["Zone"]).rename(columns=CAPACITY_CATEGORIES)
 
-    return df
+    return capacity_df
 
 
-def get_resource_capacity(year):
-    results_folders = find_results_folders(year)
-    col_order = [clean_case_name(folder.parent.stem) for folder in results_folders]
+def combine_capacity(capacity_list, cases):
+    "Concatenate capacity results from every case into a single dataframe"
+    capacity = pd.concat(capacity_list, ignore_index=True, sort=False)
+    capacity["Case"] = capacity["Case"].astype(case_dtype(cases))
+    capacity["Resource"] = capacity["Resource"].astype("category")
 
-    df_list = []
-    for folder in results_folders:
-        case_name = clean_case_name(folder.parent.stem)
-        capacity_df = pd.read_csv(folder / "capacity.csv")
-        capacity_df["Region"] = capacity_df["Zone"].map(ZONE_MAP)
-        capacity_df = capacity_df.drop(columns=["Zone"])
-        capacity_df["Case"] = case_name
-        capacity_df["R_ID"] = capacity_df.index + 1
-        df_list.append(capacity_df)
-
-    capacity_comparison = pd.concat(df_list, sort=False)
-    capacity_comparison = capacity_comparison.rename(
-        columns={
-            "EndCap": "Final Capacity",
-            "StartCap": "Start Capacity",
-            "RetCap": "Retired Capacity",
-            "NewCap": "New Capacity",
-            "EndEnergyCap": "Final Energy Capacity",
-            "EndChargeCap": "Final Charge Capacity",
-            "StartEnergyCap": "Start Energy Capacity",
-            "RetEnergyCap": "Retired Energy Capacity",
-            "NewEnergyCap": "New Energy Capacity",
-            "StartChargeCap": "Start Charge Capacity",
-            "RetChargeCap": "Retired Charge Capacity",
-            "NewChargeCap": "New Charge Capacity",
-        }
+    return capacity
+
+
+def read_capacity(cases):
+    "Concatenate capacity results from every case into a single dataframe"
+    capacity_list = [
+        summarize_capacity(case, capacity_df)
+        for case, capacity_df in read_case_csv(cases, "Results/capacity.csv")
+    ]
+
+    return combine_capacity(capacity_list, cases)
+
+
+def aggregate_capacity(capacity, keys, case_order):
+    """Sum capacity of each category by keys and case.
+
+    Returns a dataframe with one column per case (in `case_order`) and a row for
+    each combination of keys and capacity category. The index levels are the first
+    key, "Category", and then the remaining keys. Rows are sorted by keys and then
+    category, and rows without values in any case are dropped.
+    """
+    capacity = capacity.dropna(subset=keys)
+    categories = sorted(c for c in CAPACITY_CATEGORIES.values() if c in capacity)
+    case_order = list(dict.fromkeys(case_order))
+
+    # Categorical keys are sorted by their categories, which are sorted values
+    key_data = pd.MultiIndex.from_frame(capacity[keys].astype("category"))
+    key_index = key_data.unique().sort_values()
+    key_codes = key_index.get_indexer(key_data)
+    case_codes = pd.Categorical(capacity["Case"], categories=case_order).codes
+
+    values = capacity[categories].to_numpy(dtype=float)
+    num_keys, num_cats, num_cases = len(key_index), len(categories), len(case_order)
+    totals = np.zeros((num_keys, num_cats, num_cases))
+    np.add.at(totals, (key_codes, slice(None), case_codes), np.nan_to_num(values))
+    has_value = np.zeros((num_keys, num_cases), dtype=bool)
+    has_value[key_codes, case_codes] = True
+    totals[~has_value[:, None, :].repeat(num_cats, axis=1)] = np.nan
+
+    key_levels = [
+        np.asarray(key_index.get_level_values(i)).repeat(num_cats)
+        for i in range(len(keys))
+    ]
+    index = pd.MultiIndex.from_arrays(
+        [key_levels[0], np.tile(categories, num_keys)] + key_levels[1:],
+        names=[keys[0], "Category"] + keys[1:],
     )
-    # return capacity_comparison
-    capacity_comparison = (
-        capacity_comparison.pivot_table(
-            columns="Case", index=["Region", "Resource", "R_ID"]
-        )
-        .stack(0)
-        .reset_index()
-        .rename(columns={"level_3": "Category"})
-        .set_index(["Region", "Category", "Resource", "R_ID"])
+    capacity_comparison = pd.DataFrame(
+        totals.reshape(num_keys * num_cats, num_cases),
+        index=index,
+        columns=pd.Index(case_order, name="Case"),
     )
-    for col in capacity_comparison.columns:
-        if "Retired" in col:
-            capacity_comparison.loc[:, col] *= -1
 
-    return capacity_comparison[col_order]
+    return capacity_comparison.dropna(how="all")
 
 
-def compare_capacity(year):
-    results_folders = find_results_folders(year)
-    col_order = [clean_case_name(folder.parent.stem) for folder in results_folders]
-
-    df_list = []
-    for folder in results_folders:
-        case_name = clean_case_name(folder.parent.stem)
-        capacity_df = pd.read_csv(folder / "capacity.csv")
-        capacity_df = map_resource_name(capacity_df)
-        capacity_df["Region"] = capacity_df["Zone"].map(ZONE_MAP)
-        grouped_capacity = capacity_df.groupby(["Region", "Resource Name"]).sum()
-        grouped_capacity["Case"] = case_name
-        grouped_capacity = grouped_capacity.drop(columns=["Zone"])
-
-        df_list.append(grouped_capacity)
-
-    capacity_comparison = pd.concat(df_list, sort=False)
-    capacity_comparison = capacity_comparison.rename(
-        columns={
-            "EndCap": "Final Capacity",
-            "StartCap": "Start Capacity",
-            "RetCap": "Retired Capacity",
-            "NewCap": "New Capacity",
-            "EndEnergyCap": "Final Energy Capacity",
-            "EndChargeCap": "Final Charge Capacity",
-            "StartEnergyCap": "Start Energy Capacity",
-            "RetEnergyCap": "Retired Energy Capacity",
-            "NewEnergyCap": "New Energy Capacity",
-            "StartChargeCap": "Start Charge Capacity",
-            "RetChargeCap": "Retired Charge Capacity",
-            "NewChargeCap": "New Charge Capacity",
-        }
+def resource_capacity(capacity, cases):
+    "Capacity of each resource (by R_ID) in every case"
+    capacity_comparison = aggregate_capacity(
+        capacity, ["Region", "Resource", "R_ID"], cases.descriptions
     )
 
-    # This is a mess and I'm not sure it gives the best format output.
-    capacity_comparison = (
-        capacity_comparison.pivot_table(
-            columns="Case", index=["Region", "Resource Name"]
-        )
-        .stack(0)
-        .reset_index()
-        .rename(columns={"level_2": "Category"})
-        .set_index(["Region", "Category", "Resource Name"])
+    return capacity_comparison
+
+
+def get_resource_capacity(year):
+    cases = find_cases(year)
+    capacity = read_capacity(cases)
+
+    return resource_capacity(capacity, cases)
+
+
+def region_capacity(capacity, cases):
+    "Capacity of each region and resource name in every case"
+    capacity = set_key_dtypes(map_resource_name(capacity.copy()))
+
+    capacity_comparison = aggregate_capacity(
+        capacity, ["Region", "Resource Name"], cases.descriptions
     )
-    for col in capacity_comparison.columns:
-        if "Retired" in col:
-            capacity_comparison.loc[:, col] *= -1
-    # cols = list(capacity_comparison.columns)
-    # cols.sort()
 
-    return capacity_comparison[col_order].round(1)
+    return capacity_comparison.round(1)
+
+
+def compare_capacity(year):
+    cases = find_cases(year)
+
+    return region_capacity(read_capacity(cases), cases)
 
 
-def load_energy_case(folder):
-    case_name = clean_case_name(folder.parent.stem)
-    energy_df = pd.read_csv(folder / "power.csv", header=None, index_col=0)
+def summarize_energy(case, energy_df):
+    "Generation of a case by region and resource name"
+    case_name = case.description
     energy_df = energy_df.T
     energy_df = map_resource_name(energy_df)
     energy_df["Zone"] = energy_df["Zone"].astype(int)
     energy_df["Sum"] = energy_df["Sum"].astype(float)
     energy_df["Region"] = energy_df["Zone"].map(ZONE_MAP)
-    grouped_energy = energy_df.groupby(["Region", "Resource Name"]).sum()
+    energy_df = set_key_dtypes(energy_df)
+    grouped_energy = energy_df.groupby(["Region", "Resource Name"], observed=True)[
+        ["Sum"]
+    ].sum()
+    grouped_energy = grouped_energy.sort_index()
     grouped_energy = grouped_energy.rename(columns={"Sum": case_name})
 
     return grouped_energy
 
 
-def compare_energy(year):
-    results_folders = find_results_folders(year)
-    df_list = []
-    for folder in results_folders:
-        case_name = clean_case_name(folder.parent.stem)
-        energy_df = pd.read_csv(folder / "power.csv", header=None, index_col=0)
-        energy_df = energy_df.T
-        energy_df = map_resource_name(energy_df)
-        energy_df["Zone"] = energy_df["Zone"].astype(int)
-        energy_df["Sum"] = energy_df["Sum"].astype(float)
-        energy_df["Region"] = energy_df["Zone"].map(ZONE_MAP)
-        grouped_energy = energy_df.groupby(["Region", "Resource Name"]).sum()
-        grouped_energy = grouped_energy.rename(columns={"Sum": case_name})
-
-        df_list.append(grouped_energy[[case_name]])
-
-    energy_comparison = pd.concat(df_list, axis=1)
+def load_energy_case(case):
+    energy_df = pd.read_csv(case.results_folder / "power.csv", header=None, index_col=0)
+
+    return summarize_energy(case, energy_df)
+
+
+def combine_energy(energy_list):
+    energy_comparison = pd.concat(energy_list, axis=1)
     cols = list(energy_comparison.columns)
     # cols.sort()
 
     return energy_comparison[cols].round(0)
 
 
-def compare_emissions(year):
-    results_folders = find_results_folders(year)
-    df_list = []
-    for folder in results_folders:
-        case_name = clean_case_name(folder.parent.stem)
-        emissions_df = pd.read_csv(folder / "emissions.csv", header=None, index_col=0)
-
-        # Drop the last column (Total)
-        emissions_df = emissions_df.iloc[:, :-1]
-        emissions_df = emissions_df.T
-        # emissions_df = map_resource_name(emissions_df)
-        emissions_df["Zone"] = emissions_df["Zone"].astype(int)
-        emissions_df["Sum"] = emissions_df["Sum"].astype(float)
-        emissions_df["Region"] = emissions_df["Zone"].map(ZONE_MAP)
-        grouped_emissions = emissions_df.groupby(["Region"]).sum()
-        grouped_emissions = grouped_emissions.rename(columns={"Sum": case_name})
-
-        df_list.append(grouped_emissions[[case_name]])
-
-    emissions_comparison = pd.concat(df_list, axis=1)
+def compare_energy(year):
+    energy_files = read_case_csv(
+        find_cases(year), "Results/power.csv", header=None, index_col=0
+    )
+    energy_list = [
+        summarize_energy(case, energy_df) for case, energy_df in energy_files
+    ]
+
+    return combine_energy(energy_list)
+
+
+def summarize_emissions(case, emissions_df):
+    "Emissions of a case by region"
+    case_name = case.description
+
+    # Drop the last column (Total)
+    emissions_df = emissions_df.iloc[:, :-1]
+    emissions_df = emissions_df.T
+    # emissions_df = map_resource_name(emissions_df)
+    emissions_df["Zone"] = emissions_df["Zone"].astype(int)
+    emissions_df["Sum"] = emissions_df["Sum"].astype(float)
+    emissions_df["Region"] = emissions_df["Zone"].map(ZONE_MAP)
+    emissions_df = set_key_dtypes(emissions_df)
+    grouped_emissions = emissions_df.groupby(["Region"], observed=True)[["Sum"]].sum()
+    grouped_emissions = grouped_emissions.sort_index()
+    grouped_emissions = grouped_emissions.rename(columns={"Sum": case_name})
+
+    return grouped_emissions
+
+
+def combine_emissions(emissions_list):
+    emissions_comparison = pd.concat(emissions_list, axis=1)
     cols = list(emissions_comparison.columns)
     cols.sort()
 
     return emissions_comparison[cols].round(0)
 
 
+def compare_emissions(year):
+    emissions_files = read_case_csv(
+        find_cases(year), "Results/emissions.csv", header=None, index_col=0
+    )
+    emissions_list = [
+        summarize_emissions(case, emissions_df)
+        for case, emissions_df in emissions_files
+    ]
+
+    return combine_emissions(emissions_list)
+
+
 def get_total_hours(year):
-    results_folders = find_results_folders(year)
+    first_case = find_cases(year)[0]
 
-    load_data = pd.read_csv(
-        list(results_folders)[0].parent / "Inputs" / "Load_data.csv"
-    )
+    load_data = read_input_csv(first_case.inputs_folder / "Load_data.csv")
     total_hours = load_data["Sub_Weights"].sum()
 
     return total_hours
 
 
-def compare_costs(year):
-    results_folders = find_results_folders(year)
-    df_list = []
-    for folder in results_folders:
-        case_name = clean_case_name(folder.parent.stem)
-        costs_df = pd.read_csv(
-            folder / "costs.csv", header=None, index_col=0, na_values=["-"]
-        )
+def summarize_costs(case, costs_df):
+    "Cost components of a case by region, with Case and Region columns"
+    costs_df = costs_df.loc[:, 2:].T
+    costs_df["Zone"] = costs_df["Costs"].str.replace("Zone", "").astype(int)
+    costs_df["Region"] = costs_df["Zone"].map(ZONE_MAP)
+    costs_df["Case"] = case.description
+    costs_df = set_key_dtypes(costs_df)
+    costs_df = costs_df.drop(columns=["Zone", "Costs"])
+    # costs_df = costs_df.T
+
+    return costs_df
 
-        costs_df = costs_df.loc[:, 2:].T
-        costs_df["Zone"] = costs_df["Costs"].str.replace("Zone", "").astype(int)
-        costs_df["Region"] = costs_df["Zone"].map(ZONE_MAP)
-        costs_df["Case"] = case_name
-        costs_df = costs_df.set_index(["Case", "Region"])
-        costs_df = costs_df.drop(columns=["Zone", "Costs"])
-        # costs_df = costs_df.T
-        df_list.append(costs_df)
 
-    cost_comparison = pd.concat(df_list, axis=0)
+def combine_costs(costs_list, cases):
+    cost_comparison = pd.concat(costs_list, axis=0)
+    cost_comparison = set_key_dtypes(cost_comparison, case_dtype(cases))
+    cost_comparison = cost_comparison.set_index(["Case", "Region"])
     cost_comparison = cost_comparison.astype(float)
     cost_comparison = cost_comparison.round(2)
 
     return cost_comparison
 
 
+def compare_costs(year):
+    cases = find_cases(year)
+    costs_files = read_case_csv(
+        cases,
+        "Results/costs.csv",
+        header=None,
+        index_col=0,
+        na_values=["-"],
+    )
+    costs_list = [summarize_costs(case, costs_df) for case, costs_df in costs_files]
+
+    return combine_costs(costs_list, cases)
+
+
 def compare_rps_ces_prices(year):
-    results_folders = find_results_folders(year)
     df_list = []
-    for folder in results_folders:
-        case_name = clean_case_name(folder.parent.stem)
-        rps_ces_df = pd.read_csv(folder / "RPS_CES.csv")
+    for case, rps_ces_df in read_case_csv(find_cases(year), "Results/RPS_CES.csv"):
+        case_name = case.description
         rps_ces_df["Region"] = rps_ces_df["Zone"].map(ZONE_MAP)
         rps_ces_df["Case"] = case_name
-        rps_ces_df = rps_ces_df.set_index(["case", "Region"])
+        rps_ces_df = rps_ces_df.set_index(["Case", "Region"])
         df_list.append(rps_ces_df)
 
     rps_ces_comparison = pd.concat(df_list)
@@ -370,91 +429,189 @@ def compare_rps_ces_prices(year):
     return rps_ces_comparison
 
 
-def compare_tx_build(year):
-    results_folders = find_results_folders(year)
-    network_input = pd.read_csv(results_folders[0].parent / "Inputs" / "Network.csv")
-    network_input = network_input.set_index("Network_lines")
-    network_line_map = network_input["Transmission Path Name"]
-    df_list = []
-    for folder in results_folders:
-        case_name = clean_case_name(folder.parent.stem)
-        tx_df = pd.read_csv(folder / "network_expansion.csv")
-        tx_df["Path Name"] = tx_df["Line"].map(network_line_map)
-        tx_df["Path Name"] = tx_df["Path Name"].str.replace("_to_", " to ")
-        tx_df["Case"] = case_name
-        df_list.append(tx_df)
-
-    tx_comparison = pd.concat(df_list)
-    tx_comparison = tx_comparison.drop(columns=["Line"])
+def summarize_tx_build(case, tx_df):
+    "Transmission expansion of a case by path name, with a Case column"
+    # Cases are summarized in threads that share the topology, and the index
+    # lookup of a shared Series isn't thread safe, so map with a dict
+    network_line_map = case_topology(case).path_names.to_dict()
+    tx_df["Path Name"] = tx_df["Line"].map(network_line_map)
+    tx_df["Path Name"] = tx_df["Path Name"].str.replace("_to_", " to ")
+    tx_df["Case"] = case.description
+    tx_df = tx_df.drop(columns=["Line"])
+
+    return tx_df
+
+
+def combine_tx_build(tx_list, cases):
+    tx_comparison = pd.concat(tx_list)
+    tx_comparison = set_key_dtypes(tx_comparison, case_dtype(cases))
+    tx_comparison["Path Name"] = tx_comparison["Path Name"].astype("category")
     tx_comparison = tx_comparison.set_index(["Case", "Path Name"])
 
     return tx_comparison.round(1)
 
 
-def compare_spur_line_build(year):
-    results_folders = find_results_folders(year)
-    gen_input = pd.read_csv(
-        results_folders[0].parent / "Inputs" / "Generators_data.csv"
-    )
-    gen_input = gen_input.set_index("R_ID")
-    spur_line_miles_map = gen_input["spur_line_miles"]
-    spur_line_capex_map = gen_input["spur_line_capex"]
+def compare_tx_build(year):
+    cases = find_cases(year)
+    check_topologies(cases)
+    tx_list = [
+        summarize_tx_build(case, tx_df)
+        for case, tx_df in read_case_csv(cases, "Results/network_expansion.csv")
+    ]
+
+    return combine_tx_build(tx_list, cases)
 
-    raw_cap = get_resource_capacity(year)
+
+def spur_line_build(capacity, spur_line_data, cases):
+    "New capacity of each resource with spur line MW-miles and costs"
+    raw_cap = resource_capacity(capacity, cases)
     new_cap = make_data_tidy(
         raw_cap,
         value_name="Capacity (MW)",
         id_vars=["Region", "Category", "R_ID", "Resource"],
     ).query("Category=='New Capacity'")
 
-    new_cap = map_resource_name(new_cap)
+    new_cap = set_key_dtypes(map_resource_name(new_cap), case_dtype(cases))
+    new_cap["Resource"] = new_cap["Resource"].astype("category")
+
+    # Spur line miles and capex are from each case's own generator data
+    new_cap = calc_spur_line_costs(new_cap, spur_line_data)
+
+    return new_cap
+
+
+def compare_spur_line_build(year):
+    cases = find_cases(year)
+
+    return spur_line_build(read_capacity(cases), read_spur_line_data(cases), cases)
+
 
-    new_cap["resource_spur_miles"] = new_cap["R_ID"].map(spur_line_miles_map)
-    new_cap["resource_spur_capex"] = new_cap["R_ID"].map(spur_line_capex_map)
-    new_cap = new_cap.drop(columns=["R_ID"])
+def read_load_and_weights(case):
+    load = read_input_csv(case.inputs_folder / "Load_data.csv")
 
-    new_cap["Spur Line MW-Miles"] = (
-        new_cap["Capacity (MW)"] * new_cap["resource_spur_miles"]
+    return load, hour_weights(case)
+
+
+def summarize_demand(case, load, time_weight):
+    "Weighted total demand of a case by region, with Case and Region columns"
+    total_load = weighted_sum(load.loc[:, "Load_MW_z1":], time_weight)
+    total_load.name = "Total Demand"
+    total_load.index.name = "Zone"
+    total_load = total_load.reset_index()
+    total_load["Region"] = (
+        total_load["Zone"].str.replace("Load_MW_z", "").astype(int).map(ZONE_MAP)
     )
-    new_cap["Spur Line Capex"] = (
-        new_cap["Capacity (MW)"] * new_cap["resource_spur_capex"]
+    total_load["Case"] = case.description
+    total_load = total_load.drop(columns=["Zone"])
+
+    return set_key_dtypes(total_load)
+
+
+def combine_demand(load_list, cases):
+    load_comparison = pd.concat(load_list)
+    load_comparison = set_key_dtypes(load_comparison, case_dtype(cases))
+    load_comparison = load_comparison.set_index(["Case", "Region"])
+
+    return load_comparison
+
+
+def compare_demand(year):
+    cases = find_cases(year)
+    case_files = read_case_files(
+        cases,
+        read_load_and_weights,
+        ["Inputs/Load_data.csv", "Results/time_weights.csv"],
     )
-    new_cap["Spur Line Inv Cost"] = investment_cost_calculator(
-        new_cap["Spur Line Capex"], wacc=0.069, cap_rec_years=60
+    load_list = [
+        summarize_demand(case, load, time_weight)
+        for case, (load, time_weight) in case_files
+    ]
+
+    return combine_demand(load_list, cases)
+
+
+CASE_SUMMARY_FILES = [
+    "Results/capacity.csv",
+    "Results/power.csv",
+    "Results/emissions.csv",
+    "Results/network_expansion.csv",
+    "Results/costs.csv",
+    "Results/time_weights.csv",
+    "Inputs/Generators_data.csv",
+    "Inputs/Load_data.csv",
+]
+
+
+def summarize_case(case):
+    """Read the results of a case and reduce each file to the values that are used.
+
+    Returns a dictionary of small dataframes. `combine_case_summaries` combines
+    the summaries from every case in a year into the regional results.
+    """
+    r_folder = case.results_folder
+    load, time_weight = read_load_and_weights(case)
+    gen_data = read_input_csv(
+        case.inputs_folder / "Generators_data.csv", usecols=SPUR_LINE_COLUMNS
     )
+    summary = {
+        "capacity": summarize_capacity(case, pd.read_csv(r_folder / "capacity.csv")),
+        "energy": summarize_energy(
+            case, pd.read_csv(r_folder / "power.csv", header=None, index_col=0)
+        ),
+        "emissions": summarize_emissions(
+            case, pd.read_csv(r_folder / "emissions.csv", header=None, index_col=0)
+        ),
+        "network": summarize_tx_build(
+            case, pd.read_csv(r_folder / "network_expansion.csv")
+        ),
+        "spur_line_data": summarize_spur_line_data(case, gen_data),
+        "costs": summarize_costs(
+            case,
+            pd.read_csv(
+                r_folder / "costs.csv", header=None, index_col=0, na_values=["-"]
+            ),
+        ),
+        "demand": summarize_demand(case, load, time_weight),
+    }
 
-    return new_cap
+    return summary
 
 
-def compare_demand(year):
-    results_folders = find_results_folders(year)
-    input_folders = [folder.parent / "Inputs" for folder in results_folders]
-    # load_dict = {}
-    load_list = []
-    for i_folder, r_folder in zip(input_folders, results_folders):
-        case_name = clean_case_name(i_folder.parent.stem)
-        load = pd.read_csv(i_folder / "Load_data.csv")
-        time_weight = pd.read_csv(r_folder / "time_weights.csv")
-        total_load = (
-            load.loc[:, "Load_MW_z1":].mul(time_weight["Weight"], axis=0)
-        ).sum()
-        total_load.name = "Total Demand"
-        total_load.index.name = "Zone"
-        total_load = total_load.reset_index()
-        total_load["Region"] = (
-            total_load["Zone"].str.replace("Load_MW_z", "").astype(int).map(ZONE_MAP)
-        )
-        # load_dict[case_name] = total_load
-        total_load["Case"] = case_name
-        load_list.append(total_load)
+def combine_case_summaries(cases, summaries):
+    """Regional results for a year from the summaries of every case.
 
-    load_comparison = pd.concat(load_list)
-    load_comparison = load_comparison.drop(columns=["Zone"])
-    load_comparison = load_comparison.set_index(["Case", "Region"])
+    `summaries` are from `summarize_case` and in the same order as `cases`.
+    Costs don't include costs from the previous period (see `build_results`).
+    """
 
-    # load_comparison = pd.Series(load_dict, name="Total Demand")
+    def collect(key):
+        return [summary[key] for summary in summaries]
 
-    return load_comparison
+    capacity = combine_capacity(collect("capacity"), cases)
+    spur_line_data = combine_spur_line_data(collect("spur_line_data"))
+
+    region_dict = {
+        "capacity": region_capacity(capacity, cases),
+        "energy": combine_energy(collect("energy")),
+        "emissions": combine_emissions(collect("emissions")),
+        "network": combine_tx_build(collect("network"), cases),
+        "spur_line": spur_line_build(capacity, spur_line_data, cases),
+        "costs": combine_costs(collect("costs"), cases),
+        "demand": combine_demand(collect("demand"), cases),
+    }
+
+    return region_dict
+
+
+def read_case_summaries(cases):
+    "Summaries of every case, read in background threads"
+    check_topologies(cases)
+    year = cases[0].year if len(cases) else ""
+    with Progress(f"{year} case summaries", len(cases)) as tracker:
+        case_summaries = read_case_files(
+            cases, summarize_case, CASE_SUMMARY_FILES, progress=tracker
+        )
+        return [summary for case, summary in case_summaries]
 
 
 def add_coal_retirements(capacity_df, base_case, modify_case_list):
@@ -475,11 +632,20 @@ def add_coal_retirements(capacity_df, base_case, modify_case_list):
 # def add_start
 
 
-def build_results(year, prev_spur_costs, prev_tx_costs):
-    region_dict = {}
+def build_results(year, prev_spur_costs, prev_tx_costs, summaries=None, cases=None):
+    """Regional and total results for a year.
+
+    `summaries` are the `summarize_case` results of every case in the year. They
+    are read from the case folders if not given. `cases` is a CaseRegistry in the
+    same order as `summaries` (cases found in the year folder by default).
+    """
+    if cases is None:
+        cases = find_cases(year)
+    if summaries is None:
+        summaries = read_case_summaries(cases)
+    region_dict = combine_case_summaries(cases, summaries)
     total_dict = {}
 
-    region_dict["capacity"] = compare_capacity(year)
     # if year == 2030:
     #     region_dict["capacity"] = add_coal_retirements(
     #         region_dict["capacity"],
@@ -487,29 +653,35 @@ def build_results(year, prev_spur_costs, prev_tx_costs):
     #         ["Coal Phaseout", "Coal Phaseout No New Gas"],
     #     )
     total_dict["capacity"] = (
-        region_dict["capacity"].groupby(["Category", "Resource Name"]).sum()
+        region_dict["capacity"]
+        .groupby(["Category", "Resource Name"], observed=True)
+        .sum()
     )
 
-    region_dict["energy"] = compare_energy(year)
-    total_dict["energy"] = region_dict["energy"].groupby("Resource Name").sum()
+    total_dict["energy"] = (
+        region_dict["energy"].groupby("Resource Name", observed=True).sum()
+    )
 
-    region_dict["emissions"] = compare_emissions(year)
     total_dict["emissions"] = region_dict["emissions"].sum()
     total_dict["emissions"].name = "MT CO2"
     total_dict["emissions"].index.name = "Case"
     total_dict["emissions"] = total_dict["emissions"].reset_index()
 
-    region_dict["network"] = compare_tx_build(year)
-    total_dict["network"] = region_dict["network"].groupby("Case").sum()
+    total_dict["network"] = region_dict["network"].groupby("Case", observed=True).sum()
 
-    region_dict["spur_line"] = compare_spur_line_build(year)
-    total_dict["spur_line"] = region_dict["spur_line"].groupby("Case").sum()
+    total_dict["spur_line"] = (
+        region_dict["spur_line"]
+        .groupby("Case", observed=True)
+        .sum(numeric_only=True)
+        .sort_index()
+    )
 
-    region_dict["costs"] = compare_costs(year)
     if prev_spur_costs is None:
         region_dict["costs"]["prev_period_spur_line"] = 0
     else:
-        prev_spur_costs = prev_spur_costs.groupby(["Case", "Region"]).sum()
+        prev_spur_costs = prev_spur_costs.groupby(["Case", "Region"], observed=True)[
+            ["Spur Line Inv Cost"]
+        ].sum()
         region_dict["costs"]["prev_period_spur_line"] = prev_spur_costs[
             "Spur Line Inv Cost"
         ]
@@ -518,7 +690,7 @@ def build_results(year, prev_spur_costs, prev_tx_costs):
         ["cFix", "cVar", "cNSE", "cStart", "prev_period_spur_line"]
     ].sum(axis=1)
 
-    total_dict["costs"] = region_dict["costs"].groupby("Case").sum()
+    total_dict["costs"] = region_dict["costs"].groupby("Case", observed=True).sum()
     # total_dict["costs"]["spur_line"] = total_dict["spur_line"]["Spur Line Inv Cost"]
 
     if prev_tx_costs is None:
@@ -543,8 +715,7 @@ def build_results(year, prev_spur_costs, prev_tx_costs):
         ]
     ].sum(axis=1)
 
-    region_dict["demand"] = compare_demand(year)
-    total_dict["demand"] = region_dict["demand"].groupby("Case").sum()
+    total_dict["demand"] = region_dict["demand"].groupby("Case", observed=True).sum()
 
     # total_dict["energy_cost"] = total_dict["costs"]["cTotal"] / total_dict["demand"]
     # total_dict["energy_cost"] = (
@@ -556,23 +727,103 @@ def build_results(year, prev_spur_costs, prev_tx_costs):
     return region_dict, total_dict
 
 
+def results_carry_over(region_results, total_results):
+    """Previous period costs used by `build_results` for the next period.
+
+    Spur line costs are summed by case and region so that the per-resource spur
+    line results don't need to be kept.
+    """
+    prev_spur_costs = (
+        region_results["spur_line"]
+        .groupby(["Case", "Region"], observed=True)[["Spur Line Inv Cost"]]
+        .sum()
+    )
+    prev_tx_costs = total_results["network"][["Cost_Trans_Capacity"]]
+
+    return prev_spur_costs, prev_tx_costs
+
+
+def downcast_results(df):
+    "Store float values as float32 and string columns/index as categoricals"
+    if isinstance(df, pd.Series):
+        return df.astype(np.float32) if df.dtype == np.float64 else df
+
+    df = df.copy()
+    float_cols = df.select_dtypes(include="float64").columns
+    df[float_cols] = df[float_cols].astype(np.float32)
+    object_cols = df.select_dtypes(include="object").columns
+    df[object_cols] = df[object_cols].astype("category")
+    if not isinstance(df.index, pd.MultiIndex) and df.index.dtype == object:
+        df.index = pd.CategoricalIndex(df.index, name=df.index.name)
+
+    return df
+
+
+def build_results_low_memory(years, excel=True, store=False):
+    """Build results one year at a time and write each year to disk when it is done.
+
+    Excel results are written to separate files for each year ("WECC results
+    <year>.xlsx" and "Regional results <year>.xlsx"), and to the results store if
+    `store` is True. Only the costs carried over to the next period are kept
+    from the regional results, along with the network expansion used in figures.
+    Retained results are downcast with `downcast_results`. Returns total_dict and
+    region_dict with the retained results.
+    """
+    total_dict, region_dict = {}, {}
+    prev_spur_costs = None
+    prev_tx_costs = None
+    con = connect() if store else None
+    try:
+        for year in years:
+            region_results, total_results = build_results(
+                year, prev_spur_costs, prev_tx_costs
+            )
+            prev_spur_costs, prev_tx_costs = results_carry_over(
+                region_results, total_results
+            )
+            year_total, year_region = calc_energy_cost(
+                {year: total_results}, {year: region_results}, [year]
+            )
+
+            if excel:
+                write_results_to_excel(
+                    year_total,
+                    year_region,
+                    total_file=f"WECC results {year}.xlsx",
+                    region_file=f"Regional results {year}.xlsx",
+                )
+            if store:
+                write_year(con, year, region_results, year_fingerprints(year))
+
+            total_dict[year] = {
+                key: downcast_results(df) for key, df in total_results.items()
+            }
+            region_dict[year] = {
+                "network": downcast_results(region_results["network"])
+            }
+            del region_results, year_region
+            # Inputs of the next year are usually different files
+            input_store.clear_frames()
+    finally:
+        if con is not None:
+            con.close()
+
+    return total_dict, region_dict
+
+
 def make_tx_spur_fig(
-    total_dict_2030,
-    total_dict_2045,
+    figure_data,
     case_list,
-    file_name,
+    file_name=None,
     scale_factor=2,
     yaxis_title_font_size=14,
     xaxis_label_font_size=12,
     file_type="png",
+    years=None,
 ):
+    import altair as alt
 
-    network_2030 = total_dict_2030["network"].reset_index()
-    network_2030["Period"] = 2030
-    network_2045 = total_dict_2045["network"].reset_index()
-    network_2045["Period"] = 2045
-    data = pd.concat([network_2030, network_2045])
-    data["Cost_Trans_Capacity_Mil"] = data["Cost_Trans_Capacity"] / 1e6
+    data = figure_data.network_periods(years)
 
     base_tx = alt.Chart(data.query("Case.isin(@case_list)")).encode(
         x=alt.X("Case", sort=case_list, axis=alt.Axis(title=None, labelFontSize=12)),
@@ -597,13 +848,7 @@ def make_tx_spur_fig(
         #     color="Period"
     )
 
-    spur_2030 = total_dict_2030["spur_line"].reset_index()
-    spur_2030["Period"] = 2030
-    spur_2045 = total_dict_2045["spur_line"].reset_index()
-    spur_2045["Period"] = 2045
-    data_spur = pd.concat([spur_2030, spur_2045])
-    data_spur["Spur Line Inv Cost Million"] = data_spur["Spur Line Inv Cost"] / 1e6
-    data_spur["Spur Line GW-Miles"] = data_spur["Spur Line MW-Miles"] / 1000
+    data_spur = figure_data.spur_periods(years)
 
     base_spur = alt.Chart(data_spur.query("Case.isin(@case_list)")).encode(
         x=alt.X("Case", sort=case_list, axis=alt.Axis(title=None, labelFontSize=12)),
@@ -643,23 +888,19 @@ def make_tx_spur_fig(
 
 
 def make_cap_change_fig(
-    total_dict,
+    figure_data,
     case_list,
     file_name=None,
     scale_factor=2,
     yaxis_title_font_size=14,
     xaxis_label_font_size=12,
+    years=None,
 ):
+    import altair as alt
+
     chart_list = []
-    for year, df_dict in total_dict.items():
-        tidy_cap = make_data_tidy(
-            df_dict["capacity"], "Capacity (MW)", ["Resource Name", "Category"]
-        )
-        data = tidy_cap.loc[
-            tidy_cap.Category.isin(["New Capacity", "Retired Capacity"]), :
-        ]
-        data.loc[data.Category == "Retired Capacity", "Capacity (MW)"] *= -1
-        data["idx"] = data["Resource Name"].map(RESOURCE_ORDER_DICT)
+    for year in years or figure_data.years:
+        data = figure_data.capacity_changes(year)
 
         chart = (
             alt.Chart(data.query("Case.isin(@case_list)"))
@@ -677,7 +918,7 @@ def make_cap_change_fig(
                         titleFontSize=yaxis_title_font_size,
                     ),
                 ),
-                color=RESOURCE_COLORS,
+                color=resource_colors(),
                 order="idx",  # alt.Order("idx", sort="descending")
             )
             .properties(title=f"{year}")
@@ -701,46 +942,20 @@ def make_cap_change_fig(
 
 
 def make_tx_line_fig(
-    region_dict,
+    figure_data,
     case_list,
     file_name=None,
     scale_factor=2,
     yaxis_title_font_size=14,
     xaxis_label_font_size=12,
+    years=None,
 ):
+    import altair as alt
 
-    # Need to read a network file from first year to get starting tx capacity
-    first_year = min(region_dict.keys())
-    results_folder = find_results_folders(first_year)[0]
-    input_folder = results_folder.parent / "Inputs"
-    start_network = pd.read_csv(input_folder / "Network.csv")
-
-    chart_tx_segments = region_dict[first_year]["network"].copy()
-    # network df has a MultiIndex with levels Case and Path Name
-    num_cases = len(chart_tx_segments.index.levels[0])
-    start_tx_capacity = start_network["Line_Max_Flow_MW"].tolist() * num_cases
-
-    chart_tx_segments.loc[:, "Transmission Capacity (MW)"] = start_tx_capacity
-    chart_tx_segments["year"] = "Start"
-    start_tx_capacity = chart_tx_segments["Transmission Capacity (MW)"].values
-
-    df_list = [chart_tx_segments]
-    for year, year_dict in region_dict.items():
-        df = year_dict["network"]
-        df.loc[:, "Transmission Capacity (MW)"] = (
-            df.loc[:, "New_Trans_Capacity"] + start_tx_capacity
-        )
-        df["year"] = year
-
-        # Set start_tx_capacity to new value for next planning period
-        start_tx_capacity = df["Transmission Capacity (MW)"].values
-        df_list.append(df)
-
-    all_tx_segments = pd.concat(df_list)
-    # return all_tx_segments
+    all_tx_segments = figure_data.tx_segments(years)
 
     chart = (
-        alt.Chart(data=all_tx_segments.reset_index().query("Case.isin(@case_list)"))
+        alt.Chart(data=all_tx_segments.query("Case.isin(@case_list)"))
         .mark_bar()
         .encode(
             x=alt.X(
@@ -771,28 +986,19 @@ def make_tx_line_fig(
 
 
 def make_cost_co2_cap_energy_fig(
-    total_dict,
+    figure_data,
+    year,
     case_list,
     file_name=None,
     scale_factor=2,
     yaxis_title_font_size=14,
     xaxis_label_font_size=12,
 ):
+    import altair as alt
 
-    tidy_cap = make_data_tidy(
-        total_dict["capacity"], "Capacity (MW)", ["Resource Name", "Category"]
-    )
-    tidy_cap["Capacity (GW)"] = tidy_cap["Capacity (MW)"] / 1000
-    tidy_cap = tidy_cap.loc[tidy_cap["Category"] == "Final Capacity"]
-    tidy_cap["idx"] = tidy_cap["Resource Name"].map(RESOURCE_ORDER_DICT)
-
-    tidy_energy = make_data_tidy(total_dict["energy"], "Energy (MWh)")
-    tidy_energy["idx"] = tidy_energy["Resource Name"].map(RESOURCE_ORDER_DICT)
-
-    energy_cost_emissions = total_dict["energy_cost"].merge(
-        total_dict["emissions"], on="Case"
-    )
-    energy_cost_emissions["GT CO2"] = energy_cost_emissions["MT CO2"] / 1000
+    tidy_cap = figure_data.final_capacity(year)
+    tidy_energy = figure_data.tidy_energy(year)
+    energy_cost_emissions = figure_data.energy_cost_emissions(year)
 
     base = alt.Chart(energy_cost_emissions.query("Case.isin(@case_list)")).encode(
         x=alt.X(
@@ -835,7 +1041,7 @@ def make_cost_co2_cap_energy_fig(
                 "Capacity (GW)", axis=alt.Axis(titleFontSize=yaxis_title_font_size)
             ),
             order="idx",
-            color=RESOURCE_COLORS,
+            color=resource_colors(),
         )
     )
 
@@ -861,7 +1067,7 @@ def make_cost_co2_cap_energy_fig(
                 ),
             ),
             order="idx",
-            color=RESOURCE_COLORS,
+            color=resource_colors(),
         )
     )
 
@@ -879,46 +1085,75 @@ def make_cost_co2_cap_energy_fig(
         )
 
 
-def make_figures(total_dict, region_dict):
+FIGURE_FUNCTIONS = {
+    "cost_co2_cap_energy": make_cost_co2_cap_energy_fig,
+    "transmission_spur_costs": make_tx_spur_fig,
+    "capacity_changes": make_cap_change_fig,
+    "tx_expansion": make_tx_line_fig,
+}
 
-    for year, year_total in total_dict.items():
-        make_cost_co2_cap_energy_fig(
-            year_total, POLICY_ORDER, f"policy_cost_co2_cap_energy_{year}.png"
-        )
-        make_cost_co2_cap_energy_fig(
-            year_total, SENSITIVITY_ORDER, f"sensitivity_cost_co2_cap_energy_{year}.png"
-        )
 
-    make_tx_spur_fig(
-        total_dict[2030],
-        total_dict[2045],
-        POLICY_ORDER,
-        "policy_transmission_spur_costs.png",
-    )
-    make_tx_spur_fig(
-        total_dict[2030],
-        total_dict[2045],
-        SENSITIVITY_ORDER,
-        "sensitivity_transmission_spur_costs.png",
+def make_figures(
+    total_dict,
+    region_dict,
+    config_path=DEFAULT_FIGURE_CONFIG,
+    redraw=False,
+    workers=FIGURE_WORKERS,
+    cache_dir=FIGURE_CACHE_DIR,
+):
+    """Save the figures listed in a figure config file.
+
+    The config has named groups of cases, and optionally the years and figure
+    types to draw (see figures.yml). Data for the figures are tidied once and
+    shared by every figure. A figure is only drawn if its data have changed since
+    it was last saved (or `redraw` is True).
+    """
+    years = sorted(total_dict)
+    cases = list(
+        dict.fromkeys(case.description for year in years for case in find_cases(year))
     )
+    config = load_figure_config(config_path, cases)
+    tasks = build_work_plan(config, years, cases)
 
-    make_cap_change_fig(total_dict, POLICY_ORDER, "policy_capacity_changes.png")
-    make_cap_change_fig(
-        total_dict, SENSITIVITY_ORDER, "sensitivity_capacity_changes.png"
-    )
+    figure_data = FigureData(total_dict, region_dict, RESOURCE_ORDER_DICT)
+    figure_cache = FigureCache(cache_dir)
+
+    def render_task(task):
+        func = FIGURE_FUNCTIONS[task.figure]
+        if task.figure in YEARLY_FIGURES:
+            make_chart = lambda: func(figure_data, task.years[0], task.case_list)
+        else:
+            make_chart = lambda: func(figure_data, task.case_list, years=task.years)
+
+        key = figure_data.figure_key(task.figure, task.case_list, task.years)
+
+        return figure_cache.render(task.file_name, key, make_chart, force=redraw)
 
-    make_tx_line_fig(region_dict, POLICY_ORDER, "policy_tx_expansion.png")
-    make_tx_line_fig(region_dict, SENSITIVITY_ORDER, "sensitivity_tx_expansion.png")
+    # Tidy the shared data before starting threads so it is only done once
+    for task in tasks:
+        figure_data.figure_key(task.figure, task.case_list, task.years)
 
+    with Progress("Figures", len(tasks), unit="figures") as tracker:
+        drawn = run_work_plan(tasks, render_task, workers=workers, progress=tracker)
+    if not all(drawn):
+        print(f"{drawn.count(False)} of {len(drawn)} figures are unchanged")
 
-def write_results_to_excel(total_dict, region_dict):
+    return drawn
 
-    with pd.ExcelWriter("WECC results.xlsx") as writer:
+
+def write_results_to_excel(
+    total_dict,
+    region_dict,
+    total_file="WECC results.xlsx",
+    region_file="Regional results.xlsx",
+):
+
+    with pd.ExcelWriter(total_file) as writer:
         for year, results_dict in total_dict.items():
             for key, df in results_dict.items():
                 df.to_excel(writer, sheet_name=f"{key}_{year}")
 
-    with pd.ExcelWriter("Regional results.xlsx") as writer:
+    with pd.ExcelWriter(region_file) as writer:
         for year, results_dict in region_dict.items():
             for key, df in results_dict.items():
                 df.to_excel(writer, sheet_name=f"{key}_{year}")
@@ -970,25 +1205,74 @@ def calc_energy_cost(total_dict, region_dict, years):
 
 
 @app.command()
-def main(figures: bool = True, excel: bool = True):
+def main(
+    figures: bool = True,
+    excel: bool = True,
+    store: bool = False,
+    figure_config: Path = Path(DEFAULT_FIGURE_CONFIG),
+    redraw_figures: bool = False,
+    figure_workers: int = FIGURE_WORKERS,
+    prefetch_depth: int = prefetch.PREFETCH_DEPTH,
+    prefetch_memory_mb: float = prefetch.PREFETCH_MAX_BYTES / 1024 ** 2,
+    input_cache_mb: float = input_store.FRAME_CACHE_MAX_BYTES / 1024 ** 2,
+    low_memory: bool = False,
+    validate: bool = False,
+    region_shards: Optional[str] = None,
+    case_groups: Optional[Path] = None,
+    progress_mode: str = progress.PROGRESS_MODE,
+):
+    if low_memory and region_shards:
+        raise typer.BadParameter(
+            "--region-shards needs the full regional results, not --low-memory"
+        )
+    prefetch.configure(depth=prefetch_depth, max_mb=prefetch_memory_mb)
+    input_store.configure(max_mb=input_cache_mb)
+    progress.configure(mode=progress_mode)
 
     years = find_years()
+    if validate:
+        # Check the files of every case before spending time reading them
+        from validate_results import print_problems, validate_years
+
+        problems = validate_years(years)
+        if not problems.empty:
+            # Warnings (e.g. cases with a different number of resources) are
+            # shown even though the results are still compiled
+            print_problems(problems)
+        if (problems["level"] == "error").any():
+            raise typer.Exit(code=1)
     # first_year = years[0]
-    total_dict, region_dict = {}, {}
-
-    prev_spur_costs = None
-    prev_tx_costs = None
-    for year in years:
-        region_dict[year], total_dict[year] = build_results(
-            year, prev_spur_costs, prev_tx_costs
+    if low_memory:
+        total_dict, region_dict = build_results_low_memory(
+            years, excel=excel, store=store
         )
-        prev_spur_costs = region_dict[year]["spur_line"]
-        prev_tx_costs = total_dict[year]["network"]
+        excel = False
+        store = False
+    else:
+        total_dict, region_dict = {}, {}
 
-    total_dict, region_dict = calc_energy_cost(total_dict, region_dict, years)
+        prev_spur_costs = None
+        prev_tx_costs = None
+        for year in years:
+            region_dict[year], total_dict[year] = build_results(
+                year, prev_spur_costs, prev_tx_costs
+            )
+            prev_spur_costs = region_dict[year]["spur_line"]
+            prev_tx_costs = total_dict[year]["network"]
+
+        total_dict, region_dict = calc_energy_cost(total_dict, region_dict, years)
+
+    if store:
+        write_results_store(region_dict)
 
     if figures:
-        make_figures(total_dict, region_dict)
+        make_figures(
+            total_dict,
+            region_dict,
+            config_path=figure_config,
+            redraw=redraw_figures,
+            workers=figure_workers,
+        )
 
     # Dictionaries should be built with year as the first set of keys based on folders.
     # I'm compiling this now but need to go back and fix.
@@ -996,6 +1280,12 @@ def main(figures: bool = True, excel: bool = True):
 
         write_results_to_excel(total_dict, region_dict)
 
+    if region_shards:
+        from shard_results import load_case_groups, write_region_shards
+
+        groups = None if case_groups is None else load_case_groups(case_groups)
+        write_region_shards(region_dict, case_groups=groups, file_format=region_shards)
+
 
 if __name__ == "__main__":
     app()
@@ -0,0 +1,235 @@
+"""Transmission congestion statistics for every line and case.
+
+For each line, flows from flow.csv are compared with the line limit (existing
+Line_Max_Flow_MW in Network.csv plus new capacity in network_expansion.csv) and
+with the prices of the zones at each end from prices.csv:
+
+- Hours at limit: hours when the absolute flow is within AT_LIMIT_TOLERANCE of
+  the limit.
+- Price spread: price at the end zone of the line minus the price at the start
+  zone (flows are positive from start to end).
+- Congestion rent: flow times price spread, summed over all hours.
+- Utilization histogram: number of hours with absolute flow / limit in each
+  10% bin (flows at or above the limit are in the last bin).
+
+Hours, sums, and means are weighted by the number of hours each modeled hour
+represents (see `time_weights.hour_weights`).
+
+Results have one row per year, case, and line, and are kept in a table of the
+results store so they can be compared across cases and periods with a query.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import typer
+
+from case_registry import find_cases
+from compile_results import find_years
+from network_topology import case_topology
+from prefetch import read_case_files
+from results_store import DEFAULT_STORE, connect, table_exists
+from time_weights import hour_weights, weighted_mean, weighted_sum
+
+app = typer.Typer()
+
+CONGESTION_FILES = [
+    "Results/flow.csv",
+    "Results/prices.csv",
+    "Results/network_expansion.csv",
+    "Inputs/Network.csv",
+    "Results/time_weights.csv",
+]
+CONGESTION_TABLE = "congestion"
+AT_LIMIT_TOLERANCE = 0.001
+UTILIZATION_BINS = np.linspace(0, 1, 11)
+UTILIZATION_COLUMNS = [
+    f"Utilization {low:.0%}-{high:.0%}"
+    for low, high in zip(UTILIZATION_BINS[:-1], UTILIZATION_BINS[1:])
+]
+
+
+def read_hourly_flow(case):
+    """Line numbers and hourly flows from flow.csv.
+
+    Returns a list of lines and a float32 array with one row per hour and one
+    column per line. The "Total" column is not included.
+    """
+    path = case.results_folder / "flow.csv"
+    header = pd.read_csv(path, index_col=0, nrows=0)
+    lines = [int(line) for line in header.columns if line != "Total"]
+
+    # Skip the header and Sum rows
+    hourly = pd.read_csv(
+        path,
+        header=None,
+        skiprows=2,
+        usecols=range(1, len(lines) + 1),
+        dtype=np.float32,
+    ).to_numpy()
+
+    return lines, hourly
+
+
+def read_congestion_case(case):
+    lines, flow = read_hourly_flow(case)
+    prices = pd.read_csv(case.results_folder / "prices.csv", index_col=0)
+    expansion = pd.read_csv(case.results_folder / "network_expansion.csv")
+    new_capacity = expansion.set_index("Line")["New_Trans_Capacity"]
+    if flow.shape[0] != len(prices):
+        raise ValueError(
+            f"{case.folder.name} has {flow.shape[0]} hours of flows but "
+            f"{len(prices)} hours of prices"
+        )
+    weights = hour_weights(case, len(prices))
+
+    return lines, flow, prices, new_capacity, case_topology(case), weights
+
+
+def utilization_histogram(utilization, weights):
+    """Number of hours in each utilization bin for every line.
+
+    `utilization` is an (hours x lines) array and `weights` the number of hours
+    represented by each row. Returns an array of (lines x bins), counted for all
+    lines with a single bincount.
+    """
+    num_bins = len(UTILIZATION_BINS) - 1
+    bins = np.searchsorted(UTILIZATION_BINS[1:-1], utilization, side="right")
+    line_offsets = np.arange(utilization.shape[1]) * num_bins
+    counts = np.bincount(
+        (bins + line_offsets).ravel(),
+        weights=np.broadcast_to(weights[:, None], bins.shape).ravel(),
+        minlength=bins.size,
+    )
+
+    return counts[: utilization.shape[1] * num_bins].reshape(-1, num_bins)
+
+
+def calc_congestion_case(case_data):
+    """Congestion statistics of every line in a case.
+
+    Returns a dataframe indexed by Line.
+    """
+    lines, flow, prices, new_capacity, topology, weights = case_data
+
+    # Flows and the incidence matrix in the order of lines in Network.csv
+    flow = pd.DataFrame(flow, columns=lines)
+    flow = flow.reindex(columns=topology.lines, fill_value=0).to_numpy()
+    zone_prices = prices.rename(columns=lambda z: f"z{z}")[topology.zones]
+
+    # Incidence is 1 at the start and -1 at the end zone of a line
+    spread = -(topology.incidence.T @ zone_prices.to_numpy(dtype=np.float32).T).T
+    rent = flow * spread
+
+    limit = topology.base_capacity + new_capacity.reindex(topology.lines, fill_value=0)
+    limit = limit.to_numpy(dtype=np.float32)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        utilization = np.where(limit > 0, np.abs(flow) / limit, 0)
+    at_limit = (utilization >= 1 - AT_LIMIT_TOLERANCE) & (limit > 0)
+
+    df = pd.DataFrame(
+        {
+            "Path Name": topology.path_names.str.replace("_to_", " to ").to_numpy(),
+            "Limit (MW)": limit,
+            "Hours at limit": weighted_sum(at_limit, weights),
+            "Mean price spread ($/MWh)": weighted_mean(spread, weights),
+            "Mean abs price spread ($/MWh)": weighted_mean(np.abs(spread), weights),
+            "Congestion rent ($)": weighted_sum(rent, weights),
+            "Mean utilization": weighted_mean(utilization, weights),
+        },
+        index=pd.Index(topology.lines, name="Line"),
+    )
+    histogram = pd.DataFrame(
+        utilization_histogram(utilization, weights),
+        index=df.index,
+        columns=UTILIZATION_COLUMNS,
+    )
+
+    return pd.concat([df, histogram], axis=1)
+
+
+def congestion_results(year):
+    """Congestion statistics of every case and line in a year.
+
+    Returns a dataframe indexed by Case and Line with float32 values.
+    """
+    case_dfs = {}
+    cases = find_cases(year)
+    for case, case_data in read_case_files(
+        cases, read_congestion_case, CONGESTION_FILES
+    ):
+        case_dfs[case.description] = calc_congestion_case(case_data)
+    df = pd.concat(case_dfs, names=["Case"])
+    float_cols = df.select_dtypes("float").columns.drop("Congestion rent ($)")
+
+    return df.astype({col: np.float32 for col in float_cols})
+
+
+def write_congestion(years=None, db_path=DEFAULT_STORE):
+    "Replace the congestion statistics of each year in the results store"
+    years = find_years() if years is None else years
+    with connect(db_path) as con:
+        for year in years:
+            df = congestion_results(year).reset_index()
+            df.insert(0, "Year", year)
+            if table_exists(con, CONGESTION_TABLE):
+                con.execute(
+                    f"DELETE FROM {CONGESTION_TABLE} WHERE Year = ?", (int(year),)
+                )
+            df.to_sql(CONGESTION_TABLE, con, if_exists="append", index=False)
+        con.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{CONGESTION_TABLE} "
+            f'ON {CONGESTION_TABLE} (Year, "Case", Line)'
+        )
+        con.commit()
+
+
+def get_congestion(year=None, case=None, line=None, db_path=DEFAULT_STORE):
+    """Stored congestion statistics indexed by Year, Case, and Line.
+
+    Each filter can be a single value or a list of values.
+    """
+    conditions = []
+    params = []
+    for col, value in {"Year": year, "Case": case, "Line": line}.items():
+        if value is None:
+            continue
+        values = value if isinstance(value, (list, tuple)) else [value]
+        conditions.append(f'"{col}" IN ({",".join("?" * len(values))})')
+        params.extend(values)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with connect(db_path) as con:
+        df = pd.read_sql_query(
+            f"SELECT * FROM {CONGESTION_TABLE} {where}", con, params=params
+        )
+
+    return df.set_index(["Year", "Case", "Line"])
+
+
+@app.command()
+def build(year: Optional[int] = None, db_path: Path = DEFAULT_STORE):
+    "Calculate congestion statistics and save them to the results store"
+    years = find_years() if year is None else [year]
+    write_congestion(years, db_path)
+    print(f"Wrote congestion statistics for {years} to {db_path}")
+
+
+@app.command()
+def show(
+    column: str = "Hours at limit",
+    year: Optional[int] = None,
+    db_path: Path = DEFAULT_STORE,
+):
+    "Show one of the congestion statistics with a column for each case"
+    df = get_congestion(year=year, db_path=db_path).reset_index()
+    case_order = list(dict.fromkeys(df["Case"]))
+    wide = df.pivot_table(
+        index=["Year", "Line", "Path Name"], columns="Case", values=column
+    )
+    print(wide[case_order].to_string())
+
+
+if __name__ == "__main__":
+    app()
@@ -4,6 +4,13 @@ import shutil
 from pathlib import Path
 import textwrap
 
+from case_registry import parse_case_name
+from input_store import unlink_shared
+
+MAP_CASE_LIST = "map_cases.txt"
+MAP_SCRIPT = "Map.sh"
+DEFAULT_SUMMARY_DIR = "case_summaries"
+
 
 def find_all_sub_folders():
     cwd = Path.cwd()
@@ -19,9 +26,10 @@ def write_shell_script(dest_folder):
 
     # I'm just using the case ID here. You could use any part of the folder name
     # instead. Folder names are <case_id>_<year>_<case_description>
-    short_name = dest_folder.stem.split("_")[0]
+    case_id, year, description = parse_case_name(dest_folder.stem)
+    short_name = case_id
     # For example, the case description would be:
-    # short_name = "_".join(dest_folder.stem.split("_")[2:])
+    # short_name = description
 
     shell_text = textwrap.dedent(
         f"""\
@@ -57,9 +65,59 @@ def write_shell_script(dest_folder):
     # """
     )
     shell_file = dest_folder / "Run.sh"
+    # Cases made by bulk_edit may share files with their base case
+    unlink_shared(shell_file)
     shell_file.write_text(shell_text)
 
 
+def write_map_array_script(
+    case_folders, summary_dir=DEFAULT_SUMMARY_DIR, dest_folder=None, cases_per_task=1
+):
+    """Write a SLURM job array that summarizes the results of every case.
+
+    Case folders are listed in map_cases.txt and each task of the array in Map.sh
+    runs `distributed_compile.py map-array` on `cases_per_task` of them. Submit
+    Map.sh after the GenX runs are done and then run `distributed_compile.py
+    reduce` on the summaries. Raises a ValueError if there are no case folders.
+    """
+    if len(case_folders) == 0:
+        raise ValueError("No case folders to write a map job array for")
+    dest_folder = Path.cwd() if dest_folder is None else Path(dest_folder)
+    summary_dir = Path(summary_dir).resolve()
+    case_folders = sorted(Path(f).resolve() for f in case_folders)
+    num_tasks = -(-len(case_folders) // cases_per_task)
+    case_list = dest_folder / MAP_CASE_LIST
+    case_list.write_text("".join(f"{folder}\n" for folder in case_folders))
+    map_script = Path(__file__).resolve().parent / "distributed_compile.py"
+
+    shell_text = textwrap.dedent(
+        f"""\
+        #!/bin/bash
+
+        #SBATCH --job-name="map_results"       # Create a short name for your job
+        #SBATCH --time=1:00:00       # Set total runtime limit (HH:MM:SS)
+        #SBATCH --array=0-{num_tasks - 1}       # One task for every {cases_per_task} case(s)
+
+        #SBATCH --nodes=1             # Number of nodes
+        #SBATCH --ntasks=1            # Total number of tasks across all nodes
+        #SBATCH --cpus-per-task=1     # CPUs per task
+        #SBATCH --mem-per-cpu=4000      # memory per cpu-core
+
+        #SBATCH --output="{dest_folder}/map_results.%A_%a.out"  # Path to write output
+        #SBATCH --error="{dest_folder}/map_results.%A_%a.err"   # Path to error logs
+
+        module add anaconda3
+        conda activate powergenome
+
+        python {map_script} map-array {case_list} --summary-dir {summary_dir} --cases-per-task {cases_per_task}
+
+
+        date
+    """
+    )
+    (dest_folder / MAP_SCRIPT).write_text(shell_text)
+
+
 def copy_run_files():
     cwd = Path.cwd()
     subfolders = find_all_sub_folders()
@@ -68,10 +126,14 @@ def copy_run_files():
 
     for folder in subfolders:
         dest_file = folder / "Run.jl"
+        unlink_shared(dest_file)
         shutil.copyfile(source_file, dest_file)
 
         write_shell_script(folder)
 
+    if subfolders:
+        write_map_array_script(subfolders)
+
 
 if __name__ == "__main__":
     copy_run_files()
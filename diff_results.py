@@ -0,0 +1,156 @@
+"Compare two results stores and report the values that changed the most"
+
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import typer
+
+from results_store import STORE_TABLES, connect, table_exists, table_key_columns
+
+app = typer.Typer()
+
+
+def load_table(db_path, table):
+    # sqlite3 would create an empty store for a missing path, and every row in the
+    # other store would then be reported as added
+    if not Path(db_path).is_file():
+        raise FileNotFoundError(f"No results store at {db_path}")
+    with connect(db_path) as con:
+        if not table_exists(con, table):
+            return pd.DataFrame(columns=table_key_columns(table) + ["Value"])
+        return pd.read_sql_query(f"SELECT * FROM {table}", con)
+
+
+def _sum_by_keys(df, keys):
+    # Null keys (e.g. Region for network) are replaced so that they match in merges
+    df = df.copy()
+    df[keys] = df[keys].astype(object).where(df[keys].notna(), "")
+
+    return df.groupby(keys, sort=False)["Value"].sum()
+
+
+def diff_table(old, new, table):
+    """Align two versions of a stored table on its key columns.
+
+    Returns a dataframe with the key columns, the old and new values, the absolute
+    and relative change, and a Status of "added", "removed", or "changed". Rows
+    that are identical in both versions are not included.
+    """
+    keys = table_key_columns(table)
+    aligned = pd.concat(
+        [_sum_by_keys(old, keys), _sum_by_keys(new, keys)],
+        axis=1,
+        keys=["Old Value", "New Value"],
+    )
+    old_values = aligned["Old Value"].to_numpy(dtype=float)
+    new_values = aligned["New Value"].to_numpy(dtype=float)
+
+    delta = new_values - old_values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel_delta = delta / np.abs(old_values)
+    status = np.select(
+        [np.isnan(old_values), np.isnan(new_values), delta != 0],
+        ["added", "removed", "changed"],
+        default="",
+    )
+
+    aligned["Change"] = delta
+    aligned["Relative Change"] = rel_delta
+    aligned["Status"] = status
+    aligned = aligned.loc[status != "", :].reset_index()
+    aligned[keys] = aligned[keys].where(aligned[keys] != "", None)
+    aligned.insert(0, "Table", table)
+
+    return aligned
+
+
+def diff_stores(old_path, new_path, tables=None):
+    "Differences between two results stores for every table"
+    tables = STORE_TABLES if tables is None else tables
+    df_list = []
+    for table in tables:
+        diff = diff_table(
+            load_table(old_path, table), load_table(new_path, table), table
+        )
+        df_list.append(diff)
+
+    all_keys = list(dict.fromkeys(k for t in tables for k in table_key_columns(t)))
+    columns = (
+        ["Table"]
+        + all_keys
+        + [
+            "Old Value",
+            "New Value",
+            "Change",
+            "Relative Change",
+            "Status",
+        ]
+    )
+
+    return pd.concat(df_list, ignore_index=True, sort=False).reindex(columns=columns)
+
+
+def significant_changes(diff, rtol=1e-6, atol=0.0):
+    "Rows that were added/removed or changed by more than the tolerances"
+    old_values = diff["Old Value"].abs().fillna(0)
+    tolerance = atol + rtol * old_values
+    changed = diff["Change"].abs() > tolerance
+
+    return diff.loc[(diff["Status"] != "changed") | changed, :]
+
+
+def largest_movers(diff, n=20, relative=False):
+    "Rows with the largest absolute (or relative) changes"
+    col = "Relative Change" if relative else "Change"
+    order = (
+        diff[col]
+        .abs()
+        .replace(np.inf, np.nan)
+        .sort_values(ascending=False, na_position="last")
+    )
+
+    return diff.loc[order.index[:n], :]
+
+
+@app.command()
+def main(
+    old_store: Path = typer.Argument(..., exists=True, dir_okay=False),
+    new_store: Path = typer.Argument(..., exists=True, dir_okay=False),
+    table: Optional[List[str]] = None,
+    top: int = 20,
+    relative: bool = False,
+    rtol: float = 1e-6,
+    atol: float = 0.0,
+    output: Optional[Path] = None,
+    fail_on_change: bool = False,
+):
+    """Print the largest changes between two results stores.
+
+    With --fail-on-change the exit code is 1 if any value changed by more than the
+    tolerances, so the comparison can be used to check a rerun before release.
+    """
+    diff = diff_stores(old_store, new_store, tables=table or None)
+    diff = significant_changes(diff, rtol=rtol, atol=atol)
+
+    if output is not None:
+        diff.to_csv(output, index=False)
+
+    summary = diff.groupby(["Table", "Status"]).size()
+    if summary.empty:
+        print("No changes outside of the tolerances")
+    else:
+        print(summary.to_string())
+        print()
+        movers = largest_movers(diff, n=top, relative=relative).dropna(
+            axis=1, how="all"
+        )
+        print(movers.to_string(index=False))
+
+    if fail_on_change and not diff.empty:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
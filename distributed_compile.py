@@ -0,0 +1,240 @@
+"""Compile results with a map stage that runs where the case folders are and a
+reduce stage that merges the case summaries.
+
+The map stage summarizes each case with `compile_results.summarize_case` and
+saves it to <summary dir>/<year>/<case folder>.pkl. It can run as a SLURM job
+array (see `create_run_files.write_map_array_script`) or in local processes.
+The reduce stage only needs the summary folder.
+"""
+
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+
+from case_registry import CaseInfo, CaseRegistry, parse_case_name
+from compile_results import (
+    CASE_SUMMARY_FILES,
+    build_results,
+    calc_energy_cost,
+    results_carry_over,
+    summarize_case,
+    write_results_to_excel,
+)
+from create_run_files import DEFAULT_SUMMARY_DIR, write_map_array_script
+from network_topology import check_topologies
+from prefetch import file_size
+from progress import Progress
+
+app = typer.Typer()
+
+RESULTS_FILE = "compiled_results.pkl"
+
+
+def case_from_folder(folder):
+    folder = Path(folder).resolve()
+    case_id, year, description = parse_case_name(folder.name)
+
+    return CaseInfo(case_id, year, description, folder)
+
+
+def summary_path(summary_dir, case):
+    return Path(summary_dir) / str(case.year) / f"{case.folder.name}.pkl"
+
+
+def map_case(folder, summary_dir=DEFAULT_SUMMARY_DIR):
+    """Summarize the results of a case and save the summary.
+
+    The summary is written to a temporary file and then renamed so that the
+    reduce stage never reads a partial file. Returns the summary path.
+    """
+    case = case_from_folder(folder)
+    if case.year is None:
+        raise ValueError(f"Can't find the year in the case folder name {folder}")
+    summary = summarize_case(case)
+
+    path = summary_path(summary_dir, case)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(
+            {"folder": str(case.folder), "summary": summary},
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    tmp_path.replace(path)
+
+    return path
+
+
+def map_cases(folders, summary_dir=DEFAULT_SUMMARY_DIR, workers=1):
+    """Summarize every case folder, using `workers` processes.
+
+    Progress is reported from this process as each case finishes. Returns the
+    summary paths in the order of `folders`.
+    """
+    folders = list(folders)
+    sizes = [
+        sum(file_size(Path(folder) / f) for f in CASE_SUMMARY_FILES)
+        for folder in folders
+    ]
+    with Progress("Case summaries", len(folders)) as tracker:
+        if workers < 2:
+            paths = []
+            for folder, size in zip(folders, sizes):
+                paths.append(map_case(folder, summary_dir))
+                tracker.update(bytes_read=size, item=Path(folder).name)
+            return paths
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(map_case, folder, summary_dir): i
+                for i, folder in enumerate(folders)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                tracker.update(bytes_read=sizes[i], item=Path(folders[i]).name)
+
+        return [future.result() for future in futures]
+
+
+def read_summaries(summary_dir=DEFAULT_SUMMARY_DIR):
+    """Cases and case summaries of every year in `summary_dir`.
+
+    Returns a dictionary of year: (CaseRegistry, list of summaries). Cases have
+    the case folder paths recorded by the map stage and are ordered by folder,
+    the same as cases found by `find_cases`.
+    """
+    summaries = {}
+    year_folders = [f for f in Path(summary_dir).iterdir() if f.is_dir()]
+    for year_folder in year_folders:
+        if not year_folder.name.isdigit():
+            raise ValueError(
+                f"{year_folder} isn't a year, every case summary needs a year"
+            )
+    for year_folder in sorted(year_folders, key=lambda f: int(f.name)):
+        year_summaries = {}
+        for path in year_folder.glob("*.pkl"):
+            with open(path, "rb") as f:
+                item = pickle.load(f)
+            year_summaries[Path(item["folder"])] = item["summary"]
+        cases = CaseRegistry(year_summaries)
+        summaries[int(year_folder.name)] = (
+            cases,
+            [year_summaries[case.folder] for case in cases],
+        )
+
+    return summaries
+
+
+def reduce_summaries(summary_dir=DEFAULT_SUMMARY_DIR):
+    """Merge case summaries into total_dict and region_dict.
+
+    The results are the same as building them from the case folders in
+    `compile_results`, including costs carried over from the previous period.
+    """
+    total_dict, region_dict = {}, {}
+    prev_spur_costs = None
+    prev_tx_costs = None
+    for year, (cases, summaries) in read_summaries(summary_dir).items():
+        region_dict[year], total_dict[year] = build_results(
+            year, prev_spur_costs, prev_tx_costs, summaries=summaries, cases=cases
+        )
+        prev_spur_costs, prev_tx_costs = results_carry_over(
+            region_dict[year], total_dict[year]
+        )
+
+    return calc_energy_cost(total_dict, region_dict, sorted(total_dict))
+
+
+def find_case_folders(study_folders):
+    "Folders with a Results folder under any of the study folders"
+    folders = []
+    for study_folder in study_folders:
+        folders.extend(case.folder for case in CaseRegistry.from_results(study_folder))
+
+    return folders
+
+
+@app.command("map-case")
+def map_case_command(folder: Path, summary_dir: Path = Path(DEFAULT_SUMMARY_DIR)):
+    "Summarize the results of a single case folder"
+    print(map_case(folder, summary_dir))
+
+
+@app.command("map-array")
+def map_array(
+    case_list: Path,
+    summary_dir: Path = Path(DEFAULT_SUMMARY_DIR),
+    task_id: Optional[int] = None,
+    cases_per_task: int = 1,
+):
+    """Summarize the cases of one task in a job array.
+
+    Cases are the lines of `case_list` and the task id is SLURM_ARRAY_TASK_ID
+    unless --task-id is given.
+    """
+    if task_id is None:
+        task_id = int(os.environ["SLURM_ARRAY_TASK_ID"])
+    folders = [line for line in case_list.read_text().splitlines() if line.strip()]
+    start = task_id * cases_per_task
+    for path in map_cases(folders[start : start + cases_per_task], summary_dir):
+        print(path)
+
+
+@app.command("map-local")
+def map_local(
+    study_folders: List[Path],
+    summary_dir: Path = Path(DEFAULT_SUMMARY_DIR),
+    workers: int = 4,
+):
+    "Summarize every case under the study folders using local processes"
+    folders = find_case_folders(study_folders)
+    cases = [case_from_folder(f) for f in folders]
+    for year in sorted({case.year for case in cases}):
+        check_topologies([case for case in cases if case.year == year])
+    paths = map_cases(folders, summary_dir, workers=workers)
+    print(f"Wrote {len(paths)} case summaries to {summary_dir}")
+
+
+@app.command("write-array")
+def write_array(
+    study_folders: List[Path],
+    summary_dir: Path = Path(DEFAULT_SUMMARY_DIR),
+    cases_per_task: int = 1,
+):
+    "Write Map.sh and map_cases.txt for the cases under the study folders"
+    folders = [
+        f.parent
+        for study_folder in study_folders
+        for f in Path(study_folder).rglob("GenX_settings.yml")
+        if f.parent != Path(study_folder)
+    ]
+    if not folders:
+        raise typer.BadParameter("No case folders (with GenX_settings.yml) found")
+    write_map_array_script(folders, summary_dir, cases_per_task=cases_per_task)
+
+
+@app.command()
+def reduce(
+    summary_dir: Path = Path(DEFAULT_SUMMARY_DIR),
+    excel: bool = True,
+    results_file: Path = Path(RESULTS_FILE),
+):
+    """Merge case summaries into the WECC and regional results.
+
+    total_dict and region_dict are saved to `results_file` (a pickle) and written
+    to the usual Excel files.
+    """
+    total_dict, region_dict = reduce_summaries(summary_dir)
+    with open(results_file, "wb") as f:
+        pickle.dump((total_dict, region_dict), f, protocol=pickle.HIGHEST_PROTOCOL)
+    if excel:
+        write_results_to_excel(total_dict, region_dict)
+
+
+if __name__ == "__main__":
+    app()
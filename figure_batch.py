@@ -0,0 +1,115 @@
+"Plan and render batches of figures for named case groups from a YAML config"
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, NamedTuple, Tuple
+
+from figure_data import FIGURE_DATASETS
+
+DEFAULT_FIGURE_CONFIG = "figures.yml"
+FIGURE_WORKERS = 4
+
+# Figures with one file per year. Other figures show every year in one file.
+YEARLY_FIGURES = ["cost_co2_cap_energy"]
+
+
+class FigureTask(NamedTuple):
+    figure: str
+    group: str
+    case_list: List[str]
+    years: Tuple[int, ...]
+    file_name: str
+
+
+def load_figure_config(path=DEFAULT_FIGURE_CONFIG, cases=None):
+    """Read case groups, years and figure types from a YAML file.
+
+    Each entry under `groups` is either a list of case names or a mapping with
+    `cases` and optional `years`/`figures` that override the top-level values.
+    If the file doesn't exist, all `cases` are drawn as a single group named
+    "all".
+    """
+    path = Path(path)
+    if not path.exists():
+        print(f"{path} not found, drawing all cases in one group")
+        return {"groups": {"all": list(cases or [])}, "years": None, "figures": None}
+
+    import yaml
+
+    config = yaml.safe_load(path.read_text()) or {}
+    if not config.get("groups"):
+        raise ValueError(f"{path} does not have any case groups")
+    unknown = set(config.get("figures") or []) - set(FIGURE_DATASETS)
+    for group in config["groups"].values():
+        if isinstance(group, dict):
+            unknown.update(set(group.get("figures") or []) - set(FIGURE_DATASETS))
+    if unknown:
+        raise ValueError(
+            f"Unknown figure types {sorted(unknown)} in {path}. Valid types are "
+            f"{list(FIGURE_DATASETS)}"
+        )
+
+    return {
+        "groups": config["groups"],
+        "years": config.get("years"),
+        "figures": config.get("figures"),
+    }
+
+
+def build_work_plan(config, years, cases=None):
+    """List the figures to draw for every case group.
+
+    `years` are the years with results. Years in the config that don't have
+    results are skipped with a warning. If `cases` is given, a warning is printed
+    for case names in a group that aren't in the results.
+    """
+    tasks = []
+    for group, group_config in config["groups"].items():
+        if not isinstance(group_config, dict):
+            group_config = {"cases": group_config}
+        case_list = list(group_config["cases"])
+        group_years = group_config.get("years") or config["years"] or years
+        figures = group_config.get("figures") or config["figures"] or FIGURE_DATASETS
+
+        missing_years = [y for y in group_years if y not in years]
+        if missing_years:
+            print(f"No results for years {missing_years}, skipping them for {group}")
+        group_years = [y for y in group_years if y in years]
+        if cases is not None:
+            missing_cases = [c for c in case_list if c not in cases]
+            if missing_cases:
+                print(f"Cases {missing_cases} in {group} are not in the results")
+        if not group_years:
+            continue
+
+        for figure in figures:
+            if figure in YEARLY_FIGURES:
+                for year in group_years:
+                    file_name = f"{group}_{figure}_{year}.png"
+                    tasks.append(
+                        FigureTask(figure, group, case_list, (year,), file_name)
+                    )
+            else:
+                file_name = f"{group}_{figure}.png"
+                tasks.append(
+                    FigureTask(figure, group, case_list, tuple(group_years), file_name)
+                )
+
+    return tasks
+
+
+def run_work_plan(tasks, render_task, workers=FIGURE_WORKERS, progress=None):
+    """Call `render_task(task)` for every task using `workers` threads.
+
+    Most of the time saving a figure is spent in the browser/renderer outside of
+    Python, so threads let several figures render at once while sharing the same
+    tidy data. Returns a list of the `render_task` results in the order of tasks.
+    Finished tasks are counted by `progress` (a `progress.Progress`) if given.
+    """
+    if workers < 2:
+        results = map(render_task, tasks)
+        return list(results if progress is None else progress.track(results))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(render_task, tasks)
+        return list(results if progress is None else progress.track(results))
@@ -0,0 +1,275 @@
+"Tidy figure data once per year and skip figures whose data haven't changed"
+
+import hashlib
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from case_registry import find_cases
+from network_topology import case_topology
+
+FIGURE_CACHE_DIR = ".figure_cache"
+
+# Datasets used by each figure. Datasets in YEARLY_DATASETS are tidied separately
+# for each year.
+FIGURE_DATASETS = {
+    "cost_co2_cap_energy": ["final_capacity", "tidy_energy", "energy_cost_emissions"],
+    "transmission_spur_costs": ["network_periods", "spur_periods"],
+    "capacity_changes": ["capacity_changes"],
+    "tx_expansion": ["tx_segments"],
+}
+YEARLY_DATASETS = [
+    "tidy_capacity",
+    "final_capacity",
+    "capacity_changes",
+    "tidy_energy",
+    "energy_cost_emissions",
+]
+
+
+def make_data_tidy(df, value_name, id_vars=["Resource Name"]):
+    tidy = df.reset_index().melt(
+        id_vars=id_vars, var_name="Case", value_name=value_name
+    )
+    return tidy
+
+
+class FigureData:
+    """Data used by the figure functions, built from total_dict and region_dict.
+
+    Each dataset is tidied the first time it is requested and then reused by every
+    figure and case list. The source dictionaries are not modified.
+    """
+
+    def __init__(self, total_dict, region_dict, resource_order):
+        self.total_dict = total_dict
+        self.region_dict = region_dict
+        self.resource_order = resource_order
+        self.years = sorted(total_dict)
+        self._cache = {}
+
+    def _cached(self, name, year, func):
+        if (name, year) not in self._cache:
+            self._cache[(name, year)] = func()
+
+        return self._cache[(name, year)]
+
+    def tidy_capacity(self, year):
+        "Capacity of every category by resource and case"
+
+        def func():
+            tidy_cap = make_data_tidy(
+                self.total_dict[year]["capacity"],
+                "Capacity (MW)",
+                ["Resource Name", "Category"],
+            )
+            tidy_cap["Capacity (GW)"] = tidy_cap["Capacity (MW)"] / 1000
+            tidy_cap["idx"] = tidy_cap["Resource Name"].map(self.resource_order)
+
+            return tidy_cap
+
+        return self._cached("tidy_capacity", year, func)
+
+    def final_capacity(self, year):
+        def func():
+            tidy_cap = self.tidy_capacity(year)
+            return tidy_cap.loc[tidy_cap["Category"] == "Final Capacity", :]
+
+        return self._cached("final_capacity", year, func)
+
+    def capacity_changes(self, year):
+        "New capacity (positive) and retired capacity (negative)"
+
+        def func():
+            tidy_cap = self.tidy_capacity(year)
+            data = tidy_cap.loc[
+                tidy_cap.Category.isin(["New Capacity", "Retired Capacity"]), :
+            ].copy()
+            data.loc[data.Category == "Retired Capacity", "Capacity (MW)"] *= -1
+
+            return data
+
+        return self._cached("capacity_changes", year, func)
+
+    def tidy_energy(self, year):
+        def func():
+            tidy_energy = make_data_tidy(
+                self.total_dict[year]["energy"], "Energy (MWh)"
+            )
+            tidy_energy["idx"] = tidy_energy["Resource Name"].map(self.resource_order)
+
+            return tidy_energy
+
+        return self._cached("tidy_energy", year, func)
+
+    def energy_cost_emissions(self, year):
+        def func():
+            energy_cost_emissions = self.total_dict[year]["energy_cost"].merge(
+                self.total_dict[year]["emissions"], on="Case"
+            )
+            energy_cost_emissions["GT CO2"] = energy_cost_emissions["MT CO2"] / 1000
+
+            return energy_cost_emissions
+
+        return self._cached("energy_cost_emissions", year, func)
+
+    def _years(self, years):
+        return tuple(self.years if years is None else years)
+
+    def network_periods(self, years=None):
+        "Total transmission expansion and cost of each case in every period"
+        years = self._years(years)
+
+        def func():
+            df_list = []
+            for year in years:
+                network = self.total_dict[year]["network"].reset_index()
+                network["Period"] = year
+                df_list.append(network)
+            data = pd.concat(df_list)
+            data["Cost_Trans_Capacity_Mil"] = data["Cost_Trans_Capacity"] / 1e6
+
+            return data
+
+        return self._cached("network_periods", years, func)
+
+    def spur_periods(self, years=None):
+        "Total spur line expansion and cost of each case in every period"
+        years = self._years(years)
+
+        def func():
+            df_list = []
+            for year in years:
+                spur = self.total_dict[year]["spur_line"].reset_index()
+                spur["Period"] = year
+                df_list.append(spur)
+            data_spur = pd.concat(df_list)
+            data_spur["Spur Line Inv Cost Million"] = (
+                data_spur["Spur Line Inv Cost"] / 1e6
+            )
+            data_spur["Spur Line GW-Miles"] = data_spur["Spur Line MW-Miles"] / 1000
+
+            return data_spur
+
+        return self._cached("spur_periods", years, func)
+
+    def tx_segments(self, years=None):
+        """Capacity of each transmission path at the start and end of every period.
+
+        Starting capacity of each case is from its network in the first year.
+        Capacity is carried through every year with results, but only the start
+        and `years` are included.
+        """
+        years = self._years(years)
+
+        def func():
+            first_year = min(self.region_dict.keys())
+            start_tx_capacity = []
+            for case in find_cases(first_year):
+                start_tx_capacity.extend(case_topology(case).base_capacity.tolist())
+
+            chart_tx_segments = self.region_dict[first_year]["network"].copy()
+            chart_tx_segments.loc[:, "Transmission Capacity (MW)"] = start_tx_capacity
+            chart_tx_segments["year"] = "Start"
+            start_tx_capacity = chart_tx_segments["Transmission Capacity (MW)"].values
+
+            df_list = [chart_tx_segments]
+            for year, year_dict in self.region_dict.items():
+                df = year_dict["network"].copy()
+                df.loc[:, "Transmission Capacity (MW)"] = (
+                    df.loc[:, "New_Trans_Capacity"] + start_tx_capacity
+                )
+                df["year"] = year
+
+                # Set start_tx_capacity to new value for next planning period
+                start_tx_capacity = df["Transmission Capacity (MW)"].values
+                if year in years:
+                    df_list.append(df)
+
+            return pd.concat(df_list).reset_index()
+
+        return self._cached("tx_segments", years, func)
+
+    def datasets(self, names, years=None):
+        "Yield each named dataset for `years` (every year if None)"
+        years = self._years(years)
+        for name in names:
+            if name in YEARLY_DATASETS:
+                for year in years:
+                    yield getattr(self, name)(year)
+            else:
+                yield getattr(self, name)(years)
+
+    def figure_key(self, figure, case_list, years=None, **params):
+        """Hash of the data in a figure.
+
+        Only rows for cases in `case_list` are included, so changes to other cases
+        don't cause the figure to be drawn again.
+        """
+        frames = [
+            df.loc[df["Case"].isin(case_list), :]
+            for df in self.datasets(FIGURE_DATASETS[figure], years)
+        ]
+
+        return data_hash(figure, list(case_list), self._years(years), params, *frames)
+
+
+def data_hash(*parts):
+    """Hash of dataframes and other json serializable figure parameters.
+
+    Used as the key for a figure so that it is only rendered again if any of the
+    data or parameters change.
+    """
+    key_hash = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            key_hash.update(repr(list(part.columns)).encode())
+            key_hash.update(pd.util.hash_pandas_object(part, index=True).values)
+        else:
+            key_hash.update(json.dumps(part, sort_keys=True, default=str).encode())
+
+    return key_hash.hexdigest()
+
+
+class FigureCache:
+    """Vega-Lite specs of saved figures, keyed by a hash of the figure data.
+
+    The spec and data hash of each figure are stored in `cache_dir` as
+    <file name>.json.
+    """
+
+    def __init__(self, cache_dir=FIGURE_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def _spec_path(self, file_name):
+        return self.cache_dir / f"{Path(file_name).name}.json"
+
+    def is_current(self, file_name, key):
+        spec_path = self._spec_path(file_name)
+        if not (Path(file_name).exists() and spec_path.exists()):
+            return False
+        try:
+            cached = json.loads(spec_path.read_text())
+        except ValueError:
+            return False
+
+        return cached.get("key") == key
+
+    def update(self, file_name, key, spec):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._spec_path(file_name).write_text(json.dumps({"key": key, "spec": spec}))
+
+    def render(self, file_name, key, make_chart, scale_factor=2, force=False):
+        """Save the chart from `make_chart()` unless the cached key matches.
+
+        Returns True if the figure was rendered and False if it was skipped.
+        """
+        if not force and self.is_current(file_name, key):
+            return False
+
+        chart = make_chart()
+        chart.save(file_name, scale_factor=scale_factor, webdriver="firefox")
+        self.update(file_name, key, chart.to_dict())
+
+        return True
@@ -0,0 +1,211 @@
+"Hourly dispatch stacks, net load and price duration curves, and curtailment"
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import typer
+from scipy import sparse
+
+from case_registry import find_cases
+from compile_results import ZONE_MAP, find_years, map_resource_name
+from input_store import read_input_csv
+from prefetch import read_case_files
+from time_weights import hour_weights
+
+app = typer.Typer()
+
+VRE_GROUPS = ["Solar", "Onshore Wind", "Offshore Wind"]
+HOURLY_FILES = [
+    "Results/power.csv",
+    "Results/prices.csv",
+    "Results/capacity.csv",
+    "Inputs/Load_data.csv",
+    "Inputs/Generators_variability.csv",
+    "Results/time_weights.csv",
+]
+
+
+def read_power_timeseries(case):
+    """Resource names/zones and the hourly generation from power.csv.
+
+    Returns a dataframe of resources (Resource, Zone, Region, Resource Name) and a
+    float32 array of generation with one row per hour and one column per resource.
+    The "Total" column is not included.
+    """
+    path = case.results_folder / "power.csv"
+    resources = pd.read_csv(path, header=None, index_col=0, nrows=2).T
+    resources = resources.loc[resources["Resource"] != "Total", :]
+    resources["Zone"] = resources["Zone"].astype(int)
+    resources["Region"] = resources["Zone"].map(ZONE_MAP)
+    resources = map_resource_name(resources)
+    resources["Resource Name"] = resources["Resource Name"].fillna("Other")
+
+    # Skip the Resource, Zone, and Sum rows
+    hourly = pd.read_csv(
+        path,
+        header=None,
+        skiprows=3,
+        usecols=resources.index.to_list(),
+        dtype=np.float32,
+    ).to_numpy()
+
+    return resources.reset_index(drop=True), hourly
+
+
+def group_matrix(labels):
+    """Sparse matrix that sums columns with the same label.
+
+    `labels` has one value per resource. Multiplying an (hours x resources) array
+    by the matrix gives an (hours x groups) array. Returns the matrix and the
+    unique labels in the order of the matrix columns.
+    """
+    codes, groups = pd.factorize(labels)
+    num_resources = len(codes)
+    matrix = sparse.csr_matrix(
+        (np.ones(num_resources, dtype=np.float32), (np.arange(num_resources), codes)),
+        shape=(num_resources, len(groups)),
+    )
+
+    return matrix, groups
+
+
+def zone_columns(df, prefix=""):
+    "Rename columns like <prefix><zone number> to region names"
+    return df.rename(columns=lambda col: ZONE_MAP.get(int(col[len(prefix) :]), col))
+
+
+def read_hourly_case(case):
+    resources, hourly = read_power_timeseries(case)
+
+    prices = pd.read_csv(case.results_folder / "prices.csv", index_col=0)
+    load = read_input_csv(case.inputs_folder / "Load_data.csv")
+    load = load.filter(like="Load_MW_z")
+
+    capacity = pd.read_csv(case.results_folder / "capacity.csv")
+    capacity = capacity.loc[capacity["Resource"] != "Total", :]
+    variability = read_input_csv(
+        case.inputs_folder / "Generators_variability.csv",
+        usecols=resources["Resource"].to_list(),
+        dtype=np.float32,
+    )
+    available = variability[resources["Resource"]].to_numpy() * capacity[
+        "EndCap"
+    ].to_numpy(dtype=np.float32)
+    weights = hour_weights(case, hourly.shape[0])
+
+    return resources, hourly, prices, load, available, weights
+
+
+def calc_hourly_case(case_data):
+    """Hourly results for a single case.
+
+    Returns a dictionary with a dataframe of dispatch by region and resource
+    group, dataframes of net load, price, and VRE curtailment by region, and the
+    weight of each hour.
+    """
+    resources, hourly, prices, load, available, weights = case_data
+    num_hours = hourly.shape[0]
+    hours = pd.RangeIndex(1, num_hours + 1, name="Hour")
+
+    group_labels = pd.MultiIndex.from_frame(resources[["Region", "Resource Name"]])
+    group_sum, groups = group_matrix(group_labels)
+    dispatch = pd.DataFrame(
+        hourly @ group_sum, index=hours, columns=pd.MultiIndex.from_tuples(groups)
+    )
+    dispatch.columns.names = ["Region", "Resource Name"]
+
+    # VRE generation and curtailment are summed to regions with one matrix
+    is_vre = resources["Resource Name"].isin(VRE_GROUPS).to_numpy()
+    region_sum, regions = group_matrix(resources["Region"])
+    vre_region_sum = sparse.diags(is_vre.astype(np.float32)) @ region_sum
+    vre_gen = pd.DataFrame(hourly @ vre_region_sum, index=hours, columns=regions)
+    curtailment = pd.DataFrame(
+        np.clip(available - hourly, 0, None) @ vre_region_sum,
+        index=hours,
+        columns=regions,
+    )
+
+    load = zone_columns(load, "Load_MW_z").iloc[:num_hours]
+    load.index = hours
+    net_load = load - vre_gen.reindex(columns=load.columns, fill_value=0)
+
+    prices = zone_columns(prices).iloc[:num_hours]
+    prices.index = hours
+
+    return {
+        "dispatch": dispatch,
+        "net_load": net_load,
+        "prices": prices,
+        "curtailment": curtailment,
+        "weights": weights,
+    }
+
+
+def duration_curve(df, weights=None):
+    """Sort each column from highest to lowest value.
+
+    With `weights` (the hours represented by each row), each value is repeated
+    for the number of hours it represents, so that curves from cases with
+    representative periods are on the same 1 to 8760 hour scale as full year
+    cases. Returns a dataframe indexed by Hour (the number of hours with an equal
+    or higher value).
+    """
+    values = df.to_numpy()
+    if weights is None:
+        weights = np.ones(len(df))
+    order = np.argsort(-values, axis=0, kind="stable")
+    sorted_values = np.take_along_axis(values, order, axis=0)
+    cumulative_hours = np.cumsum(np.asarray(weights)[order], axis=0)
+
+    hours = np.arange(1, int(round(cumulative_hours[-1].max())) + 1)
+    curve = np.empty((len(hours), values.shape[1]), dtype=values.dtype)
+    for col in range(values.shape[1]):
+        idx = np.searchsorted(cumulative_hours[:, col], hours - 0.5)
+        curve[:, col] = sorted_values[np.minimum(idx, len(df) - 1), col]
+
+    return pd.DataFrame(curve, index=pd.Index(hours, name="Hour"), columns=df.columns)
+
+
+def hourly_results(year):
+    """Hourly results for every case in a year.
+
+    Returns a dictionary of dataframes indexed by Case and Hour: dispatch,
+    net_load_duration, price_duration (weighted by the hours each modeled hour
+    represents), and curtailment. Cases are read and reduced one at a time so
+    only the reduced results from earlier cases are kept in memory.
+    """
+    results = {
+        "dispatch": {},
+        "net_load_duration": {},
+        "price_duration": {},
+        "curtailment": {},
+    }
+    cases = find_cases(year)
+    for case, case_data in read_case_files(cases, read_hourly_case, HOURLY_FILES):
+        case_results = calc_hourly_case(case_data)
+        results["dispatch"][case.description] = case_results["dispatch"]
+        results["net_load_duration"][case.description] = duration_curve(
+            case_results["net_load"], case_results["weights"]
+        )
+        results["price_duration"][case.description] = duration_curve(
+            case_results["prices"], case_results["weights"]
+        )
+        results["curtailment"][case.description] = case_results["curtailment"]
+
+    return {
+        name: pd.concat(case_dfs, names=["Case"]) for name, case_dfs in results.items()
+    }
+
+
+@app.command()
+def main(year: Optional[int] = None):
+    "Write hourly results for each year to csv files"
+    years = find_years() if year is None else [year]
+    for year in years:
+        for name, df in hourly_results(year).items():
+            df.to_csv(f"hourly_{name}_{year}.csv")
+
+
+if __name__ == "__main__":
+    app()
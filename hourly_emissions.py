@@ -0,0 +1,212 @@
+"""Hourly zonal CO2 emissions and average/marginal CO2 intensity of generation.
+
+Emissions are from the timeseries rows of emissions.csv and generation from
+power.csv. The marginal resource in a zone and hour is the resource with the
+highest variable cost (variable O&M plus fuel) that is generating, and the
+marginal intensity is its emission rate (heat rate x fuel CO2 content from
+Fuels_data.csv).
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import typer
+
+from case_registry import find_cases
+from compile_results import ZONE_MAP, find_years
+from hourly_analytics import group_matrix, read_power_timeseries
+from input_store import read_input_csv
+from prefetch import read_case_files
+from time_weights import hour_weights
+
+app = typer.Typer()
+
+EMISSIONS_FILES = [
+    "Results/power.csv",
+    "Results/emissions.csv",
+    "Inputs/Generators_data.csv",
+    "Inputs/Fuels_data.csv",
+    "Results/time_weights.csv",
+]
+GEN_COLUMNS = ["Resource", "Fuel", "Heat_Rate_MMBTU_per_MWh", "Var_OM_Cost_per_MWh"]
+
+
+def read_emissions_timeseries(case):
+    """Zone numbers and hourly emissions from emissions.csv.
+
+    Returns a list of zones and a float32 array with one row per hour and one
+    column per zone. The "Total" column is not included.
+    """
+    path = case.results_folder / "emissions.csv"
+    header = pd.read_csv(path, header=None, index_col=0, nrows=1)
+    zones = [int(float(z)) for z in header.iloc[0] if str(z) != "Total"]
+
+    # Skip the Zone and Sum rows
+    hourly = pd.read_csv(
+        path,
+        header=None,
+        skiprows=2,
+        usecols=range(1, len(zones) + 1),
+        dtype=np.float32,
+    ).to_numpy()
+
+    return zones, hourly
+
+
+def resource_costs(case, resources, num_hours):
+    """Hourly variable cost ($/MWh) and emission rate (t/MWh) of each resource.
+
+    Returns a float32 array of costs (hours x resources) and an array of emission
+    rates, or None for both if the case doesn't have fuel data.
+    """
+    fuels_path = case.inputs_folder / "Fuels_data.csv"
+    gen_data = read_input_csv(case.inputs_folder / "Generators_data.csv")
+    if not fuels_path.exists() or not set(GEN_COLUMNS).issubset(gen_data.columns):
+        return None, None
+
+    gen_data = gen_data.set_index("Resource").reindex(resources["Resource"])
+    # "None" (no fuel) is read as a missing value
+    fuel_names = gen_data["Fuel"].fillna("None").astype(str)
+    # The first row of Fuels_data.csv is the CO2 content (t/MMBtu) of each fuel
+    # and the rest are hourly fuel prices ($/MMBtu)
+    fuels = read_input_csv(fuels_path, index_col=0).fillna(0)
+    fuel_idx = fuels.columns.get_indexer(fuel_names)
+    if (fuel_idx < 0).any():
+        missing = sorted(set(fuel_names) - set(fuels.columns))
+        raise ValueError(f"Fuels {missing} are not in {fuels_path}")
+
+    heat_rate = gen_data["Heat_Rate_MMBTU_per_MWh"].fillna(0).to_numpy(np.float32)
+    var_om = gen_data["Var_OM_Cost_per_MWh"].fillna(0).to_numpy(np.float32)
+    co2_content = fuels.iloc[0].to_numpy(np.float32)
+    fuel_prices = fuels.iloc[1 : num_hours + 1].to_numpy(np.float32)
+
+    costs = var_om + fuel_prices[:, fuel_idx] * heat_rate
+    emission_rates = heat_rate * co2_content[fuel_idx]
+
+    return costs, emission_rates
+
+
+def read_emissions_case(case):
+    resources, hourly_power = read_power_timeseries(case)
+    zones, hourly_emissions = read_emissions_timeseries(case)
+    costs, emission_rates = resource_costs(case, resources, hourly_power.shape[0])
+    weights = hour_weights(case, hourly_power.shape[0])
+
+    return (
+        resources,
+        hourly_power,
+        zones,
+        hourly_emissions,
+        costs,
+        emission_rates,
+        weights,
+    )
+
+
+def marginal_intensity(hourly_power, resource_zones, zones, costs, emission_rates):
+    """Emission rate of the highest cost resource generating in each zone and hour.
+
+    Returns a float32 array (hours x zones), with NaN where no resource in the
+    zone is generating.
+    """
+    num_hours = hourly_power.shape[0]
+    marginal = np.full((num_hours, len(zones)), np.nan, dtype=np.float32)
+    generating = hourly_power > 0
+    for col, zone in enumerate(zones):
+        in_zone = np.flatnonzero(resource_zones == zone)
+        if len(in_zone) == 0:
+            continue
+        zone_costs = np.where(generating[:, in_zone], costs[:, in_zone], -np.inf)
+        marginal_idx = zone_costs.argmax(axis=1)
+        has_marginal = np.isfinite(zone_costs[np.arange(num_hours), marginal_idx])
+        marginal[has_marginal, col] = emission_rates[in_zone][
+            marginal_idx[has_marginal]
+        ]
+
+    return marginal
+
+
+def calc_emissions_case(case_name, case_data):
+    """Hourly emissions, generation and CO2 intensity by zone for a case.
+
+    Returns a long dataframe with one row per zone and hour. The Weight column
+    is the number of hours represented by each hour, to calculate annual totals.
+    """
+    resources, hourly_power, zones, hourly_emissions, costs, rates, weights = case_data
+    num_hours = hourly_power.shape[0]
+
+    # Sum positive generation (not storage charging) of resources in each zone
+    zone_sum, power_zones = group_matrix(resources["Zone"])
+    generation = (
+        pd.DataFrame(np.clip(hourly_power, 0, None) @ zone_sum, columns=power_zones)
+        .reindex(columns=zones, fill_value=0)
+        .to_numpy(np.float32)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = np.where(generation > 0, hourly_emissions / generation, np.nan)
+
+    if costs is None:
+        print(f"No fuel data for {case_name}, marginal CO2 is empty")
+        marginal = np.full_like(average, np.nan)
+    else:
+        marginal = marginal_intensity(
+            hourly_power, resources["Zone"].to_numpy(), zones, costs, rates
+        )
+
+    # Values are ordered by zone and then hour
+    zone_values = np.repeat(np.array(zones, dtype=np.int16), num_hours)
+    return pd.DataFrame(
+        {
+            "Case": case_name,
+            "Zone": zone_values,
+            "Region": pd.Series(zone_values).map(ZONE_MAP).to_numpy(),
+            "Hour": np.tile(np.arange(1, num_hours + 1, dtype=np.int16), len(zones)),
+            "Weight": np.tile(weights.astype(np.float32), len(zones)),
+            "Emissions (t)": hourly_emissions.T.ravel(),
+            "Generation (MWh)": generation.T.ravel(),
+            "Average CO2 (t/MWh)": average.T.ravel().astype(np.float32),
+            "Marginal CO2 (t/MWh)": marginal.T.ravel(),
+        }
+    )
+
+
+def write_hourly_emissions(year, file_name=None):
+    """Write hourly emissions and CO2 intensity of every case in a year to Parquet.
+
+    Each case is written as a row group as soon as it is calculated, so only one
+    case (plus the cases being read ahead) is kept in memory. Returns the file
+    name.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    file_name = file_name or f"hourly_emissions_{year}.parquet"
+    writer = None
+    try:
+        cases = find_cases(year)
+        for case, case_data in read_case_files(
+            cases, read_emissions_case, EMISSIONS_FILES
+        ):
+            df = calc_emissions_case(case.description, case_data)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(file_name, table.schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return file_name
+
+
+@app.command()
+def main(year: Optional[int] = None):
+    "Write hourly emissions and CO2 intensity for each year to Parquet files"
+    years = find_years() if year is None else [year]
+    for year in years:
+        print(f"Wrote {write_hourly_emissions(year)}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,277 @@
+"""Share identical Inputs files across cases and parse each unique file once.
+
+`dedupe_inputs` hashes the contents of every file in the Inputs folders of a
+study and replaces duplicates with hard links (or symlinks) to a single copy in
+<study>/.input_store. `content_hash` and `read_input_csv` use a hash index so
+that scripts reading inputs only parse each unique file once, whether or not
+the files have been deduplicated.
+"""
+
+import hashlib
+import os
+import shutil
+import stat
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import typer
+
+app = typer.Typer()
+
+STORE_DIR = ".input_store"
+INDEX_FILE = "index.csv"
+INDEX_COLUMNS = ["path", "hash", "size", "mtime_ns", "device", "inode"]
+HASH_WORKERS = 8
+LINK_TYPES = ["hard", "symlink"]
+# Maximum memory (in bytes) used by parsed dataframes. The least recently used
+# dataframes are removed when it is exceeded.
+FRAME_CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+# Content hashes keyed by (device, inode, size, modification time), so hard
+# linked or symlinked copies of a file are only hashed once. Parsed dataframes are
+# keyed by the content hash and read_csv arguments, with their size in bytes.
+_HASHES = {}
+_FRAMES = OrderedDict()
+_FRAME_BYTES = 0
+_FRAME_LOCKS = {}
+_LOCK = threading.Lock()
+_INDEX_LOADED = set()
+
+
+def configure(max_mb=None):
+    "Change the memory ceiling of parsed dataframes (0 doesn't keep any)"
+    global FRAME_CACHE_MAX_BYTES
+    if max_mb is not None:
+        FRAME_CACHE_MAX_BYTES = int(max_mb * 1024 ** 2)
+        with _LOCK:
+            _evict_frames()
+
+
+def _evict_frames():
+    "Remove the least recently used dataframes until they fit. Hold _LOCK."
+    global _FRAME_BYTES
+    while _FRAMES and _FRAME_BYTES > FRAME_CACHE_MAX_BYTES:
+        key, (df, size) = _FRAMES.popitem(last=False)
+        _FRAME_BYTES -= size
+        _FRAME_LOCKS.pop(key, None)
+
+
+def _file_key(file_stat):
+    return (
+        file_stat.st_dev,
+        file_stat.st_ino,
+        file_stat.st_size,
+        file_stat.st_mtime_ns,
+    )
+
+
+def hash_file(path, chunk_size=2 ** 20):
+    file_hash = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+
+def load_index(root=None):
+    """Add the hashes in <root>/.input_store/index.csv to the hash index.
+
+    Entries for files that were modified after the index was written don't match
+    and the files are hashed again.
+    """
+    index_path = (Path.cwd() if root is None else Path(root)) / STORE_DIR / INDEX_FILE
+    if index_path in _INDEX_LOADED:
+        return
+    _INDEX_LOADED.add(index_path)
+    if not index_path.exists():
+        return
+    index = pd.read_csv(index_path)
+    keys = zip(index["device"], index["inode"], index["size"], index["mtime_ns"])
+    with _LOCK:
+        _HASHES.update(zip(keys, index["hash"]))
+
+
+def content_hash(path):
+    "sha1 hash of a file's contents, from the hash index if the file is unchanged"
+    load_index()
+    key = _file_key(os.stat(path))
+    if key not in _HASHES:
+        content = hash_file(path)
+        with _LOCK:
+            _HASHES[key] = content
+
+    return _HASHES[key]
+
+
+def read_input_csv(path, **kwargs):
+    """Read a csv file, parsing each unique file content (and kwargs) only once.
+
+    Parsed dataframes are kept until they are the least recently used and the
+    total exceeds FRAME_CACHE_MAX_BYTES. Returns a copy of the cached dataframe
+    so that callers can modify it.
+    """
+    global _FRAME_BYTES
+    key = (content_hash(path), repr(sorted(kwargs.items())))
+    with _LOCK:
+        lock = _FRAME_LOCKS.setdefault(key, threading.Lock())
+    with lock:
+        with _LOCK:
+            if key in _FRAMES:
+                _FRAMES.move_to_end(key)
+                return _FRAMES[key][0].copy()
+        df = pd.read_csv(path, **kwargs)
+        size = int(df.memory_usage(deep=True).sum())
+        if size > FRAME_CACHE_MAX_BYTES:
+            return df
+        with _LOCK:
+            _FRAMES[key] = (df, size)
+            _FRAME_BYTES += size
+            _evict_frames()
+
+    return df.copy()
+
+
+def clear_frames():
+    "Remove every parsed dataframe, keeping the file hashes"
+    global _FRAME_BYTES
+    with _LOCK:
+        _FRAMES.clear()
+        _FRAME_LOCKS.clear()
+        _FRAME_BYTES = 0
+
+
+def clear_cache():
+    clear_frames()
+    with _LOCK:
+        _HASHES.clear()
+        _INDEX_LOADED.clear()
+
+
+def unlink_shared(path):
+    """Remove a file that is linked to other copies so a new file can be written.
+
+    Writing to a hard link or symlink would change every case that shares the
+    file. Call this before writing a new version of an input file.
+    """
+    path = Path(path)
+    if path.is_symlink() or (path.exists() and path.stat().st_nlink > 1):
+        path.unlink()
+
+
+def find_input_files(root):
+    "Every file in an Inputs folder under `root`, not including the store"
+    root = Path(root)
+    files = []
+    for inputs_folder in sorted(root.rglob("Inputs")):
+        if not inputs_folder.is_dir() or STORE_DIR in inputs_folder.parts:
+            continue
+        files.extend(p for p in sorted(inputs_folder.rglob("*")) if p.is_file())
+
+    return files
+
+
+def _replace_with_link(path, store_path, link):
+    tmp_path = path.with_name(f".{path.name}.dedupe")
+    if tmp_path.exists() or tmp_path.is_symlink():
+        tmp_path.unlink()
+    if link == "symlink":
+        os.symlink(os.path.relpath(store_path, path.parent), tmp_path)
+    else:
+        os.link(store_path, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def dedupe_inputs(root=None, link="hard", workers=HASH_WORKERS, dry_run=False):
+    """Replace duplicate Inputs files under `root` with links to a shared store.
+
+    Each unique file is kept once in <root>/.input_store/<hash[:2]>/<hash><ext>
+    and made read-only, so that writing to a linked copy raises an error instead
+    of changing every case (see `unlink_shared`). Files on a different filesystem
+    than the store can only be symlinked and are otherwise left alone. The hash
+    of every file is saved to the store's index.csv. Returns a dataframe with the
+    path, hash and size of every file and whether it was linked, and the number
+    of bytes saved (or that would be saved with `dry_run`).
+    """
+    if link not in LINK_TYPES:
+        raise ValueError(f"link must be one of {LINK_TYPES}, not {link}")
+    root = Path.cwd() if root is None else Path(root)
+    root = root.resolve()
+    store = root / STORE_DIR
+    files = find_input_files(root)
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        hashes = list(executor.map(content_hash, files))
+    # Disk space used before and after is the size of every distinct file (by
+    # inode) and of every unique file content.
+    file_keys = [_file_key(path.stat()) for path in files]
+    sizes_before = {key[:2]: key[2] for key in file_keys}
+    sizes_after = {file_hash: key[2] for key, file_hash in zip(file_keys, hashes)}
+    saved = sum(sizes_before.values()) - sum(sizes_after.values())
+
+    records = []
+    for path, file_hash in zip(files, hashes):
+        store_path = store / file_hash[:2] / f"{file_hash}{path.suffix}"
+        linked = False
+        if not dry_run:
+            if not store_path.exists():
+                store_path.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(path.resolve(), store_path)
+                except OSError:
+                    shutil.copy2(path, store_path)
+                store_path.chmod(stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            already_linked = os.path.samefile(path, store_path) and (
+                link == "hard" or path.is_symlink()
+            )
+            if not already_linked:
+                try:
+                    _replace_with_link(path, store_path, link)
+                    linked = True
+                except OSError as e:
+                    print(f"Could not link {path} to the store: {e}")
+        file_stat = path.stat()
+        records.append(
+            {
+                "path": path.relative_to(root).as_posix(),
+                "hash": file_hash,
+                "size": file_stat.st_size,
+                "mtime_ns": file_stat.st_mtime_ns,
+                "device": file_stat.st_dev,
+                "inode": file_stat.st_ino,
+                "linked": linked,
+            }
+        )
+
+    index = pd.DataFrame(records, columns=INDEX_COLUMNS + ["linked"])
+    if not dry_run:
+        store.mkdir(parents=True, exist_ok=True)
+        index[INDEX_COLUMNS].to_csv(store / INDEX_FILE, index=False)
+
+    return index, saved
+
+
+@app.command()
+def dedupe(
+    root: Path = Path("."),
+    link: str = "hard",
+    workers: int = HASH_WORKERS,
+    dry_run: bool = False,
+):
+    """Replace duplicate Inputs files in the study folder with links to one copy.
+
+    Use --link symlink if the case folders will be copied to a filesystem that
+    doesn't keep hard links. --dry-run only reports the space that would be saved.
+    """
+    index, saved = dedupe_inputs(root, link=link, workers=workers, dry_run=dry_run)
+    print(
+        f"{len(index)} input files, {index['hash'].nunique()} unique. "
+        f"{'Would save' if dry_run else 'Saved'} {saved / 1024 ** 2:.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    app()
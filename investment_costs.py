@@ -0,0 +1,114 @@
+"Annualized spur line investment costs without importing PowerGenome"
+
+import numpy as np
+import pandas as pd
+
+from input_store import read_input_csv
+from prefetch import read_case_files
+
+SPUR_LINE_WACC = 0.069
+SPUR_LINE_CAP_REC_YEARS = 60
+SPUR_LINE_COLUMNS = ["R_ID", "spur_line_miles", "spur_line_capex"]
+
+
+def capital_recovery_factor(wacc, cap_rec_years, compound_method="continuous"):
+    """Fraction of capital costs paid each year to recover them over `cap_rec_years`.
+
+    The default continuous compounding is the same as the
+    `investment_cost_calculator` in the version of PowerGenome used to create these
+    cases. Use compound_method="discrete" for the standard annuity formula.
+    `wacc` and `cap_rec_years` can be scalars or arrays.
+    """
+    wacc = np.asarray(wacc, dtype=float)
+    cap_rec_years = np.asarray(cap_rec_years, dtype=float)
+    if compound_method == "continuous":
+        growth = np.exp(wacc * cap_rec_years)
+        return growth * (np.exp(wacc) - 1) / (growth - 1)
+    elif compound_method == "discrete":
+        growth = np.power(1 + wacc, cap_rec_years)
+        return wacc * growth / (growth - 1)
+    else:
+        raise ValueError(
+            f"compound_method must be 'continuous' or 'discrete', not {compound_method}"
+        )
+
+
+def investment_cost_calculator(
+    capex, wacc, cap_rec_years, compound_method="continuous"
+):
+    """Annual payments on capital costs.
+
+    A replacement for `powergenome.nrelatb.investment_cost_calculator`. A Series
+    `capex` returns a Series with the same index.
+    """
+    crf = capital_recovery_factor(wacc, cap_rec_years, compound_method)
+    if isinstance(capex, pd.Series):
+        return capex.astype(float) * crf
+
+    return np.asarray(capex, dtype=float) * crf
+
+
+def summarize_spur_line_data(case, gen_data):
+    "Spur line columns of a case's generator data with a Case column"
+    gen_data = gen_data[SPUR_LINE_COLUMNS].copy()
+    gen_data["Case"] = case.description
+
+    return gen_data
+
+
+def combine_spur_line_data(df_list):
+    "Concatenate spur line data from cases and index it by Case and R_ID"
+    return pd.concat(df_list, ignore_index=True).set_index(["Case", "R_ID"])
+
+
+def read_spur_line_data(cases):
+    """Spur line miles and capex of every resource in each case.
+
+    Returns a dataframe indexed by Case (the case description) and R_ID.
+    """
+    def read_gen_data(case):
+        return read_input_csv(
+            case.inputs_folder / "Generators_data.csv", usecols=SPUR_LINE_COLUMNS
+        )
+
+    df_list = []
+    for case, gen_data in read_case_files(
+        cases, read_gen_data, ["Inputs/Generators_data.csv"]
+    ):
+        df_list.append(summarize_spur_line_data(case, gen_data))
+
+    return combine_spur_line_data(df_list)
+
+
+def calc_spur_line_costs(
+    new_cap,
+    spur_line_data,
+    wacc=SPUR_LINE_WACC,
+    cap_rec_years=SPUR_LINE_CAP_REC_YEARS,
+):
+    """Add spur line MW-miles, capex and annual investment costs to new capacity.
+
+    `new_cap` has Case, R_ID and "Capacity (MW)" columns and can include any
+    number of cases (and periods, as long as `spur_line_data` has the same index
+    levels as the columns used to look up values). Every value is calculated in a
+    single array operation and the R_ID column is dropped.
+    """
+    keys = pd.MultiIndex.from_arrays(
+        [np.asarray(new_cap[col], dtype=object) for col in spur_line_data.index.names]
+    )
+    spur_line = spur_line_data.reindex(keys)
+    spur_miles = spur_line["spur_line_miles"].to_numpy(dtype=float)
+    spur_capex = spur_line["spur_line_capex"].to_numpy(dtype=float)
+    capacity = new_cap["Capacity (MW)"].to_numpy(dtype=float)
+
+    new_cap = new_cap.copy()
+    new_cap["resource_spur_miles"] = spur_miles
+    new_cap["resource_spur_capex"] = spur_capex
+    new_cap = new_cap.drop(columns=["R_ID"])
+    new_cap["Spur Line MW-Miles"] = capacity * spur_miles
+    new_cap["Spur Line Capex"] = capacity * spur_capex
+    new_cap["Spur Line Inv Cost"] = investment_cost_calculator(
+        capacity * spur_capex, wacc=wacc, cap_rec_years=cap_rec_years
+    )
+
+    return new_cap
@@ -0,0 +1,131 @@
+"Read GenX Network.csv files once and share the topology across cases"
+
+import hashlib
+
+import pandas as pd
+from scipy import sparse
+
+import input_store
+
+# Topologies keyed by a hash of the Network.csv contents (from the input_store hash
+# index, so unchanged or linked files aren't read again).
+_TOPOLOGY_CACHE = {}
+
+
+class NetworkTopology:
+    """Zones, lines, and the zone x line incidence matrix from a Network.csv file.
+
+    `content_hash` identifies the exact file contents. `topology_key` only
+    depends on the zones, lines, path names, and incidence matrix, so two files
+    that differ in line capacities or policy columns share a `topology_key`.
+    """
+
+    def __init__(self, network_df, content_hash):
+        self.content_hash = content_hash
+
+        zone_rows = network_df.dropna(subset=["Network_zones"])
+        self.zones = zone_rows["Network_zones"].to_list()
+        if "Region description" in network_df.columns:
+            self.zone_names = zone_rows["Region description"].to_list()
+        else:
+            self.zone_names = list(self.zones)
+        self.zone_data = zone_rows.set_index("Network_zones")
+
+        line_rows = network_df.dropna(subset=["Network_lines"])
+        self.lines = line_rows["Network_lines"].astype(int).to_numpy()
+        self.path_names = pd.Series(
+            line_rows["Transmission Path Name"].to_numpy(), index=self.lines
+        )
+        self.base_capacity = pd.Series(
+            line_rows["Line_Max_Flow_MW"].astype(float).to_numpy(), index=self.lines
+        )
+        self.incidence = sparse.csr_matrix(
+            line_rows[self.zones].fillna(0).to_numpy(dtype=float).T
+        )
+
+        key_hash = hashlib.sha1()
+        key_hash.update(repr((self.zones, self.path_names.to_list())).encode())
+        key_hash.update(self.lines.tobytes())
+        key_hash.update(self.incidence.toarray().tobytes())
+        self.topology_key = key_hash.hexdigest()
+
+    def zone_idx(self, zone):
+        return self.zones.index(zone)
+
+    def zone_lines(self, zone):
+        "Lines that start or end in a zone"
+        row = self.incidence[self.zone_idx(zone)]
+
+        return self.lines[row.indices[row.data != 0]].tolist()
+
+    def direction(self, zone):
+        "Direction (1, -1, or 0) of each line relative to a zone, indexed by line"
+        row = self.incidence[self.zone_idx(zone)].toarray().ravel()
+
+        return pd.Series(row, index=self.lines)
+
+    @property
+    def region_lines(self):
+        return {zone: self.zone_lines(zone) for zone in self.zones}
+
+
+def _file_hash(path):
+    content_hash = input_store.content_hash(path)
+    if content_hash not in _TOPOLOGY_CACHE:
+        network_df = input_store.read_input_csv(path)
+        _TOPOLOGY_CACHE[content_hash] = NetworkTopology(network_df, content_hash)
+
+    return content_hash
+
+
+def load_topology(path):
+    "Topology of a Network.csv file, parsed once for each unique file content"
+    return _TOPOLOGY_CACHE[_file_hash(path)]
+
+
+def case_topology(case):
+    return load_topology(case.inputs_folder / "Network.csv")
+
+
+def group_cases_by_topology(cases):
+    "Dictionary of topology_key: list of case folder names"
+    groups = {}
+    for case in cases:
+        topology = case_topology(case)
+        groups.setdefault(topology.topology_key, []).append(case.folder.name)
+
+    return groups
+
+
+def check_topologies(cases):
+    """Make sure cases have the same lines and warn if their topologies differ.
+
+    Results of each line are compared across cases, so cases with different line
+    numbers raise a ValueError. Other differences (zones, path names, or the
+    direction of lines) are printed as a warning. Returns the dictionary from
+    `group_cases_by_topology`.
+    """
+    groups = group_cases_by_topology(cases)
+    if len(groups) > 1:
+        line_sets = {}
+        for case in cases:
+            lines = tuple(sorted(case_topology(case).lines.tolist()))
+            line_sets.setdefault(lines, []).append(case.folder.name)
+        if len(line_sets) > 1:
+            raise ValueError(
+                "Cases have different transmission lines: "
+                + "; ".join(
+                    f"lines {list(lines)} in {', '.join(case_names)}"
+                    for lines, case_names in line_sets.items()
+                )
+            )
+        print("Cases have different network topologies (zones, lines, or paths):")
+        for num, case_names in enumerate(groups.values(), start=1):
+            print(f"  Topology {num}: {', '.join(case_names)}")
+
+    return groups
+
+
+def clear_cache():
+    _TOPOLOGY_CACHE.clear()
+    input_store.clear_cache()
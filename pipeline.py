@@ -0,0 +1,379 @@
+"""Run the steps of compiling results as stages that reuse up-to-date outputs.
+
+Stages and their upstream stages are listed in STAGES. Each stage's output is
+saved in PIPELINE_DIR (or as the usual output files) along with a key that is a
+hash of the upstream keys and the code used by the stage. Running a stage first
+brings its upstream stages up to date, reusing any outputs whose keys haven't
+changed.
+"""
+
+import hashlib
+import json
+import pickle
+from pathlib import Path
+
+import pandas as pd
+import typer
+
+from case_registry import find_cases
+from figure_batch import DEFAULT_FIGURE_CONFIG, FIGURE_WORKERS
+from network_topology import check_topologies
+from prefetch import read_case_files
+from results_store import case_fingerprint
+from stage_hash import STAGE_SOURCES, TRADE_COSTS_FILE, source_hash
+
+app = typer.Typer()
+
+PIPELINE_DIR = ".pipeline"
+MANIFEST_FILE = "manifest.json"
+
+STAGES = {
+    "discover": [],
+    "load": ["discover"],
+    "reduce": ["load"],
+    "cost": ["reduce"],
+    "figures": ["cost"],
+    "excel": ["cost"],
+    "trade-costs": ["discover"],
+}
+
+EXCEL_FILES = ["WECC results.xlsx", "Regional results.xlsx"]
+
+
+def stage_key(stage, *parts):
+    """Hash of a stage name, the code it uses, and any json serializable parts.
+
+    The pandas version is included because saved outputs are pickled dataframes.
+    """
+    key_hash = hashlib.sha1()
+    key_hash.update(f"{stage}:{pd.__version__}".encode())
+    key_hash.update(source_hash(STAGE_SOURCES[stage]).encode())
+    for part in parts:
+        key_hash.update(json.dumps(part, sort_keys=True, default=str).encode())
+
+    return key_hash.hexdigest()
+
+
+class Pipeline:
+    """Keys and outputs of every stage for the study in the current folder.
+
+    The manifest in `root` has the key of each stage when it was last run and the
+    files it wrote. A stage is current if its key matches and the files exist.
+    With `force`, the stages named in `force` are run even if they are current.
+    """
+
+    def __init__(self, root=PIPELINE_DIR, force=()):
+        self.root = Path(root)
+        self.force = set(force)
+        self.manifest_path = self.root / MANIFEST_FILE
+        if self.manifest_path.exists():
+            self.manifest = json.loads(self.manifest_path.read_text())
+        else:
+            self.manifest = {}
+        self._keys = {}
+        self._outputs = {}
+        self.figure_config = Path(DEFAULT_FIGURE_CONFIG)
+        self.redraw_figures = False
+        self.figure_workers = FIGURE_WORKERS
+
+    def save_manifest(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.manifest, indent=2, sort_keys=True))
+        tmp_path.replace(self.manifest_path)
+
+    def key(self, stage):
+        "Key of a stage from the keys of its upstream stages"
+        if stage not in self._keys:
+            if stage == "discover":
+                self._outputs["discover"] = self.discover()
+                years, fingerprints = self._outputs["discover"]
+                self._keys[stage] = stage_key(stage, years, fingerprints)
+            else:
+                upstream = [self.key(s) for s in STAGES[stage]]
+                self._keys[stage] = stage_key(stage, upstream)
+
+        return self._keys[stage]
+
+    def output_files(self, stage):
+        return [Path(f) for f in self.manifest.get(stage, {}).get("files", [])]
+
+    def is_current(self, stage):
+        entry = self.manifest.get(stage, {})
+        if stage in self.force or entry.get("key") != self.key(stage):
+            return False
+
+        return all(f.exists() for f in self.output_files(stage))
+
+    def record(self, stage, files):
+        self.manifest[stage] = {
+            "key": self.key(stage),
+            "files": [str(f) for f in files],
+        }
+        self.save_manifest()
+
+    def run(self, stage):
+        """Output of a stage, reusing the saved output if it is current.
+
+        Outputs of reduce and cost are the results dictionaries. Other stages
+        write their usual files and return None.
+        """
+        if stage == "discover":
+            # Discover always runs when its key is first needed
+            self.key(stage)
+        if stage in self._outputs:
+            return self._outputs[stage]
+
+        pickle_path = self.root / f"{stage}.pkl"
+        if stage in ["reduce", "cost"] and self.is_current(stage):
+            print(f"{stage}: up to date")
+            with open(pickle_path, "rb") as f:
+                output = pickle.load(f)
+        elif stage in ["reduce", "cost"]:
+            print(f"{stage}: running")
+            output = getattr(self, stage)()
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(pickle_path, "wb") as f:
+                pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self.record(stage, [pickle_path])
+        elif stage in ["excel", "trade-costs"] and self.is_current(stage):
+            print(f"{stage}: up to date")
+            output = None
+        else:
+            # discover and load check their own outputs. The figure cache skips
+            # figures whose data haven't changed.
+            print(f"{stage}: running")
+            output = getattr(self, stage.replace("-", "_"))()
+
+        self._outputs[stage] = output
+
+        return output
+
+    def discover(self):
+        """Years with results and a fingerprint of every case folder.
+
+        Fingerprints are keyed by folder name, since cases in a year can share a
+        description.
+        """
+        from compile_results import find_years
+
+        years = find_years()
+        fingerprints = {
+            year: {c.folder.name: case_fingerprint(c) for c in find_cases(year)}
+            for year in years
+        }
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / "discover.json").write_text(
+            json.dumps({"years": years, "fingerprints": fingerprints}, indent=2)
+        )
+
+        return years, fingerprints
+
+    def load(self):
+        """Summaries of every case, read again only if the case folder changed.
+
+        Each summary is saved to <root>/load/<year>/<case folder>.pkl.
+        """
+        from compile_results import CASE_SUMMARY_FILES, summarize_case
+
+        years, fingerprints = self.run("discover")
+        case_keys = self.manifest.get("load", {}).get("cases", {})
+        summaries = {}
+        current_paths = set()
+        for year in years:
+            cases = find_cases(year)
+            load_folder = self.root / "load" / str(year)
+            paths = {c.folder.name: load_folder / f"{c.folder.name}.pkl" for c in cases}
+            current_paths.update(str(path) for path in paths.values())
+            keys = {
+                c.folder.name: stage_key("load", fingerprints[year][c.folder.name])
+                for c in cases
+            }
+            stale = [
+                c
+                for c in cases
+                if "load" in self.force
+                or case_keys.get(str(paths[c.folder.name])) != keys[c.folder.name]
+                or not paths[c.folder.name].exists()
+            ]
+            if stale:
+                check_topologies(cases)
+                print(f"  {year}: reading {len(stale)} of {len(cases)} cases")
+            for case, summary in read_case_files(
+                stale, summarize_case, CASE_SUMMARY_FILES
+            ):
+                path = paths[case.folder.name]
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, "wb") as f:
+                    pickle.dump(summary, f, protocol=pickle.HIGHEST_PROTOCOL)
+                case_keys[str(path)] = keys[case.folder.name]
+
+            summaries[year] = []
+            for case in cases:
+                with open(paths[case.folder.name], "rb") as f:
+                    summaries[year].append(pickle.load(f))
+
+        # Remove summaries of cases (or years) that no longer have results
+        for path in (self.root / "load").glob("*/*.pkl"):
+            if str(path) not in current_paths:
+                path.unlink()
+        case_keys = {p: key for p, key in case_keys.items() if p in current_paths}
+
+        self.manifest["load"] = {
+            "key": self.key("load"),
+            "files": [],
+            "cases": case_keys,
+        }
+        self.save_manifest()
+
+        return summaries
+
+    def reduce(self):
+        "Regional and total results of every year, without energy costs"
+        from compile_results import build_results, results_carry_over
+
+        summaries = self.run("load")
+        total_dict, region_dict = {}, {}
+        prev_spur_costs = None
+        prev_tx_costs = None
+        for year in sorted(summaries):
+            region_dict[year], total_dict[year] = build_results(
+                year, prev_spur_costs, prev_tx_costs, summaries=summaries[year]
+            )
+            prev_spur_costs, prev_tx_costs = results_carry_over(
+                region_dict[year], total_dict[year]
+            )
+
+        return total_dict, region_dict
+
+    def cost(self):
+        from compile_results import calc_energy_cost
+
+        total_dict, region_dict = self.run("reduce")
+
+        return calc_energy_cost(total_dict, region_dict, sorted(total_dict))
+
+    def figures(self):
+        from compile_results import make_figures
+
+        total_dict, region_dict = self.run("cost")
+        make_figures(
+            total_dict,
+            region_dict,
+            config_path=self.figure_config,
+            redraw=self.redraw_figures,
+            workers=self.figure_workers,
+        )
+        self.record("figures", [])
+
+    def excel(self):
+        from compile_results import write_results_to_excel
+
+        total_dict, region_dict = self.run("cost")
+        write_results_to_excel(total_dict, region_dict)
+        self.record("excel", EXCEL_FILES)
+
+    def trade_costs(self):
+        from zone_trade_attribute_costs import calc_all_costs
+
+        self.run("discover")
+        calc_all_costs().to_csv(TRADE_COSTS_FILE)
+        self.record("trade-costs", [TRADE_COSTS_FILE])
+
+    def status(self):
+        "Dictionary of stage: True if the stage is current"
+        return {
+            stage: self.is_current(stage) if stage != "discover" else True
+            for stage in STAGES
+        }
+
+
+def run_stages(stages, force=False, root=PIPELINE_DIR, **settings):
+    pipeline = Pipeline(root, force=stages if force else ())
+    for name, value in settings.items():
+        setattr(pipeline, name, value)
+    for stage in stages:
+        pipeline.run(stage)
+
+    return pipeline
+
+
+@app.command()
+def discover(root: Path = Path(PIPELINE_DIR)):
+    "Find years and cases and fingerprint the case folders"
+    run_stages(["discover"], root=root)
+
+
+@app.command()
+def load(force: bool = False, root: Path = Path(PIPELINE_DIR)):
+    "Summarize the results of new or changed cases"
+    run_stages(["load"], force, root)
+
+
+@app.command()
+def reduce(force: bool = False, root: Path = Path(PIPELINE_DIR)):
+    "Combine case summaries into regional and total results"
+    run_stages(["reduce"], force, root)
+
+
+@app.command()
+def cost(force: bool = False, root: Path = Path(PIPELINE_DIR)):
+    "Add the total cost of energy to the results"
+    run_stages(["cost"], force, root)
+
+
+@app.command()
+def figures(
+    force: bool = False,
+    root: Path = Path(PIPELINE_DIR),
+    figure_config: Path = Path(DEFAULT_FIGURE_CONFIG),
+    redraw_figures: bool = False,
+    figure_workers: int = FIGURE_WORKERS,
+):
+    "Draw figures whose data have changed"
+    run_stages(
+        ["figures"],
+        force,
+        root,
+        figure_config=figure_config,
+        redraw_figures=redraw_figures,
+        figure_workers=figure_workers,
+    )
+
+
+@app.command()
+def excel(force: bool = False, root: Path = Path(PIPELINE_DIR)):
+    "Write the WECC and regional results workbooks"
+    run_stages(["excel"], force, root)
+
+
+@app.command("trade-costs")
+def trade_costs(force: bool = False, root: Path = Path(PIPELINE_DIR)):
+    "Write zone specific import/export and RPS/CES costs"
+    run_stages(["trade-costs"], force, root)
+
+
+@app.command("all")
+def run_all(
+    root: Path = Path(PIPELINE_DIR),
+    figure_config: Path = Path(DEFAULT_FIGURE_CONFIG),
+    figure_workers: int = FIGURE_WORKERS,
+):
+    "Bring every stage up to date"
+    run_stages(
+        list(STAGES),
+        root=root,
+        figure_config=figure_config,
+        figure_workers=figure_workers,
+    )
+
+
+@app.command()
+def status(root: Path = Path(PIPELINE_DIR)):
+    "Show which stages are up to date"
+    for stage, current in Pipeline(root).status().items():
+        print(f"{stage:12} {'up to date' if current else 'out of date'}")
+
+
+if __name__ == "__main__":
+    app()
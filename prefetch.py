@@ -0,0 +1,105 @@
+"Read case files in background threads while earlier cases are being processed"
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+# Number of cases to read ahead of the one being processed, and the maximum total
+# size (in bytes, based on file sizes on disk) of files read ahead. A depth of 0
+# reads every file synchronously.
+PREFETCH_DEPTH = 4
+PREFETCH_MAX_BYTES = 2 * 1024 ** 3
+
+
+def configure(depth=None, max_mb=None):
+    "Change the prefetch depth and/or memory ceiling used by all readers"
+    global PREFETCH_DEPTH, PREFETCH_MAX_BYTES
+    if depth is not None:
+        PREFETCH_DEPTH = depth
+    if max_mb is not None:
+        PREFETCH_MAX_BYTES = int(max_mb * 1024 ** 2)
+
+
+def file_size(path):
+    try:
+        return Path(path).stat().st_size
+    except OSError:
+        return 0
+
+
+def prefetch_map(func, items, sizes=None, depth=None, max_bytes=None):
+    """Apply `func` to each item in background threads and yield (item, result).
+
+    Results are yielded in the same order as `items`. Up to `depth` items are
+    read ahead of the one being yielded, as long as their combined size is less
+    than `max_bytes`. One item is always read ahead even if it is larger than
+    `max_bytes`. Exceptions from `func` are raised when that item is reached.
+    """
+    items = list(items)
+    depth = PREFETCH_DEPTH if depth is None else depth
+    max_bytes = PREFETCH_MAX_BYTES if max_bytes is None else max_bytes
+    if sizes is None:
+        sizes = [0] * len(items)
+
+    if depth < 1:
+        for item in items:
+            yield item, func(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=depth) as executor:
+        pending = deque()
+        pending_bytes = 0
+        next_idx = 0
+        for _ in range(len(items)):
+            while next_idx < len(items) and len(pending) < depth:
+                size = sizes[next_idx]
+                if pending and pending_bytes + size > max_bytes:
+                    break
+                future = executor.submit(func, items[next_idx])
+                pending.append((items[next_idx], future, size))
+                pending_bytes += size
+                next_idx += 1
+
+            item, future, size = pending.popleft()
+            pending_bytes -= size
+            yield item, future.result()
+
+
+def case_sizes(cases, file_names):
+    "Total size on disk of `file_names` (relative to the case folder) in each case"
+    return [sum(file_size(case.folder / f) for f in file_names) for case in cases]
+
+
+def read_case_files(
+    cases, read_case, file_names, depth=None, max_bytes=None, progress=None
+):
+    """Yield (case, read_case(case)) while reading the next cases in the background.
+
+    `file_names` are paths relative to each case folder (e.g. "Results/flow.csv")
+    and are used to estimate how much memory each case will need. If `progress`
+    (a `progress.Progress`) is given, each case and the size of its files are
+    counted after the case has been processed.
+    """
+    cases = list(cases)
+    sizes = case_sizes(cases, file_names)
+
+    results = prefetch_map(read_case, cases, sizes, depth, max_bytes)
+    if progress is not None:
+        results = progress.track(results, sizes)
+
+    yield from results
+
+
+def read_case_csv(cases, file_name, depth=None, max_bytes=None, **kwargs):
+    """Yield (case, dataframe) for a csv file in every case.
+
+    `file_name` is relative to the case folder (e.g. "Results/capacity.csv"), and
+    other keyword arguments are passed to `pd.read_csv`.
+    """
+
+    def read_case(case):
+        return pd.read_csv(case.folder / file_name, **kwargs)
+
+    yield from read_case_files(cases, read_case, [file_name], depth, max_bytes)
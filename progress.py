@@ -0,0 +1,180 @@
+"""Progress of long running stages: items done, bytes read, throughput and ETA.
+
+Progress is shown as a bar that is redrawn in place when writing to a terminal,
+as one JSON object per line when running in a SLURM job (so the log can be
+parsed while the job runs), and as a plain line every LOG_INTERVAL seconds
+otherwise. Updates are made in the process that submits the work, as each case
+finishes, so stages that run in a process pool report progress the same way as
+serial ones.
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import timedelta
+from itertools import repeat
+
+PROGRESS_MODES = ["auto", "bar", "json", "log", "off"]
+PROGRESS_MODE = "auto"
+
+# Minimum seconds between updates of the bar, and between lines in log mode
+BAR_INTERVAL = 0.1
+LOG_INTERVAL = 30
+BAR_WIDTH = 30
+
+
+def configure(mode=None):
+    "Change how progress is reported by every stage"
+    global PROGRESS_MODE
+    if mode is not None:
+        if mode not in PROGRESS_MODES:
+            raise ValueError(f"progress mode must be one of {PROGRESS_MODES}")
+        PROGRESS_MODE = mode
+
+
+def resolve_mode(stream):
+    "The mode used for `stream` when the configured mode is 'auto'"
+    if PROGRESS_MODE != "auto":
+        return PROGRESS_MODE
+    if "SLURM_JOB_ID" in os.environ:
+        return "json"
+    if stream.isatty():
+        return "bar"
+
+    return "log"
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--:--"
+
+    return str(timedelta(seconds=int(seconds)))
+
+
+class Progress:
+    """Items done, bytes read, and the time left in a stage.
+
+    Use as a context manager and call `update` (or iterate over `track`) as each
+    item is finished. `total` is the number of items in the stage.
+    """
+
+    def __init__(self, stage, total, unit="cases", stream=None, mode=None):
+        self.stage = stage
+        self.total = total
+        self.unit = unit
+        self.stream = sys.stderr if stream is None else stream
+        self.mode = resolve_mode(self.stream) if mode is None else mode
+        self.done = 0
+        self.bytes_read = 0
+        self.start = time.monotonic()
+        self._last_shown = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    @property
+    def eta(self):
+        "Seconds until the stage is done, from the average time per item so far"
+        if self.done == 0:
+            return None
+
+        return self.elapsed / self.done * max(self.total - self.done, 0)
+
+    def status(self, item=None):
+        "Dictionary of the current progress"
+        elapsed = self.elapsed
+        mb_read = self.bytes_read / 1024 ** 2
+        status = {
+            "stage": self.stage,
+            "done": self.done,
+            "total": self.total,
+            "unit": self.unit,
+            "bytes_read": self.bytes_read,
+            "elapsed_s": round(elapsed, 2),
+            "items_per_s": round(self.done / elapsed, 3) if elapsed else None,
+            "mb_per_s": round(mb_read / elapsed, 3) if elapsed else None,
+            "eta_s": None if self.eta is None else round(self.eta, 1),
+        }
+        if item is not None:
+            status["item"] = str(item)
+        if "SLURM_JOB_ID" in os.environ:
+            status["slurm_job_id"] = os.environ["SLURM_JOB_ID"]
+            if "SLURM_ARRAY_TASK_ID" in os.environ:
+                status["slurm_array_task_id"] = os.environ["SLURM_ARRAY_TASK_ID"]
+
+        return status
+
+    def update(self, n=1, bytes_read=0, item=None):
+        "Record `n` more items done and `bytes_read` more bytes read"
+        self.done += n
+        self.bytes_read += bytes_read
+        self.show(item)
+
+    def add_bytes(self, bytes_read):
+        self.bytes_read += bytes_read
+
+    def track(self, items, sizes=None):
+        """Yield each item and count it as done when the next one is requested.
+
+        `sizes` are the bytes read for each item.
+        """
+        sizes = repeat(0) if sizes is None else sizes
+        for item, size in zip(items, sizes):
+            yield item
+            self.update(bytes_read=size)
+
+    def write(self, message):
+        "Print a message without breaking the progress bar"
+        if self.mode == "bar":
+            self.stream.write("\r\033[K")
+            self.stream.flush()
+        print(message, flush=True)
+        if self.mode == "bar":
+            self.show(force=True)
+
+    def line(self):
+        status = self.status()
+        rate = status["mb_per_s"] or 0
+        return (
+            f"{self.stage}: {self.done}/{self.total} {self.unit}, "
+            f"{self.bytes_read / 1024 ** 2:.1f} MB ({rate:.1f} MB/s), "
+            f"ETA {format_eta(self.eta)}"
+        )
+
+    def show(self, item=None, force=False, final=False):
+        if self.mode == "off":
+            return
+        now = time.monotonic()
+        if self.mode == "json":
+            status = self.status(item)
+            if final:
+                status["final"] = True
+            self.stream.write(json.dumps(status) + "\n")
+        elif self.mode == "bar":
+            if not (force or final) and self._last_shown is not None:
+                if now - self._last_shown < BAR_INTERVAL:
+                    return
+            filled = int(BAR_WIDTH * self.done / self.total) if self.total else 0
+            bar = "#" * filled + "." * (BAR_WIDTH - filled)
+            self.stream.write(f"\r\033[K[{bar}] {self.line()}")
+            if final:
+                self.stream.write("\n")
+        else:
+            last = self.start if self._last_shown is None else self._last_shown
+            if not final and now - last < LOG_INTERVAL:
+                return
+            self.stream.write(self.line() + "\n")
+        self.stream.flush()
+        self._last_shown = now
+
+    def close(self):
+        "Show the final progress of the stage"
+        self.show(final=True)
@@ -0,0 +1,334 @@
+"Store compiled results in a SQLite file that can be queried without recompiling"
+
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import typer
+
+from case_registry import find_cases
+
+app = typer.Typer()
+
+DEFAULT_STORE = "results_store.sqlite"
+STORE_TABLES = [
+    "capacity",
+    "energy",
+    "emissions",
+    "network",
+    "spur_line",
+    "costs",
+    "demand",
+]
+KEY_COLUMNS = ["Year", "Case", "Region", "Resource Name", "Category"]
+EXTRA_KEY_COLUMNS = {"network": ["Path Name"], "spur_line": ["Resource"]}
+
+# Tables in region_dict that have one column per case. The category is used for
+# tables that don't already have a Category index level.
+CASE_COLUMN_TABLES = {
+    "capacity": None,
+    "energy": "Energy (MWh)",
+    "emissions": "CO2 Emissions",
+}
+
+
+def table_key_columns(table):
+    return KEY_COLUMNS + EXTRA_KEY_COLUMNS.get(table, [])
+
+
+def tidy_table(df, table, year):
+    """Convert one of the region_dict dataframes to a long format.
+
+    Every table has the columns Year, Case, Region, Resource Name, Category, and
+    Value (plus Path Name for network and Resource for spur_line). Region and
+    Resource Name are null when they don't apply to a table.
+    """
+    if table in CASE_COLUMN_TABLES:
+        data = df.reset_index()
+        id_vars = list(df.index.names)
+        tidy = data.melt(id_vars=id_vars, var_name="Case", value_name="Value")
+        if "Category" not in tidy.columns:
+            tidy["Category"] = CASE_COLUMN_TABLES[table]
+    else:
+        data = df.reset_index()
+        if "Category" in data.columns:
+            data = data.drop(columns=["Category"])
+        data = data.drop(columns=[c for c in data.columns if c == "index"])
+        id_vars = [c for c in table_key_columns(table) if c in data.columns]
+        value_vars = [
+            c
+            for c in data.select_dtypes("number").columns
+            if c not in id_vars + ["R_ID"]
+        ]
+        tidy = data.melt(
+            id_vars=id_vars,
+            value_vars=value_vars,
+            var_name="Category",
+            value_name="Value",
+        )
+
+    tidy["Year"] = year
+    for col in table_key_columns(table):
+        if col not in tidy.columns:
+            tidy[col] = None
+    tidy = tidy.dropna(subset=["Value"])
+
+    return tidy[table_key_columns(table) + ["Value"]]
+
+
+def case_fingerprint(case):
+    "Hash of the name, size, and modification time of every file in a case folder"
+    file_hash = hashlib.sha1()
+    for path in sorted(case.folder.rglob("*")):
+        if path.is_file():
+            stat = path.stat()
+            rel_path = path.relative_to(case.folder).as_posix()
+            file_hash.update(f"{rel_path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+
+    return file_hash.hexdigest()
+
+
+def year_fingerprints(year):
+    return {case.description: case_fingerprint(case) for case in find_cases(year)}
+
+
+class StoreConnection(sqlite3.Connection):
+    """SQLite connection that is closed at the end of a `with` block.
+
+    The standard connection only commits (or rolls back) when the block ends and
+    stays open until it is garbage collected.
+    """
+
+    def __exit__(self, *exc):
+        try:
+            return super().__exit__(*exc)
+        finally:
+            self.close()
+
+
+def connect(db_path=DEFAULT_STORE):
+    return sqlite3.connect(str(db_path), factory=StoreConnection)
+
+
+def table_exists(con, table):
+    query = "SELECT name FROM sqlite_master WHERE type='table' AND name=?"
+
+    return con.execute(query, (table,)).fetchone() is not None
+
+
+def stored_fingerprints(con):
+    if not table_exists(con, "case_files"):
+        return {}
+    df = pd.read_sql_query("SELECT * FROM case_files", con)
+    fingerprints = {}
+    for year, year_df in df.groupby("Year"):
+        fingerprints[int(year)] = dict(zip(year_df["Case"], year_df["fingerprint"]))
+
+    return fingerprints
+
+
+def delete_years(con, years):
+    years = [int(year) for year in years]
+    if not years:
+        return
+    placeholders = ",".join("?" * len(years))
+    for table in STORE_TABLES + ["case_files"]:
+        if table_exists(con, table):
+            con.execute(f"DELETE FROM {table} WHERE Year IN ({placeholders})", years)
+
+
+def write_year(con, year, region_dict, fingerprints):
+    "Replace all stored results for a single year"
+    delete_years(con, [year])
+    for table in STORE_TABLES:
+        tidy = tidy_table(region_dict[table], table, year)
+        tidy.to_sql(table, con, if_exists="append", index=False)
+        key_cols = ", ".join(f'"{col}"' for col in table_key_columns(table))
+        con.execute(f"CREATE INDEX IF NOT EXISTS idx_{table} ON {table} ({key_cols})")
+
+    case_files = pd.DataFrame(
+        {
+            "Year": year,
+            "Case": list(fingerprints.keys()),
+            "fingerprint": list(fingerprints.values()),
+        }
+    )
+    case_files.to_sql("case_files", con, if_exists="append", index=False)
+    con.commit()
+
+
+def write_results_store(region_dict, db_path=DEFAULT_STORE):
+    "Write all years of an already compiled region_dict to the store"
+    with connect(db_path) as con:
+        for year, year_dict in region_dict.items():
+            write_year(con, year, year_dict, year_fingerprints(year))
+
+
+def load_carry_over(con, year):
+    """Rebuild the previous period spur line and transmission costs from the store.
+
+    These are the only values that `build_results` needs from an earlier period.
+    """
+    spur = pd.read_sql_query(
+        'SELECT "Case", Region, Value AS "Spur Line Inv Cost" FROM spur_line '
+        "WHERE Year = ? AND Category = 'Spur Line Inv Cost'",
+        con,
+        params=(int(year),),
+    )
+    tx = pd.read_sql_query(
+        'SELECT "Case", SUM(Value) AS Cost_Trans_Capacity FROM network '
+        "WHERE Year = ? AND Category = 'Cost_Trans_Capacity' GROUP BY \"Case\"",
+        con,
+        params=(int(year),),
+    ).set_index("Case")
+
+    return spur, tx
+
+
+def update_store(db_path=DEFAULT_STORE, force=False):
+    """Compile results for any years where cases were added, removed, or modified.
+
+    Costs in a period depend on spur line and transmission costs from the previous
+    period, so every year after the first changed year is also rebuilt. Returns a
+    list of the years that were compiled.
+    """
+    from compile_results import build_results, find_years, results_carry_over
+
+    years = find_years()
+    with connect(db_path) as con:
+        stored = stored_fingerprints(con)
+        delete_years(con, [year for year in stored if year not in years])
+
+        fingerprints = {}
+        first_changed = None
+        for year in years:
+            fingerprints[year] = year_fingerprints(year)
+            if first_changed is None and (
+                force or fingerprints[year] != stored.get(year)
+            ):
+                first_changed = year
+        if first_changed is None:
+            con.commit()
+            return []
+
+        prev_spur_costs, prev_tx_costs = None, None
+        prev_years = [year for year in years if year < first_changed]
+        if prev_years:
+            prev_spur_costs, prev_tx_costs = load_carry_over(con, prev_years[-1])
+
+        built_years = [year for year in years if year >= first_changed]
+        for year in built_years:
+            print(f"Compiling results for {year}")
+            region_dict, total_dict = build_results(
+                year, prev_spur_costs, prev_tx_costs
+            )
+            write_year(con, year, region_dict, fingerprints[year])
+            prev_spur_costs, prev_tx_costs = results_carry_over(region_dict, total_dict)
+
+    return built_years
+
+
+def query(sql, params=(), db_path=DEFAULT_STORE):
+    with connect(db_path) as con:
+        return pd.read_sql_query(sql, con, params=params)
+
+
+def get_results(
+    table,
+    year=None,
+    case=None,
+    region=None,
+    resource_name=None,
+    category=None,
+    db_path=DEFAULT_STORE,
+):
+    """Select rows from one of the stored tables.
+
+    Each filter can be a single value or a list of values. Results are returned
+    with one column per case, e.g. the WECC_AZ solar capacity across cases:
+
+    get_results("capacity", year=2045, region="WECC_AZ", resource_name="Solar")
+
+    If no rows match, the dataframe is empty with every key column (other than
+    Case) in the index.
+    """
+    if table not in STORE_TABLES:
+        raise ValueError(f"{table} is not one of the stored tables {STORE_TABLES}")
+
+    filters = {
+        "Year": year,
+        "Case": case,
+        "Region": region,
+        "Resource Name": resource_name,
+        "Category": category,
+    }
+    conditions = []
+    params = []
+    for col, value in filters.items():
+        if value is None:
+            continue
+        values = value if isinstance(value, (list, tuple)) else [value]
+        conditions.append(f'"{col}" IN ({",".join("?" * len(values))})')
+        params.extend(values)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    df = query(f"SELECT * FROM {table} {where}", params=params, db_path=db_path)
+
+    index_cols = [col for col in table_key_columns(table) if col != "Case"]
+    if df.empty:
+        return pd.DataFrame(
+            index=pd.MultiIndex.from_arrays([[]] * len(index_cols), names=index_cols),
+            columns=pd.Index([], name="Case"),
+            dtype=float,
+        )
+    index_cols = [col for col in index_cols if df[col].notna().any()]
+    case_order = list(dict.fromkeys(df["Case"]))
+    wide = df.pivot_table(
+        index=index_cols, columns="Case", values="Value", aggfunc="sum"
+    )
+
+    return wide[case_order]
+
+
+@app.command()
+def build(db_path: Path = DEFAULT_STORE, force: bool = False):
+    "Create or update the results store for cases in the current folder"
+    built_years = update_store(db_path, force=force)
+    if built_years:
+        print(f"Updated {db_path} for years {built_years}")
+    else:
+        print(f"{db_path} is up to date")
+
+
+@app.command("query")
+def query_command(sql: str, db_path: Path = DEFAULT_STORE):
+    "Run a SQL query against the results store"
+    print(query(sql, db_path=db_path).to_string(index=False))
+
+
+@app.command()
+def show(
+    table: str,
+    year: Optional[int] = None,
+    case: Optional[str] = None,
+    region: Optional[str] = None,
+    resource_name: Optional[str] = None,
+    category: Optional[str] = None,
+    db_path: Path = DEFAULT_STORE,
+):
+    "Show stored results with one column per case"
+    df = get_results(
+        table,
+        year=year,
+        case=case,
+        region=region,
+        resource_name=resource_name,
+        category=category,
+        db_path=db_path,
+    )
+    print(df.to_string())
+
+
+if __name__ == "__main__":
+    app()
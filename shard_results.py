@@ -0,0 +1,208 @@
+"""Write compiled regional results as one file per region (and case group).
+
+Each shard has every table in region_dict filtered to the rows of a region (and
+transmission paths that start or end in it), so the report for a single region
+can be written and delivered without the others.
+"""
+
+import fnmatch
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import typer
+
+from distributed_compile import RESULTS_FILE
+from results_store import tidy_table
+
+app = typer.Typer()
+
+SHARD_DIR = "region_results"
+SHARD_FORMATS = ["xlsx", "parquet"]
+SHARD_WORKERS = 4
+
+
+def region_rows(df, region):
+    """Rows of a region_dict table for one region.
+
+    Tables without a Region are filtered to transmission paths ("<region> to
+    <region>") that start or end in the region, or returned unchanged.
+    """
+    if "Region" in df.index.names:
+        mask = df.index.get_level_values("Region") == region
+    elif "Region" in df.columns:
+        mask = (df["Region"] == region).to_numpy()
+    elif "Path Name" in df.index.names:
+        paths = df.index.get_level_values("Path Name").astype(str)
+        mask = np.array([region in path.split(" to ") for path in paths], dtype=bool)
+    else:
+        return df
+
+    return df.loc[mask]
+
+
+def case_rows(df, cases):
+    "Rows (or case columns) of a region_dict table for a list of cases"
+    if "Case" in df.index.names:
+        return df.loc[df.index.get_level_values("Case").isin(cases)]
+    if "Case" in df.columns:
+        return df.loc[df["Case"].isin(cases).to_numpy()]
+
+    # Capacity, energy, and emissions have one column per case
+    return df[[c for c in df.columns if c in cases]]
+
+
+def result_cases(region_dict):
+    "Every case name in region_dict, in the order they first appear"
+    cases = {}
+    for results in region_dict.values():
+        cases.update(dict.fromkeys(results["costs"].index.get_level_values("Case")))
+
+    return list(cases)
+
+
+def result_regions(region_dict):
+    regions = set()
+    for results in region_dict.values():
+        regions.update(results["costs"].index.get_level_values("Region"))
+
+    return sorted(regions)
+
+
+def load_case_groups(path):
+    """Case groups from a YAML file of group name: list of case names.
+
+    Case names can be glob patterns, e.g. "Emissions Cap*".
+    """
+    import yaml
+
+    groups = yaml.safe_load(Path(path).read_text()) or {}
+    if not isinstance(groups, dict) or not groups:
+        raise ValueError(f"{path} should map case group names to lists of cases")
+
+    return groups
+
+
+def match_cases(cases, patterns):
+    if isinstance(patterns, str):
+        patterns = [patterns]
+
+    return [c for c in cases if any(fnmatch.fnmatch(c, p) for p in patterns)]
+
+
+def shard_results(region_dict, region, cases=None):
+    "region_dict filtered to a region and (optionally) a list of cases"
+    shard = {}
+    for year, results in region_dict.items():
+        shard[year] = {}
+        for key, df in results.items():
+            df = region_rows(df, region)
+            if cases is not None:
+                df = case_rows(df, cases)
+            shard[year][key] = df
+
+    return shard
+
+
+def write_shard(shard, path):
+    """Write a shard to an Excel workbook (one sheet per table and year) or to a
+    Parquet file with every table in a long format (see `results_store`).
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        tables = []
+        for year, results in shard.items():
+            for key, df in results.items():
+                tidy = tidy_table(df, key, year)
+                tidy.insert(0, "Table", key)
+                tables.append(tidy.astype({"Case": str, "Region": object}))
+        pd.concat(tables, ignore_index=True).to_parquet(path, index=False)
+    else:
+        with pd.ExcelWriter(path) as writer:
+            for year, results in shard.items():
+                for key, df in results.items():
+                    df.to_excel(writer, sheet_name=f"{key}_{year}")
+
+    return path
+
+
+def _write_shard_task(task):
+    return write_shard(*task)
+
+
+def write_region_shards(
+    region_dict,
+    regions=None,
+    case_groups=None,
+    file_format="xlsx",
+    folder=SHARD_DIR,
+    workers=SHARD_WORKERS,
+):
+    """Write a file for every region, or every region and case group.
+
+    Files are named <region>.<format> or <region>_<group>.<format> in `folder`
+    and are written in `workers` processes. Returns a list of file paths.
+    """
+    if file_format not in SHARD_FORMATS:
+        raise ValueError(f"file_format must be one of {SHARD_FORMATS}")
+    regions = result_regions(region_dict) if regions is None else regions
+    if case_groups is None:
+        groups = {None: None}
+    else:
+        all_cases = result_cases(region_dict)
+        groups = {
+            name: match_cases(all_cases, patterns)
+            for name, patterns in case_groups.items()
+        }
+
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    tasks = []
+    for region in regions:
+        for group, cases in groups.items():
+            name = region if group is None else f"{region}_{group}"
+            shard = shard_results(region_dict, region, cases)
+            tasks.append((shard, folder / f"{name}.{file_format}"))
+
+    if workers < 2:
+        return [_write_shard_task(task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_write_shard_task, tasks))
+
+
+@app.command()
+def main(
+    results_file: Path = Path(RESULTS_FILE),
+    region: Optional[List[str]] = None,
+    case_groups: Optional[Path] = None,
+    file_format: str = "xlsx",
+    folder: Path = Path(SHARD_DIR),
+    workers: int = SHARD_WORKERS,
+):
+    """Write regional results from a results pickle as one file per region.
+
+    `results_file` is a pickle of (total_dict, region_dict), such as the one
+    written by `distributed_compile.py reduce`. Use --region (more than once) to
+    only write some regions.
+    """
+    with open(results_file, "rb") as f:
+        total_dict, region_dict = pickle.load(f)
+    groups = None if case_groups is None else load_case_groups(case_groups)
+    paths = write_region_shards(
+        region_dict,
+        regions=region or None,
+        case_groups=groups,
+        file_format=file_format,
+        folder=folder,
+        workers=workers,
+    )
+    for path in paths:
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,73 @@
+"""Hashes of the code used by each stage of compiling results.
+
+Outputs saved by `pipeline` and the checkpoints of `zone_trade_attribute_costs`
+are only reused when the hash of the modules they were made with is unchanged.
+"""
+
+import ast
+import hashlib
+from pathlib import Path
+
+# Modules used by each stage. A change to any of them, or to a module in this
+# folder that they import at the top of the file (directly or not), makes the
+# stage out of date.
+STAGE_SOURCES = {
+    "discover": ["case_registry.py", "results_store.py"],
+    "load": ["compile_results.py"],
+    "reduce": ["compile_results.py"],
+    "cost": ["compile_results.py"],
+    "figures": ["compile_results.py", "figure_data.py", "figure_batch.py"],
+    "excel": ["compile_results.py"],
+    "trade-costs": ["zone_trade_attribute_costs.py"],
+}
+
+TRADE_COSTS_FILE = "Zone specific costs.csv"
+
+
+def local_imports(file_name):
+    """Modules in the same folder as this file imported at the top of a module.
+
+    Imports inside functions aren't followed. They are for optional steps (e.g.
+    validation or figures), and modules used by a stage are in STAGE_SOURCES.
+    """
+    source_folder = Path(__file__).resolve().parent
+    tree = ast.parse((source_folder / file_name).read_text())
+    modules = set()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.add(node.module)
+
+    return {
+        f"{module}.py"
+        for module in modules
+        if (source_folder / f"{module}.py").exists()
+    }
+
+
+def source_files(file_names):
+    "Modules in `file_names` and every local module they import, sorted by name"
+    files = set()
+    todo = list(file_names)
+    while todo:
+        name = todo.pop()
+        if name not in files:
+            files.add(name)
+            todo.extend(local_imports(name))
+
+    return sorted(files)
+
+
+def source_hash(file_names):
+    """Hash of the contents of modules in the same folder as this file.
+
+    Local modules imported by `file_names` are included (see `source_files`).
+    """
+    source_folder = Path(__file__).resolve().parent
+    file_hash = hashlib.sha1()
+    for name in source_files(file_names):
+        file_hash.update(name.encode())
+        file_hash.update((source_folder / name).read_bytes())
+
+    return file_hash.hexdigest()
@@ -0,0 +1,129 @@
+"""Fixtures for regression tests against golden outputs.
+
+Outputs are compared with the csv files in tests/golden with a relative tolerance
+of RTOL, so optimized versions of a calculation can be checked against the
+reference results. Run pytest with --update-golden to rewrite the golden files
+after an intended change in results, and --timings-file <path> to append the
+time of every checked call to a csv file.
+"""
+
+import io
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(TESTS_DIR.parent))
+
+from case_registry import find_cases  # noqa: E402
+import network_topology  # noqa: E402
+from synthetic_study import make_study  # noqa: E402
+
+GOLDEN_DIR = TESTS_DIR / "golden"
+RTOL = 1e-5
+ATOL = 1e-6
+
+_TIMINGS = []
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--update-golden",
+        action="store_true",
+        help="Write outputs to tests/golden instead of comparing them",
+    )
+    parser.addoption(
+        "--timings-file",
+        default=None,
+        help="Append the time of each call checked against a golden file to a csv",
+    )
+
+
+def clear_caches():
+    "Clear cached cases, file hashes, and topologies so each call reads the files"
+    find_cases.cache_clear()
+    network_topology.clear_cache()
+
+
+@pytest.fixture(scope="session")
+def study_root(tmp_path_factory):
+    return make_study(tmp_path_factory.mktemp("study"))
+
+
+@pytest.fixture
+def study(study_root, monkeypatch):
+    "The synthetic study, as the current folder. Tests shouldn't modify it."
+    monkeypatch.chdir(study_root)
+    clear_caches()
+    yield study_root
+    clear_caches()
+
+
+@pytest.fixture
+def fresh_study(tmp_path, monkeypatch):
+    "A new copy of the synthetic study, as the current folder, for tests that write"
+    root = make_study(tmp_path / "study")
+    monkeypatch.chdir(root)
+    clear_caches()
+    yield root
+    clear_caches()
+
+
+def as_csv_frame(df):
+    "Dataframe as it is read from csv, so dtypes and index types don't matter"
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+
+    return pd.read_csv(io.StringIO(df.to_csv()))
+
+
+@pytest.fixture
+def golden(request):
+    """Call a function, record its time, and compare the output with a golden file.
+
+    Use as `golden(name, func, *args)`. Returns the output of `func`.
+    """
+    update = request.config.getoption("--update-golden")
+
+    def check(name, func, *args, **kwargs):
+        clear_caches()
+        start = time.perf_counter()
+        output = func(*args, **kwargs)
+        _TIMINGS.append((request.node.nodeid, name, time.perf_counter() - start))
+
+        path = GOLDEN_DIR / f"{name}.csv"
+        if update:
+            GOLDEN_DIR.mkdir(exist_ok=True)
+            as_csv_frame(output).to_csv(path, index=False)
+        else:
+            assert path.exists(), f"No golden file {path}, run with --update-golden"
+            pd.testing.assert_frame_equal(
+                as_csv_frame(output),
+                pd.read_csv(path),
+                check_dtype=False,
+                rtol=RTOL,
+                atol=ATOL,
+            )
+
+        return output
+
+    return check
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not _TIMINGS:
+        return
+    timings = pd.DataFrame(_TIMINGS, columns=["test", "output", "seconds"])
+    terminalreporter.section("golden output timings")
+    for row in timings.sort_values("seconds", ascending=False).itertuples():
+        terminalreporter.write_line(f"{row.seconds:8.3f}s  {row.output}")
+
+    timings_file = config.getoption("--timings-file")
+    if timings_file:
+        timings.insert(0, "time", pd.Timestamp.now().isoformat(timespec="seconds"))
+        timings.insert(1, "pandas", pd.__version__)
+        path = Path(timings_file)
+        timings.to_csv(path, mode="a", header=not path.exists(), index=False)
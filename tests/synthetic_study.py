@@ -0,0 +1,260 @@
+"""Write a small synthetic GenX study for regression tests.
+
+The study has three zones (CA_N, CA_S, WECC_AZ), three lines, 15 resources, 24
+hours, and three cases in 2030 (in a "Complete" folder) and 2045. Values are
+random but fixed by the seed, so outputs can be compared with golden files.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+NUM_HOURS = 24
+HOUR_WEIGHT = 8760 / NUM_HOURS
+ZONES = [1, 2, 3]
+ZONE_NAMES = {1: "CA_N", 2: "CA_S", 3: "WECC_AZ"}
+LINES = [(1, 2), (2, 3), (1, 3)]
+RESOURCE_TYPES = [
+    # (name, STOR, VRE, RPS, CES, CO2 t/MWh)
+    ("coal_1", 0, 0, 0, 0, 1.0),
+    ("naturalgas_ccavgcf_1", 0, 0, 0, 0, 0.4),
+    ("landbasedwind_class3_1", 0, 1, 1, 1, 0.0),
+    ("utilitypv_losangeles_1", 0, 1, 1, 1, 0.0),
+    ("battery_moderate_1", 1, 0, 0, 0, 0.0),
+]
+YEARS = [2030, 2045]
+CASES = {
+    "p1": "No_Policy",
+    "p2": "Emissions_Cap_with_RPS",
+    "s10": "Low_cost_nuclear",
+}
+
+
+def _resources():
+    rows = []
+    for zone in ZONES:
+        for name, stor, vre, rps, ces, co2 in RESOURCE_TYPES:
+            rows.append(
+                {
+                    "Resource": f"{ZONE_NAMES[zone]}_{name}",
+                    "zone": zone,
+                    "STOR": stor,
+                    "DR": 0,
+                    "HEAT": 0,
+                    "VRE": vre,
+                    "RPS": rps,
+                    "CES": ces,
+                    "co2": co2,
+                }
+            )
+    gen = pd.DataFrame(rows)
+    gen.insert(0, "R_ID", np.arange(1, len(gen) + 1))
+
+    return gen
+
+
+def write_case(folder, year, case_idx, rng):
+    inputs = folder / "Inputs"
+    results = folder / "Results"
+    inputs.mkdir(parents=True)
+    results.mkdir(parents=True)
+
+    gen = _resources()
+    num_gen = len(gen)
+    gen["Existing_Cap_MW"] = rng.uniform(100, 1000, num_gen).round(2)
+    gen["Existing_Cap_MWh"] = np.where(gen["STOR"] == 1, gen["Existing_Cap_MW"] * 4, 0)
+    gen["spur_line_miles"] = rng.uniform(0, 50, num_gen).round(1)
+    gen["spur_line_capex"] = (gen["spur_line_miles"] * 3900).round(0)
+    fuel_co2 = {"coal": 0.1, "natural_gas": 0.05}
+    gen["Fuel"] = np.select(
+        [gen["co2"] >= 1.0, gen["co2"] > 0], ["coal", "natural_gas"], "None"
+    )
+    gen["Heat_Rate_MMBTU_per_MWh"] = [
+        co2 / fuel_co2[fuel] if fuel in fuel_co2 else 0.0
+        for co2, fuel in zip(gen["co2"], gen["Fuel"])
+    ]
+    gen["Var_OM_Cost_per_MWh"] = np.select(
+        [gen["Fuel"] == "coal", gen["Fuel"] == "natural_gas", gen["STOR"] == 1],
+        [2.0, 3.0, 0.5],
+        0.0,
+    )
+    gen.drop(columns=["co2"]).to_csv(inputs / "Generators_data.csv", index=False)
+    fuels = pd.DataFrame(
+        {
+            "Time_index": np.arange(0, NUM_HOURS + 1),
+            "coal": [fuel_co2["coal"]] + [2.0] * NUM_HOURS,
+            "natural_gas": [fuel_co2["natural_gas"]]
+            + np.linspace(2.0, 4.0, NUM_HOURS).round(3).tolist(),
+            "None": [0.0] * (NUM_HOURS + 1),
+        }
+    )
+    fuels.to_csv(inputs / "Fuels_data.csv", index=False)
+
+    hours = [f"t{h}" for h in range(1, NUM_HOURS + 1)]
+    load = pd.DataFrame(
+        {
+            "Voll": [50000] + [np.nan] * (NUM_HOURS - 1),
+            "Sub_Weights": [8760] + [np.nan] * (NUM_HOURS - 1),
+            "Time_index": np.arange(1, NUM_HOURS + 1),
+        }
+    )
+    for zone in ZONES:
+        load[f"Load_MW_z{zone}"] = rng.uniform(1000, 3000, NUM_HOURS).round(1)
+    load.to_csv(inputs / "Load_data.csv", index=False)
+
+    variability = pd.DataFrame({"Time_index": np.arange(1, NUM_HOURS + 1)})
+    for resource, vre in zip(gen["Resource"], gen["VRE"]):
+        variability[resource] = rng.uniform(0, 1, NUM_HOURS).round(3) if vre else 1.0
+    variability.to_csv(inputs / "Generators_variability.csv", index=False)
+
+    network = pd.DataFrame(
+        {
+            "Region description": [ZONE_NAMES[z] for z in ZONES],
+            "Network_zones": [f"z{z}" for z in ZONES],
+            "Network_lines": np.arange(1, len(LINES) + 1),
+        }
+    )
+    for zone in ZONES:
+        network[f"z{zone}"] = [
+            1 if start == zone else (-1 if end == zone else 0) for start, end in LINES
+        ]
+    network["Line_Max_Flow_MW"] = [1500.0] * len(LINES)
+    network["Transmission Path Name"] = [
+        f"{ZONE_NAMES[start]}_to_{ZONE_NAMES[end]}" for start, end in LINES
+    ]
+    network["RPS"] = [0.3, 0.4, 0.2]
+    network["CES"] = [0.5, 0.6, 0.4]
+    network.to_csv(inputs / "Network.csv", index=False)
+
+    (folder / "GenX_settings.yml").write_text(
+        yaml.safe_dump({"RPS_Adjustment": 1000.0 * case_idx, "CES_Adjustment": 0.0})
+    )
+
+    # Results
+    start_cap = gen["Existing_Cap_MW"].to_numpy()
+    ret_cap = (start_cap * rng.uniform(0, 0.3, num_gen)).round(2)
+    new_cap = rng.uniform(0, 500, num_gen).round(2)
+    end_cap = start_cap - ret_cap + new_cap
+    is_stor = gen["STOR"].to_numpy() == 1
+    start_energy = np.where(is_stor, start_cap * 4, 0)
+    new_energy = np.where(is_stor, new_cap * 4, 0)
+    capacity = pd.DataFrame(
+        {
+            "Resource": gen["Resource"],
+            "Zone": gen["zone"],
+            "StartCap": start_cap,
+            "RetCap": ret_cap,
+            "NewCap": new_cap,
+            "EndCap": end_cap,
+            "StartEnergyCap": start_energy,
+            "RetEnergyCap": 0.0,
+            "NewEnergyCap": new_energy,
+            "EndEnergyCap": start_energy + new_energy,
+            "StartChargeCap": 0.0,
+            "RetChargeCap": 0.0,
+            "NewChargeCap": 0.0,
+            "EndChargeCap": 0.0,
+        }
+    )
+    total = capacity.drop(columns=["Resource", "Zone"]).sum()
+    total["Resource"] = "Total"
+    total["Zone"] = "n/a"
+    capacity = pd.concat([capacity, total.to_frame().T], ignore_index=True)
+    capacity.to_csv(results / "capacity.csv", index=False)
+
+    hourly_power = rng.uniform(0, 1, (NUM_HOURS, num_gen)) * end_cap
+    hourly_power[:, is_stor] -= end_cap[is_stor] * 0.5
+    hourly_power = hourly_power.round(3)
+    power_sum = (hourly_power * HOUR_WEIGHT).sum(axis=0)
+    power = pd.DataFrame(
+        [gen["Resource"].tolist() + ["Total"]]
+        + [gen["zone"].tolist() + [0]]
+        + [power_sum.tolist() + [power_sum.sum()]]
+        + [row.tolist() + [row.sum()] for row in hourly_power],
+        index=["Resource", "Zone", "Sum"] + hours,
+    )
+    power.to_csv(results / "power.csv", header=False)
+
+    hourly_emissions = np.column_stack(
+        [
+            (hourly_power[:, gen["zone"].to_numpy() == zone].clip(min=0))
+            @ gen.loc[gen["zone"] == zone, "co2"].to_numpy()
+            for zone in ZONES
+        ]
+    ).round(3)
+    emissions_sum = (hourly_emissions * HOUR_WEIGHT).sum(axis=0)
+    emissions = pd.DataFrame(
+        [ZONES + ["Total"]]
+        + [emissions_sum.tolist() + [emissions_sum.sum()]]
+        + [row.tolist() + [row.sum()] for row in hourly_emissions],
+        index=["Zone", "Sum"] + hours,
+    )
+    emissions.to_csv(results / "emissions.csv", header=False)
+
+    cost_rows = ["cTotal", "cFix", "cVar", "cNSE", "cStart", "cUnmetRsv"]
+    zone_costs = rng.uniform(1e6, 1e8, (len(cost_rows), len(ZONES))).round(2)
+    zone_costs[cost_rows.index("cUnmetRsv")] = 0
+    zone_costs[0] = zone_costs[1:].sum(axis=0)
+    costs = pd.DataFrame(
+        [["Total"] + [f"Zone{z}" for z in ZONES]]
+        + [[row.sum()] + row.tolist() for row in zone_costs]
+        + [[2.5e6] + ["-"] * len(ZONES)],
+        index=["Costs"] + cost_rows + ["cNetworkExp"],
+    )
+    costs.to_csv(results / "costs.csv", header=False)
+
+    new_tx = rng.uniform(0, 800, len(LINES)).round(2)
+    pd.DataFrame(
+        {
+            "Line": np.arange(1, len(LINES) + 1),
+            "New_Trans_Capacity": new_tx,
+            "Cost_Trans_Capacity": (new_tx * 30000).round(2),
+        }
+    ).to_csv(results / "network_expansion.csv", index=False)
+
+    line_max = network["Line_Max_Flow_MW"].to_numpy() + new_tx
+    hourly_flow = (rng.uniform(-1, 1, (NUM_HOURS, len(LINES))) * line_max).round(3)
+    flow = pd.DataFrame(
+        [(hourly_flow * HOUR_WEIGHT).sum(axis=0).tolist() + [0.0]]
+        + [row.tolist() + [row.sum()] for row in hourly_flow],
+        index=["Sum"] + hours,
+        columns=[str(line) for line in range(1, len(LINES) + 1)] + ["Total"],
+    )
+    flow.to_csv(results / "flow.csv", index_label="Line")
+
+    prices = pd.DataFrame(
+        rng.uniform(10, 80, (NUM_HOURS, len(ZONES))).round(3),
+        index=hours,
+        columns=[str(z) for z in ZONES],
+    )
+    prices.to_csv(results / "prices.csv", index_label="Zone")
+
+    pd.DataFrame(
+        {"Time_index": np.arange(1, NUM_HOURS + 1), "Weight": HOUR_WEIGHT}
+    ).to_csv(results / "time_weights.csv", index=False)
+
+    pd.DataFrame(
+        {
+            "Zone": ZONES,
+            "RPS_Price": rng.uniform(0, 20, len(ZONES)).round(2),
+            "CES_Price": rng.uniform(0, 20, len(ZONES)).round(2),
+        }
+    ).to_csv(results / "RPS_CES.csv", index=False)
+
+
+def make_study(root, seed=2020):
+    "Write every case of the study under `root` and return the root folder"
+    root = Path(root)
+    rng = np.random.default_rng(seed)
+    for year in YEARS:
+        year_folder = root / f"{year}"
+        if year == YEARS[0]:
+            year_folder = year_folder / "Complete"
+        for case_idx, (case_id, description) in enumerate(CASES.items()):
+            write_case(
+                year_folder / f"{case_id}_{year}_{description}", year, case_idx, rng
+            )
+
+    return root
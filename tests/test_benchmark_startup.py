@@ -0,0 +1,34 @@
+import pandas as pd
+from typer.testing import CliRunner
+
+from benchmark_startup import app
+
+
+def test_benchmark(fresh_study, tmp_path):
+    "One run of each benchmark is timed and appended to the record"
+    record = tmp_path / "startup_times.csv"
+    args = [
+        "--study-folder",
+        str(fresh_study),
+        "--repeat",
+        "1",
+        "--record",
+        str(record),
+    ]
+    for _ in range(2):
+        result = CliRunner().invoke(app, args)
+        assert result.exit_code == 0, result.output
+
+    times = pd.read_csv(record, keep_default_na=False)
+    assert times.columns.tolist() == [
+        "timestamp",
+        "benchmark",
+        "wall_time_s",
+        "import_time_s",
+        "heavy_modules",
+    ]
+    assert times["benchmark"].tolist() == ["--help", "excel only"] * 2
+    assert (times["wall_time_s"] > times["import_time_s"]).all()
+    assert (times["import_time_s"] > 0).all()
+    # Figures aren't drawn, so altair and yaml are never imported
+    assert (times["heavy_modules"] == "").all()
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bulk_edit import DEFAULT_NAME, apply_edits, create_cases, plan_case, row_mask
+from case_registry import CaseRegistry, find_cases
+from create_run_files import copy_run_files
+
+
+@pytest.fixture
+def gen_data():
+    return pd.DataFrame(
+        {
+            "Resource": ["CA_N_solar", "CA_N_wind", "CA_S_coal"],
+            "zone": [1, 1, 2],
+            "Inv_Cost_per_MWyr": [100, 200, 300],
+            "Fixed_OM_Cost_per_MWyr": [10.0, np.nan, 30.0],
+        }
+    )
+
+
+def test_row_mask(gen_data):
+    assert row_mask(gen_data, None, "f").all()
+    assert row_mask(gen_data, {"Resource": "solar|wind"}, "f").tolist() == [
+        True,
+        True,
+        False,
+    ]
+    assert row_mask(gen_data, {"zone": [2]}, "f").tolist() == [False, False, True]
+    assert row_mask(gen_data, {"zone": 1, "Resource": "wind"}, "f").tolist() == [
+        False,
+        True,
+        False,
+    ]
+    with pytest.raises(ValueError):
+        row_mask(gen_data, {"missing": 1}, "f")
+
+
+def test_apply_edits_only_changes_selected_rows(gen_data):
+    edits = [
+        {
+            "columns": ["Inv_Cost_per_MWyr", "Fixed_OM_*"],
+            "where": {"Resource": "solar|wind"},
+            "scale": 0.55,
+        },
+        {"columns": "zone", "where": {"zone": 2}, "add": 1},
+    ]
+    df = apply_edits(gen_data, edits, "Generators_data.csv")
+
+    assert df["Inv_Cost_per_MWyr"].tolist() == [55.0, 110.0, 300]
+    # Unedited integers are written without a decimal point
+    assert df.to_csv(index=False).splitlines()[3] == "CA_S_coal,3,300,30.0"
+    assert df["zone"].dtype == gen_data["zone"].dtype
+    assert df["Fixed_OM_Cost_per_MWyr"].isna().tolist() == [False, True, False]
+    pd.testing.assert_frame_equal(gen_data, gen_data.copy())
+
+    df = apply_edits(gen_data, [{"columns": "zone", "set": 3}], "f")
+    assert df["zone"].tolist() == [3, 3, 3]
+    assert df["zone"].dtype == gen_data["zone"].dtype
+
+
+def test_plan_case(study, tmp_path):
+    base = find_cases(2045)[0].folder
+    edits = [{"file": "Inputs/Load_data.csv", "columns": "Load_MW_z*", "scale": 2}]
+    tasks = plan_case(base, tmp_path / "new", edits)
+
+    plan = {
+        dest.relative_to(tmp_path / "new").as_posix(): (edits, link)
+        for _, dest, edits, link in tasks
+    }
+    assert not any(path.startswith("Results") for path in plan)
+    assert plan["Inputs/Load_data.csv"] == (edits, False)
+    assert plan["Inputs/Network.csv"] == ([], True)
+    assert plan["GenX_settings.yml"] == ([], False)
+
+    with pytest.raises(ValueError):
+        plan_case(base, tmp_path / "new", [dict(edits[0], file="Inputs/x.csv")])
+
+
+def test_create_cases(fresh_study):
+    (fresh_study / "Run.jl").write_text("")
+    copy_run_files()
+    base = find_cases(2045)[0].folder
+    config = {
+        "bases": [base],
+        "variants": {
+            "High_load": [
+                {"file": "Inputs/Load_data.csv", "columns": "Load_MW_z*", "scale": 2}
+            ]
+        },
+        "output": base.parent,
+        "name": DEFAULT_NAME,
+    }
+    (new_case,) = create_cases(config, workers=2)
+    assert new_case.name == "p1Highload_2045_No_Policy_High_load"
+
+    base_load = pd.read_csv(base / "Inputs/Load_data.csv")
+    new_load = pd.read_csv(new_case / "Inputs/Load_data.csv")
+    np.testing.assert_allclose(new_load["Load_MW_z1"], base_load["Load_MW_z1"] * 2)
+    assert (new_case / "Inputs/Network.csv").samefile(base / "Inputs/Network.csv")
+    assert not (new_case / "Run.sh").samefile(base / "Run.sh")
+
+    # Writing the run files of the new case doesn't change the base case
+    copy_run_files()
+    assert f"/{new_case.name}/Run.jl" in (new_case / "Run.sh").read_text()
+    assert f"/{new_case.name}/" not in (base / "Run.sh").read_text()
+
+    assert create_cases(config) == []
+
+
+def test_new_case_ids(fresh_study):
+    "Every variant of every base case has its own case id"
+    bases = [case.folder for case in find_cases(2045)][:2]
+    edits = [{"file": "Inputs/Load_data.csv", "columns": "Load_MW_z*", "scale": 2}]
+    config = {
+        "bases": bases,
+        "variants": {"High_load": edits, "Low_load": edits},
+        "variant_ids": {"Low_load": "L"},
+        "output": bases[0].parent,
+        "name": DEFAULT_NAME,
+    }
+    new_cases = create_cases(config, workers=1)
+
+    registry = CaseRegistry(bases + new_cases)
+    assert len(registry) == 6
+    assert sorted(registry.case_ids) == sorted(
+        ["p1", "p1Highload", "p1L", "p2", "p2Highload", "p2L"]
+    )
+    for case in registry:
+        assert registry.by_id(case.case_id) == [case]
+        assert registry.get(case.case_id, 2045) == case
+
+
+def test_case_id_conflicts(fresh_study):
+    "Cases with the id and year of another case aren't created"
+    base = find_cases(2045)[0].folder
+    edits = [{"file": "Inputs/Load_data.csv", "columns": "Load_MW_z*", "scale": 2}]
+    config = {
+        "bases": [base],
+        "variants": {"High_load": edits, "Highload": edits},
+        "output": base.parent,
+        "name": DEFAULT_NAME,
+    }
+    folders = sorted(base.parent.iterdir())
+    with pytest.raises(ValueError, match="same case id and year"):
+        create_cases(config)
+    # Keeping the base case id is also a conflict
+    with pytest.raises(ValueError, match="same case id and year"):
+        create_cases(dict(config, name="{folder}_{variant}"))
+    assert sorted(base.parent.iterdir()) == folders
@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import pytest
+
+from case_registry import CaseRegistry, find_cases, parse_case_name
+
+
+def test_parse_case_name():
+    assert parse_case_name("s10_2045_Low_cost_nuclear") == (
+        "s10",
+        2045,
+        "Low cost nuclear",
+    )
+    assert parse_case_name("p2_2030_Emissions_Cap_with_RPS") == (
+        "p2",
+        2030,
+        "Emissions Cap w/ RPS",
+    )
+    # Malformed names don't have a year
+    assert parse_case_name("notes") == ("notes", None, "")
+    assert parse_case_name("p1_final_run") == ("p1", None, "run")
+
+
+@pytest.fixture
+def registry():
+    return CaseRegistry(
+        Path("study") / name
+        for name in [
+            "s1_2030_No_Policy",
+            "s10_2030_Low_cost_nuclear",
+            "s1_2045_No_Policy",
+            "s11_2045_Emissions_Cap_with_RPS",
+            "old_results",
+        ]
+    )
+
+
+def test_lookups(registry):
+    "Case ids are matched exactly, so s1 doesn't match s10 or s11"
+    assert [c.folder.name for c in registry.by_id("s1")] == [
+        "s1_2030_No_Policy",
+        "s1_2045_No_Policy",
+    ]
+    assert registry.get("s10").folder.name == "s10_2030_Low_cost_nuclear"
+    assert registry.get("s1", 2045).folder.name == "s1_2045_No_Policy"
+    assert registry.get("s10", 2045) is None
+    assert registry.get("s2") is None
+    assert registry.by_id("s2") == []
+
+    assert sorted(c.case_id for c in registry.by_year(2045)) == ["s1", "s11"]
+    assert len(registry.by_description("No Policy")) == 2
+    assert registry.by_year(None)[0].folder.name == "old_results"
+
+    table = registry.table
+    assert len(table) == len(registry) == 5
+    assert table["year"].isna().sum() == 1
+
+
+def test_ambiguous_cases(registry):
+    with pytest.raises(ValueError, match="multiple years"):
+        registry.get("s1")
+
+    duplicate = CaseRegistry(
+        [Path("a") / "s1_2030_No_Policy", Path("b") / "s1_2030_High_load"]
+    )
+    with pytest.raises(ValueError, match="more than one 2030 case"):
+        duplicate.get("s1", 2030)
+
+
+def test_find_cases(study):
+    "Only folders with a Results folder are cases"
+    cases = find_cases(2045)
+    assert len(cases) == 3
+    assert all(case.results_folder.is_dir() for case in cases)
+    assert find_cases(2045) is cases
+    assert find_cases(2045).get("s10", 2045).description == "Low cost nuclear"
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+import compile_results
+from synthetic_study import YEARS
+
+COMPARE_FUNCTIONS = [
+    "compare_capacity",
+    "compare_energy",
+    "compare_emissions",
+    "compare_costs",
+    "compare_rps_ces_prices",
+    "compare_tx_build",
+    "compare_spur_line_build",
+    "compare_demand",
+]
+
+
+def build_all_years():
+    "Results of every year with costs carried over to the next period, as in main"
+    total_dict, region_dict = {}, {}
+    prev_spur_costs = None
+    prev_tx_costs = None
+    for year in compile_results.find_years():
+        region_dict[year], total_dict[year] = compile_results.build_results(
+            year, prev_spur_costs, prev_tx_costs
+        )
+        prev_spur_costs = region_dict[year]["spur_line"]
+        prev_tx_costs = total_dict[year]["network"]
+
+    return compile_results.calc_energy_cost(total_dict, region_dict, sorted(total_dict))
+
+
+def by_year(results, key):
+    return pd.concat({year: results[year][key] for year in results}, names=["Year"])
+
+
+@pytest.mark.parametrize("year", YEARS)
+@pytest.mark.parametrize("func_name", COMPARE_FUNCTIONS)
+def test_compare(study, golden, func_name, year):
+    golden(f"{func_name}_{year}", getattr(compile_results, func_name), year)
+
+
+def test_results_rollover(study, golden):
+    "2045 costs include spur line and transmission costs carried over from 2030"
+    results = {}
+
+    def total_costs():
+        results["total"], results["region"] = build_all_years()
+        return by_year(results["total"], "costs")
+
+    golden("rollover_total_costs", total_costs)
+    golden("rollover_region_costs", lambda: by_year(results["region"], "costs"))
+    golden("rollover_energy_cost", lambda: by_year(results["total"], "energy_cost"))
+
+    costs_2045 = results["total"][2045]["costs"]
+    assert (costs_2045["prev_period_transmission"] > 0).all()
+    assert (costs_2045["prev_period_spur_line"] > 0).all()
+
+
+def test_low_memory_results(study):
+    "Results kept by the low memory build match the full results, downcast"
+    total_dict, region_dict = build_all_years()
+    low_total, low_region = compile_results.build_results_low_memory(
+        YEARS, excel=False
+    )
+
+    assert sorted(low_region) == sorted(low_total) == YEARS
+    for year in YEARS:
+        assert list(low_region[year]) == ["network"]
+        for key, df in low_region[year].items():
+            expected = compile_results.downcast_results(region_dict[year][key])
+            pd.testing.assert_frame_equal(df, expected)
+        assert list(low_total[year]) == list(total_dict[year])
+        for key, df in low_total[year].items():
+            expected = compile_results.downcast_results(total_dict[year][key])
+            pd.testing.assert_frame_equal(df, expected)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from case_registry import find_cases
+from congestion import (
+    calc_congestion_case,
+    congestion_results,
+    get_congestion,
+    read_congestion_case,
+    utilization_histogram,
+    write_congestion,
+)
+
+
+def test_utilization_histogram():
+    # Two hours of two lines. Flows at or over the limit are in the last bin.
+    utilization = np.array([[0.05, 1.2], [0.95, 0.5]])
+    weights = np.array([2.0, 3.0])
+
+    counts = utilization_histogram(utilization, weights)
+
+    expected = np.zeros((2, 10))
+    expected[0, [0, 9]] = [2, 3]
+    expected[1, [9, 5]] = [2, 3]
+    np.testing.assert_array_equal(counts, expected)
+
+
+def test_calc_congestion_case(study):
+    case = find_cases(2030)[0]
+    case_data = read_congestion_case(case)
+    lines, flow, prices, _, topology, weights = case_data
+    df = calc_congestion_case(case_data)
+
+    assert df.index.tolist() == topology.lines.tolist()
+    # Every hour is in one utilization bin
+    histogram = df.filter(like="Utilization ")
+    np.testing.assert_allclose(histogram.sum(axis=1), weights.sum())
+    assert (df["Hours at limit"] <= histogram.iloc[:, -1] + 1e-6).all()
+
+    # Rent of a line is its flow times the price at its end minus its start
+    line = topology.lines[0]
+    incidence = topology.incidence.toarray()[:, 0]
+    start = topology.zones[int(np.argmax(incidence))][1:]
+    end = topology.zones[int(np.argmin(incidence))][1:]
+    spread = prices[end] - prices[start]
+    rent = (flow[:, lines.index(line)] * spread.to_numpy() * weights).sum()
+    np.testing.assert_allclose(df.loc[line, "Congestion rent ($)"], rent, rtol=1e-5)
+
+
+def test_congestion_results(study, golden):
+    df = golden("congestion_results_2030", congestion_results, 2030)
+    assert df.index.names == ["Case", "Line"]
+
+
+def test_mismatched_hours(fresh_study):
+    case = find_cases(2030)[0]
+    path = case.results_folder / "flow.csv"
+    lines = path.read_text().splitlines(keepends=True)
+    path.write_text("".join(lines[:-1]))
+
+    with pytest.raises(ValueError, match="hours of flows"):
+        read_congestion_case(case)
+
+
+def test_write_and_get_congestion(study, tmp_path):
+    db_path = tmp_path / "store.sqlite"
+    write_congestion([2030], db_path)
+    # Writing a year again replaces its rows
+    write_congestion([2030], db_path)
+
+    df = get_congestion(year=2030, case="No Policy", db_path=db_path)
+    expected = congestion_results(2030).loc["No Policy"]
+    assert df.index.get_level_values("Line").tolist() == expected.index.tolist()
+    pd.testing.assert_frame_equal(
+        df.droplevel(["Year", "Case"]),
+        expected,
+        check_dtype=False,
+        rtol=1e-6,
+    )
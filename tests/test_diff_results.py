@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+from typer.testing import CliRunner
+
+from diff_results import (
+    app,
+    diff_stores,
+    diff_table,
+    largest_movers,
+    load_table,
+    significant_changes,
+)
+from results_store import connect
+
+
+def write_costs(db_path, values):
+    "A store with a costs table of one row per region"
+    df = pd.DataFrame(
+        {
+            "Year": 2030,
+            "Case": "No Policy",
+            "Region": list(values),
+            "Resource Name": None,
+            "Category": "cTotal",
+            "Value": list(values.values()),
+        }
+    )
+    with connect(db_path) as con:
+        df.to_sql("costs", con, index=False)
+
+    return db_path
+
+
+def test_diff_table(tmp_path):
+    old = write_costs(
+        tmp_path / "old.sqlite",
+        {"CA_N": 1000.0, "CA_S": 50.0, "WECC_AZ": 10.0, "NM": 7.0},
+    )
+    new = write_costs(
+        tmp_path / "new.sqlite",
+        {"CA_N": 1100.0, "CA_S": 80.0, "NV": 5.0, "NM": 7.0},
+    )
+
+    diff = diff_table(load_table(old, "costs"), load_table(new, "costs"), "costs")
+    rows = diff.set_index("Region")
+    assert rows["Status"].to_dict() == {
+        "CA_N": "changed",
+        "CA_S": "changed",
+        "WECC_AZ": "removed",
+        "NV": "added",
+    }
+    assert rows.loc["CA_S", "Change"] == 30
+    assert rows.loc["CA_S", "Relative Change"] == pytest.approx(0.6)
+    assert rows["Resource Name"].isna().all()
+
+    # Changes within the tolerance are dropped, added and removed rows are kept
+    kept = significant_changes(diff, atol=50)
+    assert kept["Region"].tolist() == ["CA_N", "WECC_AZ", "NV"]
+
+    # Added and removed rows have no change and are ranked last
+    assert largest_movers(diff, n=2)["Region"].tolist() == ["CA_N", "CA_S"]
+    relative = largest_movers(diff, relative=True)["Region"].tolist()
+    assert relative == ["CA_S", "CA_N", "WECC_AZ", "NV"]
+
+
+def test_missing_store(tmp_path):
+    "A mistyped store path is an error, not an empty store"
+    old = write_costs(tmp_path / "old.sqlite", {"CA_N": 100.0})
+    missing = tmp_path / "olx.sqlite"
+
+    with pytest.raises(FileNotFoundError):
+        diff_stores(missing, old, tables=["costs"])
+    result = CliRunner().invoke(app, [str(missing), str(old)])
+    assert result.exit_code != 0
+    assert not missing.exists()
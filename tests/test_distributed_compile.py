@@ -0,0 +1,94 @@
+import pickle
+import shutil
+
+import pandas as pd
+import pytest
+from typer.testing import CliRunner
+
+from compile_results import build_results, calc_energy_cost, results_carry_over
+from create_run_files import MAP_SCRIPT, copy_run_files, write_map_array_script
+from distributed_compile import app, map_case, read_summaries
+from synthetic_study import YEARS
+
+
+def assert_results_equal(left, right):
+    assert left.keys() == right.keys()
+    for key in left:
+        if isinstance(left[key], pd.DataFrame):
+            pd.testing.assert_frame_equal(left[key], right[key])
+        else:
+            pd.testing.assert_series_equal(left[key], right[key])
+
+
+def test_map_local_and_reduce(study, tmp_path):
+    "Summaries mapped in local processes reduce to the same results as compiling"
+    runner = CliRunner()
+    summary_dir = tmp_path / "summaries"
+    results_file = tmp_path / "results.pkl"
+    study_folders = [str(study / str(year)) for year in YEARS]
+    result = runner.invoke(
+        app,
+        ["map-local", *study_folders, "--summary-dir", str(summary_dir)]
+        + ["--workers", "2"],
+    )
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(
+        app,
+        ["reduce", "--summary-dir", str(summary_dir), "--no-excel"]
+        + ["--results-file", str(results_file)],
+    )
+    assert result.exit_code == 0, result.output
+    with open(results_file, "rb") as f:
+        total_dict, region_dict = pickle.load(f)
+
+    # The same steps as compile_results.main
+    expected_total, expected_region = {}, {}
+    prev_spur_costs, prev_tx_costs = None, None
+    for year in YEARS:
+        expected_region[year], expected_total[year] = build_results(
+            year, prev_spur_costs, prev_tx_costs
+        )
+        prev_spur_costs, prev_tx_costs = results_carry_over(
+            expected_region[year], expected_total[year]
+        )
+    expected_total, expected_region = calc_energy_cost(
+        expected_total, expected_region, YEARS
+    )
+    for year in YEARS:
+        assert_results_equal(region_dict[year], expected_region[year])
+        assert_results_equal(total_dict[year], expected_total[year])
+
+
+def test_no_map_script_without_cases(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Run.jl").write_text("")
+    copy_run_files()
+    assert not (tmp_path / MAP_SCRIPT).exists()
+
+    with pytest.raises(ValueError):
+        write_map_array_script([], dest_folder=tmp_path)
+
+
+def test_summaries_keep_case_folders(study, tmp_path, monkeypatch):
+    "Cases read from summaries point at the case folders, not the working directory"
+    summary_dir = tmp_path / "summaries"
+    folder = study / "2030" / "Complete" / "p1_2030_No_Policy"
+    map_case(folder, summary_dir)
+    monkeypatch.chdir(tmp_path)
+
+    cases, summaries = read_summaries(summary_dir)[2030]
+    assert cases.get("p1", 2030).folder == folder.resolve()
+    assert len(summaries) == 1
+
+
+def test_cases_without_a_year(study, tmp_path):
+    summary_dir = tmp_path / "summaries"
+    folder = tmp_path / "p1_final_run"
+    shutil.copytree(study / "2030" / "Complete" / "p1_2030_No_Policy", folder)
+    with pytest.raises(ValueError, match="year"):
+        map_case(folder, summary_dir)
+
+    # Summaries written under a folder that isn't a year aren't skipped
+    (summary_dir / "None").mkdir(parents=True)
+    with pytest.raises(ValueError, match="isn't a year"):
+        read_summaries(summary_dir)
@@ -0,0 +1,117 @@
+import altair as alt
+import pytest
+
+from compile_results import (
+    build_results,
+    calc_energy_cost,
+    make_figures,
+    results_carry_over,
+)
+from figure_batch import build_work_plan, load_figure_config
+from figure_data import FigureCache
+from synthetic_study import YEARS
+
+
+class FakeChart:
+    def __init__(self, saved):
+        self.saved = saved
+
+    def save(self, file_name, **kwargs):
+        self.saved.append(file_name)
+        with open(file_name, "w") as f:
+            f.write("png")
+
+    def to_dict(self):
+        return {"mark": "bar"}
+
+
+def test_figure_cache(tmp_path):
+    saved = []
+    cache = FigureCache(tmp_path / "cache")
+    file_name = tmp_path / "figure.png"
+
+    def render(key, **kwargs):
+        return cache.render(file_name, key, lambda: FakeChart(saved), **kwargs)
+
+    assert render("a")
+    assert not render("a")
+    assert render("b")
+    assert render("b", force=True)
+    file_name.unlink()
+    assert render("b")
+    assert len(saved) == 4
+
+
+def test_work_plan_with_missing_year(tmp_path, capsys):
+    config_path = tmp_path / "figures.yml"
+    config_path.write_text(
+        "groups:\n"
+        "  policy: [No Policy, Emissions Cap w/ RPS]\n"
+        "  future:\n"
+        "    cases: [No Policy]\n"
+        "    years: [2050]\n"
+        "years: [2030, 2050]\n"
+        "figures: [cost_co2_cap_energy, tx_expansion]\n"
+    )
+    config = load_figure_config(config_path)
+
+    tasks = build_work_plan(config, [2030, 2045], cases=["No Policy"])
+    assert [task.file_name for task in tasks] == [
+        "policy_cost_co2_cap_energy_2030.png",
+        "policy_tx_expansion.png",
+    ]
+    assert tasks[1].years == (2030,)
+    output = capsys.readouterr().out
+    assert "No results for years [2050], skipping them for policy" in output
+    assert "No results for years [2050], skipping them for future" in output
+    assert "['Emissions Cap w/ RPS'] in policy are not in the results" in output
+
+    config_path.write_text("groups:\n  policy: [No Policy]\nfigures: [bar_chart]\n")
+    with pytest.raises(ValueError, match="Unknown figure types"):
+        load_figure_config(config_path)
+
+
+def test_unchanged_figures_are_skipped(fresh_study, monkeypatch):
+    "Figures are only drawn again when the data of their cases change"
+    saved = []
+
+    def save(chart, file_name, **kwargs):
+        FakeChart(saved).save(file_name)
+
+    monkeypatch.setattr(alt.TopLevelMixin, "save", save)
+
+    total_dict, region_dict = {}, {}
+    prev_spur_costs, prev_tx_costs = None, None
+    for year in YEARS:
+        region_dict[year], total_dict[year] = build_results(
+            year, prev_spur_costs, prev_tx_costs
+        )
+        prev_spur_costs, prev_tx_costs = results_carry_over(
+            region_dict[year], total_dict[year]
+        )
+    total_dict, region_dict = calc_energy_cost(total_dict, region_dict, YEARS)
+    config_path = fresh_study / "figures.yml"
+    config_path.write_text("groups:\n  g: [No Policy, Low cost nuclear]\n")
+
+    def draw():
+        saved.clear()
+        make_figures(total_dict, region_dict, config_path=config_path, workers=1)
+        return sorted(saved)
+
+    assert draw() == [
+        "g_capacity_changes.png",
+        "g_cost_co2_cap_energy_2030.png",
+        "g_cost_co2_cap_energy_2045.png",
+        "g_transmission_spur_costs.png",
+        "g_tx_expansion.png",
+    ]
+    assert draw() == []
+
+    # Cases that aren't in the group don't change its figures
+    capacity = total_dict[2045]["capacity"]
+    final = capacity.index.get_level_values("Category") == "Final Capacity"
+    capacity.loc[final, "Emissions Cap w/ RPS"] *= 2
+    assert draw() == []
+
+    capacity.loc[final, "No Policy"] *= 2
+    assert draw() == ["g_cost_co2_cap_energy_2045.png"]
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from case_registry import find_cases
+from hourly_analytics import (
+    calc_hourly_case,
+    duration_curve,
+    hourly_results,
+    read_hourly_case,
+)
+
+
+def test_duration_curve():
+    df = pd.DataFrame({"a": [1.0, 3.0, 2.0], "b": [5.0, 4.0, 6.0]})
+
+    curve = duration_curve(df)
+    assert curve.index.tolist() == [1, 2, 3]
+    assert curve["a"].tolist() == [3, 2, 1]
+    assert curve["b"].tolist() == [6, 5, 4]
+
+    # Each value is repeated for the hours it represents
+    weighted = duration_curve(df, weights=[2, 1, 1])
+    assert weighted.index.tolist() == [1, 2, 3, 4]
+    assert weighted["a"].tolist() == [3, 2, 1, 1]
+    assert weighted["b"].tolist() == [6, 5, 5, 4]
+
+
+def test_calc_hourly_case(study):
+    case_data = read_hourly_case(find_cases(2030)[0])
+    resources, hourly, prices, load, available, weights = case_data
+    results = calc_hourly_case(case_data)
+
+    # Dispatch groups add up to the generation of every resource
+    np.testing.assert_allclose(
+        results["dispatch"].sum(axis=1), hourly.sum(axis=1), rtol=1e-5
+    )
+    assert (results["curtailment"].to_numpy() >= 0).all()
+    assert (results["net_load"] <= load.to_numpy() + 1e-3).all().all()
+    assert list(results["prices"].columns) == ["CA_N", "CA_S", "WECC_AZ"]
+
+
+def test_hourly_results(study, golden):
+    def dispatch():
+        df = hourly_results(2030)["dispatch"]
+        assert df.index.names == ["Case", "Hour"]
+        return df.melt(ignore_index=False, value_name="MW")
+
+    golden("hourly_dispatch_2030", dispatch)
+
+    # Duration curves are on the scale of the hours represented by the cases
+    price_duration = hourly_results(2030)["price_duration"]
+    assert price_duration.groupby("Case").size().eq(8760).all()
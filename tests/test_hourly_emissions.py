@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from case_registry import find_cases
+from hourly_emissions import (
+    calc_emissions_case,
+    marginal_intensity,
+    read_emissions_case,
+    write_hourly_emissions,
+)
+
+
+def test_marginal_intensity():
+    # Two hours, three resources: two in zone 1 and one in zone 2
+    hourly_power = np.array([[10.0, 5.0, 0.0], [10.0, 0.0, 0.0]])
+    resource_zones = np.array([1, 1, 2])
+    costs = np.array([[20.0, 40.0, 10.0], [20.0, 40.0, 10.0]])
+    rates = np.array([0.4, 1.0, 0.0])
+
+    marginal = marginal_intensity(hourly_power, resource_zones, [1, 2], costs, rates)
+
+    # The most expensive generating resource sets the marginal rate
+    np.testing.assert_allclose(marginal[:, 0], [1.0, 0.4])
+    # No resource is generating in zone 2
+    assert np.isnan(marginal[:, 1]).all()
+
+
+def test_calc_emissions_case(study):
+    case = find_cases(2030)[0]
+    case_data = read_emissions_case(case)
+    df = calc_emissions_case(case.description, case_data)
+
+    zones = case_data[2]
+    assert len(df) == len(zones) * case_data[1].shape[0]
+    # Weighted hourly emissions add up to the Sum row of emissions.csv
+    emissions = pd.read_csv(case.results_folder / "emissions.csv", index_col=0)
+    totals = (df["Emissions (t)"] * df["Weight"]).groupby(df["Zone"]).sum()
+    np.testing.assert_allclose(
+        totals.to_numpy(),
+        emissions.loc["Sum", [str(float(z)) for z in zones]].to_numpy(dtype=float),
+        rtol=1e-4,
+    )
+    average = df["Emissions (t)"] / df["Generation (MWh)"]
+    np.testing.assert_allclose(df["Average CO2 (t/MWh)"], average, rtol=1e-5)
+
+
+def test_write_hourly_emissions(study, tmp_path, golden):
+    def hourly_emissions():
+        path = write_hourly_emissions(2030, tmp_path / "emissions.parquet")
+        return pd.read_parquet(path)
+
+    df = golden("hourly_emissions_2030", hourly_emissions)
+    assert df["Case"].unique().tolist() == [c.description for c in find_cases(2030)]
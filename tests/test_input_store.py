@@ -0,0 +1,30 @@
+import pandas as pd
+
+import input_store
+from input_store import read_input_csv
+
+
+def test_frame_cache_is_bounded(tmp_path, monkeypatch):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"{i}.csv"
+        pd.DataFrame({"x": range(i * 100, i * 100 + 1000)}).to_csv(path, index=False)
+        paths.append(path)
+    input_store.clear_cache()
+    size = read_input_csv(paths[0]).memory_usage(deep=True).sum()
+    monkeypatch.setattr(input_store, "FRAME_CACHE_MAX_BYTES", int(2.5 * size))
+
+    for path in paths:
+        read_input_csv(path)
+    # Only the two most recently used dataframes are kept
+    assert len(input_store._FRAMES) == 2
+    assert input_store._FRAME_BYTES <= input_store.FRAME_CACHE_MAX_BYTES
+
+    # Cached copies can be changed without changing the cache
+    df = read_input_csv(paths[3])
+    df["x"] = 0
+    assert read_input_csv(paths[3])["x"].iloc[0] == 300
+    assert read_input_csv(paths[0])["x"].iloc[0] == 0
+
+    input_store.clear_cache()
+    assert input_store._FRAME_BYTES == 0
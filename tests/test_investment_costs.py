@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from investment_costs import capital_recovery_factor, investment_cost_calculator
+
+
+def test_capital_recovery_factor():
+    # Continuous: e^(rn) (e^r - 1) / (e^(rn) - 1) with r = 0.05, n = 20
+    # = 2.718282 * 0.051271 / 1.718282
+    assert capital_recovery_factor(0.05, 20) == pytest.approx(0.0811097, abs=1e-7)
+    # Discrete: r (1 + r)^n / ((1 + r)^n - 1) = 0.05 * 2.653298 / 1.653298
+    assert capital_recovery_factor(0.05, 20, "discrete") == pytest.approx(
+        0.0802426, abs=1e-7
+    )
+    np.testing.assert_allclose(
+        capital_recovery_factor([0.05, 0.05], [20, 20]), [0.0811097] * 2, atol=1e-7
+    )
+    with pytest.raises(ValueError):
+        capital_recovery_factor(0.05, 20, "monthly")
+
+
+def test_investment_cost_calculator():
+    capex = pd.Series([1000.0, 2000.0], index=["a", "b"])
+    annual = investment_cost_calculator(capex, 0.05, 20)
+    assert annual.index.tolist() == ["a", "b"]
+    np.testing.assert_allclose(annual, [81.1097, 162.2194], atol=1e-4)
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import network_topology
+from case_registry import CaseRegistry
+from network_topology import case_topology, check_topologies, load_topology
+
+# Three zones and three lines, listed in the order 1, 3, 2. Each line starts in
+# the zone with 1 and ends in the zone with -1.
+NETWORK = pd.DataFrame(
+    {
+        "Region description": ["CA_N", "CA_S", "WECC_AZ"],
+        "Network_zones": ["z1", "z2", "z3"],
+        "Network_lines": [1, 3, 2],
+        "z1": [1, 1, 0],
+        "z2": [-1, 0, 1],
+        "z3": [0, -1, -1],
+        "Line_Max_Flow_MW": [1500.0, 800.0, 1200.0],
+        "Transmission Path Name": [
+            "CA_N_to_CA_S",
+            "CA_N_to_WECC_AZ",
+            "CA_S_to_WECC_AZ",
+        ],
+    }
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    network_topology.clear_cache()
+    yield
+    network_topology.clear_cache()
+
+
+def write_case(root, name, network):
+    inputs = root / name / "Inputs"
+    inputs.mkdir(parents=True)
+    network.to_csv(inputs / "Network.csv", index=False)
+
+    return root / name
+
+
+def test_topology(tmp_path):
+    case = CaseRegistry([write_case(tmp_path, "p1_2030_No_Policy", NETWORK)])[0]
+    topology = case_topology(case)
+
+    assert topology.zones == ["z1", "z2", "z3"]
+    assert topology.zone_names == ["CA_N", "CA_S", "WECC_AZ"]
+    assert topology.lines.tolist() == [1, 3, 2]
+    assert topology.path_names.to_dict() == {
+        1: "CA_N_to_CA_S",
+        3: "CA_N_to_WECC_AZ",
+        2: "CA_S_to_WECC_AZ",
+    }
+    assert topology.base_capacity[3] == 800
+
+    # Zones x lines, 1 at the start zone and -1 at the end zone of each line
+    np.testing.assert_array_equal(
+        topology.incidence.toarray(),
+        [[1, 1, 0], [-1, 0, 1], [0, -1, -1]],
+    )
+    assert topology.zone_lines("z3") == [3, 2]
+    assert topology.direction("z2").to_dict() == {1: -1, 3: 0, 2: 1}
+    assert topology.region_lines == {"z1": [1, 3], "z2": [1, 2], "z3": [3, 2]}
+
+    # Files with the same contents share a topology
+    other = CaseRegistry([write_case(tmp_path, "p2_2030_Other", NETWORK)])[0]
+    assert case_topology(other) is topology
+    assert load_topology(other.inputs_folder / "Network.csv") is topology
+
+
+def test_check_topologies(tmp_path, capsys):
+    renamed = NETWORK.assign(
+        **{"Transmission Path Name": ["North_South", "North_AZ", "South_AZ"]}
+    )
+    extra_line = pd.concat(
+        [NETWORK, NETWORK.iloc[[0]].assign(Network_lines=4)], ignore_index=True
+    )
+    cases = CaseRegistry(
+        [
+            write_case(tmp_path, "p1_2030_No_Policy", NETWORK),
+            write_case(tmp_path, "p2_2030_Renamed", renamed),
+            write_case(tmp_path, "p3_2030_Extra_line", extra_line),
+        ]
+    )
+
+    groups = check_topologies(cases[:2])
+    assert sorted(groups.values()) == [["p1_2030_No_Policy"], ["p2_2030_Renamed"]]
+    assert "different network topologies" in capsys.readouterr().out
+
+    with pytest.raises(ValueError, match="different transmission lines"):
+        check_topologies(cases)
@@ -0,0 +1,65 @@
+import json
+import shutil
+
+import pandas as pd
+
+from case_registry import find_cases
+from pipeline import run_stages
+from stage_hash import STAGE_SOURCES, source_files
+
+
+def test_stage_sources_include_imported_modules():
+    load_sources = source_files(STAGE_SOURCES["load"])
+    for module in [
+        "case_registry.py",
+        "input_store.py",
+        "prefetch.py",
+        "progress.py",
+        "results_store.py",
+        "time_weights.py",
+    ]:
+        assert module in load_sources
+    assert "figure_data.py" in source_files(STAGE_SOURCES["reduce"])
+
+
+def test_removed_case_summaries_are_pruned(fresh_study):
+    root = fresh_study / ".pipeline"
+    run_stages(["load"], root=root)
+    removed = find_cases(2045)[0]
+    summary = root / "load" / "2045" / f"{removed.folder.name}.pkl"
+    assert summary.exists()
+
+    shutil.rmtree(removed.folder)
+    find_cases.cache_clear()
+    summaries = run_stages(["load"], root=root)._outputs["load"]
+
+    assert not summary.exists()
+    assert len(summaries[2045]) == len(find_cases(2045))
+    manifest = json.loads((root / "manifest.json").read_text())
+    assert not any(removed.folder.name in path for path in manifest["load"]["cases"])
+
+
+def test_cases_with_the_same_description(fresh_study, capsys):
+    "Summaries are kept by folder, so cases that share a description don't mix"
+    root = fresh_study / ".pipeline"
+    case = find_cases(2045)[0]
+    copy = case.folder.parent / case.folder.name.replace(case.case_id, "p9", 1)
+    shutil.copytree(case.folder, copy)
+    capacity_path = copy / "Results" / "capacity.csv"
+    capacity = pd.read_csv(capacity_path)
+    capacity["EndCap"] *= 2
+    capacity.to_csv(capacity_path, index=False)
+    find_cases.cache_clear()
+    cases = find_cases(2045)
+    assert cases.descriptions.count(case.description) == 2
+
+    summaries = run_stages(["load"], root=root)._outputs["load"][2045]
+    by_folder = {c.folder.name: s for c, s in zip(cases, summaries)}
+    assert not by_folder[case.folder.name]["capacity"].equals(
+        by_folder[copy.name]["capacity"]
+    )
+
+    capacity.to_csv(capacity_path, index=False, float_format="%.3f")
+    capsys.readouterr()
+    run_stages(["load"], root=root)
+    assert "2045: reading 1 of 4 cases" in capsys.readouterr().out
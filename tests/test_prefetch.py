@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from case_registry import CaseRegistry
+from prefetch import case_sizes, read_case_files
+
+FILE_SIZE = 1000
+
+
+@pytest.fixture
+def cases(tmp_path):
+    folders = []
+    for num in range(8):
+        folder = tmp_path / f"p{num}_2030_Case"
+        (folder / "Results").mkdir(parents=True)
+        (folder / "Results" / "flow.csv").write_text("x" * FILE_SIZE)
+        folders.append(folder)
+
+    # Cases are in the order of their folders
+    return list(CaseRegistry(folders))
+
+
+def read_outstanding(cases, max_bytes, depth=4):
+    """Read every case, with earlier cases slower to read than later ones.
+
+    Returns the cases in the order they were yielded and the largest number of
+    cases that were being read, or were read but not yet yielded.
+    """
+    lock = threading.Lock()
+    started = set()
+    done = set()
+    peak = [0]
+
+    def read_case(case):
+        with lock:
+            started.add(case)
+            peak[0] = max(peak[0], len(started - done))
+        time.sleep(0.002 * (len(cases) - cases.index(case)))
+        return case.case_id
+
+    order = []
+    for case, case_id in read_case_files(
+        cases, read_case, ["Results/flow.csv"], depth=depth, max_bytes=max_bytes
+    ):
+        assert case.case_id == case_id
+        with lock:
+            done.add(case)
+        order.append(case)
+        time.sleep(0.01)
+
+    return order, peak[0]
+
+
+def test_order_and_byte_ceiling(cases):
+    assert case_sizes(cases, ["Results/flow.csv"]) == [FILE_SIZE] * len(cases)
+
+    # Up to two cases (2500 bytes) are read ahead, plus the one being waited on
+    order, peak = read_outstanding(cases, max_bytes=2.5 * FILE_SIZE)
+    assert order == cases
+    assert peak <= 3
+
+    # Without the ceiling the read ahead is only limited by the depth
+    order, peak = read_outstanding(cases, max_bytes=100 * FILE_SIZE)
+    assert order == cases
+    assert 3 < peak <= 5
+
+
+def test_large_files_are_read_one_at_a_time(cases):
+    order, peak = read_outstanding(cases, max_bytes=FILE_SIZE / 2)
+    assert order == cases
+    assert peak <= 2
+
+
+def test_errors_are_raised_in_order(cases):
+    def read_case(case):
+        if case.case_id == "p3":
+            raise RuntimeError("bad case")
+        return case.case_id
+
+    read = []
+    with pytest.raises(RuntimeError):
+        for case, case_id in read_case_files(cases, read_case, ["Results/flow.csv"]):
+            read.append(case_id)
+    assert read == ["p0", "p1", "p2"]
@@ -0,0 +1,41 @@
+import io
+import json
+
+from case_registry import find_cases
+from distributed_compile import map_cases
+from prefetch import case_sizes, read_case_files
+from progress import Progress
+
+
+def test_json_progress(study, monkeypatch):
+    "Each case is reported with the bytes of its files under SLURM"
+    monkeypatch.setenv("SLURM_JOB_ID", "123")
+    stream = io.StringIO()
+    cases = find_cases(2030)
+    file_names = ["Results/flow.csv"]
+    with Progress("flows", len(cases), stream=stream) as tracker:
+        for case, name in read_case_files(
+            cases, lambda case: case.folder.name, file_names, progress=tracker
+        ):
+            pass
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(lines) == len(cases) + 1
+    assert [line["done"] for line in lines[:-1]] == list(range(1, len(cases) + 1))
+    assert lines[-1]["final"] and lines[-1]["eta_s"] == 0
+    assert lines[-1]["bytes_read"] == sum(case_sizes(cases, file_names))
+    assert lines[-1]["slurm_job_id"] == "123"
+
+
+def test_process_pool_progress(study, tmp_path, monkeypatch, capsys):
+    "Cases summarized in other processes are counted as they finish"
+    monkeypatch.setenv("SLURM_JOB_ID", "123")
+    folders = [case.folder for case in find_cases(2030)]
+    paths = map_cases(folders, tmp_path, workers=2)
+
+    assert [p.stem for p in paths] == [f.name for f in folders]
+    lines = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    assert sorted(line["item"] for line in lines if "item" in line) == sorted(
+        f.name for f in folders
+    )
+    assert lines[-1]["done"] == len(folders)
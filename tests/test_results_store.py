@@ -0,0 +1,122 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from case_registry import find_cases
+from compile_results import build_results, results_carry_over
+from results_store import (
+    connect,
+    get_results,
+    load_carry_over,
+    query,
+    stored_fingerprints,
+    update_store,
+)
+from synthetic_study import YEARS
+
+
+def test_connection_is_closed(tmp_path):
+    "Changes are committed and the connection closed at the end of a with block"
+    db_path = tmp_path / "store.sqlite"
+    with connect(db_path) as con:
+        con.execute("CREATE TABLE t (x INTEGER)")
+        con.execute("INSERT INTO t VALUES (1)")
+    with pytest.raises(sqlite3.ProgrammingError):
+        con.execute("SELECT * FROM t")
+
+    assert query("SELECT x FROM t", db_path=db_path)["x"].tolist() == [1]
+
+
+def touch(path):
+    "Change the modification time of a file without changing its contents"
+    mtime = path.stat().st_mtime_ns + 10 ** 9
+    os.utime(path, ns=(mtime, mtime))
+
+
+def year_rows(db_path, table, year):
+    df = query(f"SELECT * FROM {table} WHERE Year = ?", (year,), db_path=db_path)
+
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def test_update_store(fresh_study):
+    "Only the year with changed case files and later years are compiled again"
+    db_path = fresh_study / "store.sqlite"
+    assert update_store(db_path) == [2030, 2045]
+    assert update_store(db_path) == []
+    with connect(db_path) as con:
+        fingerprints = stored_fingerprints(con)
+    rows = {year: year_rows(db_path, "costs", year) for year in YEARS}
+
+    case = find_cases(2045)[1]
+    touch(case.results_folder / "costs.csv")
+    assert update_store(db_path) == [2045]
+    with connect(db_path) as con:
+        new_fingerprints = stored_fingerprints(con)
+    assert new_fingerprints[2030] == fingerprints[2030]
+    changed = [
+        name
+        for name in fingerprints[2045]
+        if new_fingerprints[2045][name] != fingerprints[2045][name]
+    ]
+    assert changed == [case.description]
+    # Costs rebuilt with the carry over from the store are the same
+    for year in YEARS:
+        pd.testing.assert_frame_equal(year_rows(db_path, "costs", year), rows[year])
+
+    touch(find_cases(2030)[0].results_folder / "capacity.csv")
+    assert update_store(db_path) == [2030, 2045]
+
+
+def test_load_carry_over(fresh_study):
+    db_path = fresh_study / "store.sqlite"
+    update_store(db_path)
+    region_dict, total_dict = build_results(2030, None, None)
+    expected_spur, expected_tx = results_carry_over(region_dict, total_dict)
+
+    with connect(db_path) as con:
+        spur, tx = load_carry_over(con, 2030)
+    # Spur line costs are per resource, build_results sums them by case and region
+    spur = spur.groupby(["Case", "Region"]).sum()
+    expected_spur = expected_spur.reset_index().astype({"Case": str, "Region": str})
+    pd.testing.assert_frame_equal(
+        spur,
+        expected_spur.set_index(["Case", "Region"]).sort_index(),
+        check_dtype=False,
+        rtol=1e-6,
+    )
+    expected_tx = expected_tx["Cost_Trans_Capacity"]
+    assert tx["Cost_Trans_Capacity"].to_dict() == pytest.approx(
+        {str(case): value for case, value in expected_tx.items()}
+    )
+
+
+def test_get_results(fresh_study):
+    db_path = fresh_study / "store.sqlite"
+    update_store(db_path)
+    capacity = build_results(2030, None, None)[0]["capacity"]
+
+    df = get_results("capacity", year=2030, db_path=db_path)
+    assert df.index.names == ["Year", "Region", "Resource Name", "Category"]
+    df = df.droplevel("Year").reorder_levels(capacity.index.names)
+    pd.testing.assert_frame_equal(
+        df.loc[capacity.index, capacity.columns],
+        capacity,
+        check_dtype=False,
+        check_names=False,
+        check_index_type=False,
+        check_column_type=False,
+        rtol=1e-6,
+    )
+
+    one = get_results(
+        "capacity", year=2030, region="CA_S", case="No Policy", db_path=db_path
+    )
+    assert list(one.columns) == ["No Policy"]
+    assert set(one.index.get_level_values("Region")) == {"CA_S"}
+
+    empty = get_results("capacity", year=1999, db_path=db_path)
+    assert empty.empty
+    assert empty.index.names == ["Year", "Region", "Resource Name", "Category"]
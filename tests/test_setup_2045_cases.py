@@ -0,0 +1,36 @@
+import pandas as pd
+
+from case_registry import CaseRegistry
+from setup_2045_cases import transfer_2030_results
+
+
+def read_2045_inputs():
+    "Existing capacity and line limits of the 2045 cases"
+    dfs = {}
+    for case in CaseRegistry.from_results("2045"):
+        gen_data = pd.read_csv(case.inputs_folder / "Generators_data.csv")
+        network = pd.read_csv(case.inputs_folder / "Network.csv")
+        dfs[case.case_id] = pd.concat(
+            [
+                gen_data.set_index("Resource")[["Existing_Cap_MW", "Existing_Cap_MWh"]],
+                network.set_index("Transmission Path Name")[["Line_Max_Flow_MW"]],
+            ]
+        )
+
+    return pd.concat(dfs, names=["case_id", "Name"])
+
+
+def test_transfer_2030_results(fresh_study, golden):
+    def transfer():
+        transfer_2030_results()
+        return read_2045_inputs()
+
+    updated = golden("transfer_2030_results", transfer)
+
+    # Cases that were already updated aren't changed again
+    transfer_2030_results()
+    pd.testing.assert_frame_equal(read_2045_inputs(), updated)
+    assert all(
+        (case.folder / "inputs_updated.txt").exists()
+        for case in CaseRegistry.from_results("2045")
+    )
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from compile_results import build_results
+from shard_results import (
+    match_cases,
+    region_rows,
+    result_regions,
+    shard_results,
+    write_region_shards,
+)
+
+
+def test_region_rows():
+    "Paths are matched on their start and end regions, not substrings"
+    df = pd.DataFrame(
+        {"MW": [1, 2, 3]},
+        index=pd.Index(
+            ["CA_N to CA_S", "CA_S to WECC_AZ", "CA_N to CA_SX"], name="Path Name"
+        ),
+    )
+    assert region_rows(df, "CA_S")["MW"].tolist() == [1, 2]
+    assert region_rows(df, "CA_N")["MW"].tolist() == [1, 3]
+
+    unrelated = pd.DataFrame({"MW": [1]})
+    assert region_rows(unrelated, "CA_S") is unrelated
+
+
+def test_shard_results(study):
+    region_dict = {2030: build_results(2030, None, None)[0]}
+    assert result_regions(region_dict) == ["CA_N", "CA_S", "WECC_AZ"]
+
+    shard = shard_results(region_dict, "CA_S", cases=["No Policy"])[2030]
+    assert set(shard["capacity"].index.get_level_values("Region")) == {"CA_S"}
+    assert list(shard["capacity"].columns) == ["No Policy"]
+    assert set(shard["spur_line"]["Region"]) == {"CA_S"}
+    assert set(shard["spur_line"]["Case"]) == {"No Policy"}
+    assert shard["network"].index.get_level_values("Path Name").tolist() == [
+        "CA_N to CA_S",
+        "CA_S to WECC_AZ",
+    ]
+    assert shard["costs"].index.tolist() == [("No Policy", "CA_S")]
+
+    # Every capacity row is in exactly one region shard
+    shards = [shard_results(region_dict, r)[2030] for r in result_regions(region_dict)]
+    assert sum(len(s["capacity"]) for s in shards) == len(region_dict[2030]["capacity"])
+
+
+def test_write_case_group_shards(study, tmp_path):
+    region_dict = {2030: build_results(2030, None, None)[0]}
+    cases = list(region_dict[2030]["capacity"].columns)
+    assert match_cases(cases, "Emissions Cap*") == ["Emissions Cap w/ RPS"]
+
+    paths = write_region_shards(
+        region_dict,
+        regions=["CA_N", "WECC_AZ"],
+        case_groups={"cap": ["Emissions Cap*"], "other": ["No Policy", "Low*"]},
+        file_format="parquet",
+        folder=tmp_path,
+        workers=1,
+    )
+    assert [p.name for p in paths] == [
+        "CA_N_cap.parquet",
+        "CA_N_other.parquet",
+        "WECC_AZ_cap.parquet",
+        "WECC_AZ_other.parquet",
+    ]
+    df = pd.read_parquet(tmp_path / "WECC_AZ_other.parquet")
+    assert set(df["Case"]) == {"No Policy", "Low cost nuclear"}
+    assert set(df["Region"].dropna()) == {"WECC_AZ"}
+    paths = set(df["Path Name"].dropna())
+    assert paths == {"CA_S to WECC_AZ", "CA_N to WECC_AZ"}
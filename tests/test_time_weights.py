@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from case_registry import find_cases
+from time_weights import hour_weights, weighted_mean, weighted_sum
+
+
+def test_weights_from_load_data(fresh_study):
+    "Weights from Sub_Weights are the same as time_weights.csv"
+    case = find_cases(2045)[0]
+    expected = hour_weights(case)
+    (case.results_folder / "time_weights.csv").unlink()
+
+    np.testing.assert_allclose(hour_weights(case), expected)
+    assert hour_weights(case).sum() == pytest.approx(8760)
+
+
+def test_representative_period_weights(fresh_study):
+    "Each hour of a representative period has Sub_Weights / period length"
+    case = find_cases(2045)[0]
+    (case.results_folder / "time_weights.csv").unlink()
+    load_path = case.inputs_folder / "Load_data.csv"
+    load = pd.read_csv(load_path)
+    load["Rep_Periods"] = [2] + [np.nan] * (len(load) - 1)
+    load["Timesteps_per_Rep_Period"] = [12] + [np.nan] * (len(load) - 1)
+    load["Sub_Weights"] = [6000, 2760] + [np.nan] * (len(load) - 2)
+    load.to_csv(load_path, index=False)
+
+    weights = hour_weights(case)
+    np.testing.assert_allclose(weights, [500] * 12 + [230] * 12)
+    with pytest.raises(ValueError):
+        hour_weights(case, num_hours=48)
+
+
+def test_weighted_sum_and_mean():
+    values = pd.DataFrame({"a": [1.0, 2.0, np.nan], "b": [3.0, 4.0, 5.0]})
+    weights = np.array([2.0, 1.0, 1.0])
+
+    pd.testing.assert_series_equal(
+        weighted_sum(values, weights), pd.Series({"a": 4.0, "b": 15.0})
+    )
+    # Weights of missing values aren't included in the mean
+    np.testing.assert_allclose(weighted_mean(values.to_numpy(), weights), [4 / 3, 3.75])
+    pd.testing.assert_series_equal(
+        weighted_mean(values, weights), pd.Series({"a": 4 / 3, "b": 3.75})
+    )
+    np.testing.assert_allclose(weighted_mean(values["a"].to_numpy(), weights), 4 / 3)
+    assert np.isnan(weighted_mean(np.full((2, 1), np.nan), weights)).all()
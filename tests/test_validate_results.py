@@ -0,0 +1,55 @@
+import pandas as pd
+from typer.testing import CliRunner
+
+import compile_results
+from case_registry import find_cases
+from validate_results import validate_years
+
+
+def drop_last_line(path):
+    lines = path.read_text().splitlines(keepends=True)
+    path.write_text("".join(lines[:-1]))
+
+
+def test_valid_study(study):
+    assert validate_years().empty
+
+
+def test_missing_column(fresh_study):
+    case = find_cases(2030)[1]
+    capacity = pd.read_csv(case.results_folder / "capacity.csv")
+    capacity.drop(columns="EndCap").to_csv(
+        case.results_folder / "capacity.csv", index=False
+    )
+
+    problems = validate_years()
+    assert len(problems) == 1
+    problem = problems.iloc[0]
+    assert (problem["year"], problem["case"]) == (2030, case.folder.name)
+    assert problem["file"] == "Results/capacity.csv"
+    assert problem["level"] == "error"
+    assert "EndCap" in problem["message"]
+
+
+def test_mismatched_hours(fresh_study):
+    "Files of a case with different hours are errors, other cases are warnings"
+    case = find_cases(2045)[1]
+    drop_last_line(case.results_folder / "emissions.csv")
+    problems = validate_years()
+    assert problems["level"].tolist() == ["error"]
+    assert "number of hours" in problems["message"].iloc[0]
+
+    for file_name in ["Results/power.csv", "Results/time_weights.csv"]:
+        drop_last_line(case.folder / file_name)
+    drop_last_line(case.inputs_folder / "Load_data.csv")
+    problems = validate_years()
+    assert problems["level"].tolist() == ["warning"]
+    assert problems["case"].tolist() == [case.folder.name]
+    assert "23 hours" in problems["message"].iloc[0]
+
+    # Warnings are shown when compiling with --validate
+    result = CliRunner().invoke(
+        compile_results.app, ["--validate", "--no-figures", "--no-excel"]
+    )
+    assert "23 hours" in result.output
+    assert result.exit_code == 0, result.output
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+import zone_trade_attribute_costs
+from case_registry import find_cases
+from stage_hash import STAGE_SOURCES, source_files
+from zone_trade_attribute_costs import calc_all_costs, checkpoint_path
+
+
+def test_calc_all_costs(study, golden, tmp_path):
+    golden("calc_all_costs", calc_all_costs, checkpoint_dir=tmp_path)
+
+
+def test_resume_from_checkpoints(study, tmp_path, monkeypatch):
+    "A run that fails part way through resumes with the cases that weren't done"
+    expected = calc_all_costs(checkpoint_dir=tmp_path / "full", workers=1)
+
+    cases_2045 = list(find_cases(2045))
+    calc_case_costs = zone_trade_attribute_costs.calc_case_costs
+    calculated = []
+    fail_case = [cases_2045[0]]
+
+    def calc_or_fail(case, zones):
+        if case in fail_case:
+            raise RuntimeError("stopped")
+        calculated.append(case)
+        return calc_case_costs(case, zones)
+
+    monkeypatch.setattr(zone_trade_attribute_costs, "calc_case_costs", calc_or_fail)
+    with pytest.raises(RuntimeError):
+        calc_all_costs(checkpoint_dir=tmp_path, workers=1)
+    assert checkpoint_path(tmp_path, find_cases(2030)[0]).exists()
+    assert not checkpoint_path(tmp_path, cases_2045[0]).exists()
+
+    fail_case.clear()
+    calculated.clear()
+    resumed = calc_all_costs(checkpoint_dir=tmp_path, workers=1)
+    assert calculated == cases_2045
+    pd.testing.assert_frame_equal(resumed, expected)
+
+
+def test_checkpoint_key_sources():
+    "Checkpoints are out of date when any module used to calculate costs changes"
+    files = source_files(STAGE_SOURCES["trade-costs"])
+    for name in [
+        "zone_trade_attribute_costs.py",
+        "input_store.py",
+        "case_registry.py",
+        "prefetch.py",
+        "network_topology.py",
+        "time_weights.py",
+    ]:
+        assert name in files
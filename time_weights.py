@@ -0,0 +1,76 @@
+"""Number of hours represented by each modeled hour of a case.
+
+Cases with time domain reduction only model a few representative periods, and
+each hour stands for many hours of the year. Hourly values (flows, prices,
+load, emissions) need to be multiplied by these weights before they are summed,
+so that results are comparable with full 8760 hour runs.
+"""
+
+import numpy as np
+import pandas as pd
+
+from input_store import read_input_csv
+
+
+def hour_weights(case, num_hours=None):
+    """Weight (number of hours represented) of each modeled hour in a case.
+
+    Weights are the "Weight" column of Results/time_weights.csv. If the case
+    doesn't have that file they are calculated from Sub_Weights in
+    Inputs/Load_data.csv, which has the total hours represented by each period
+    (Timesteps_per_Rep_Period hours long). Files are read once for each unique
+    content (see `input_store.read_input_csv`). Returns a float array, with only
+    the first `num_hours` weights if `num_hours` is given.
+    """
+    path = case.results_folder / "time_weights.csv"
+    if path.exists():
+        weights = read_input_csv(path)["Weight"].to_numpy(dtype=float)
+    else:
+        load = read_input_csv(case.inputs_folder / "Load_data.csv")
+        sub_weights = load["Sub_Weights"].dropna().to_numpy(dtype=float)
+        if "Timesteps_per_Rep_Period" in load.columns:
+            period_hours = int(load["Timesteps_per_Rep_Period"].dropna().iloc[0])
+        else:
+            period_hours = len(load) // len(sub_weights)
+        weights = np.repeat(sub_weights / period_hours, period_hours)
+
+    if num_hours is not None:
+        if len(weights) < num_hours:
+            raise ValueError(
+                f"{case.folder.name} has {len(weights)} time weights but "
+                f"{num_hours} hours of results"
+            )
+        weights = weights[:num_hours]
+
+    return weights
+
+
+def weighted_sum(values, weights):
+    """Sum of hourly values multiplied by the weight of each hour.
+
+    `values` is an (hours x columns) array or dataframe. Missing values are
+    skipped. Returns an array (or a series indexed by the dataframe columns).
+    """
+    if isinstance(values, pd.DataFrame):
+        return pd.Series(
+            weighted_sum(values.to_numpy(dtype=float), weights), index=values.columns
+        )
+
+    return np.asarray(weights)[: len(values)] @ np.nan_to_num(values)
+
+
+def weighted_mean(values, weights):
+    """Mean of hourly values, weighted by the hours represented by each.
+
+    Missing values and their weights are skipped, and columns without any values
+    are NaN. Returns an array (or a series indexed by the dataframe columns).
+    """
+    if isinstance(values, pd.DataFrame):
+        return pd.Series(
+            weighted_mean(values.to_numpy(dtype=float), weights), index=values.columns
+        )
+
+    weights = np.asarray(weights)[: len(values)]
+    present = ~np.isnan(np.asarray(values, dtype=float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return weighted_sum(values, weights) / (weights @ present)
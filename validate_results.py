@@ -0,0 +1,260 @@
+"""Check that every case has the files and columns used to compile results.
+
+Only the header, row count, and first column (the row labels of files written
+with one column per resource or zone) of each file are read, so every case in a
+study can be checked in a few seconds before starting `compile_results`.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+import pandas as pd
+import typer
+
+from case_registry import find_cases
+from compile_results import find_years
+from investment_costs import SPUR_LINE_COLUMNS
+
+app = typer.Typer()
+
+VALIDATE_WORKERS = 8
+
+
+class FileSpec(NamedTuple):
+    path: str
+    columns: tuple = ()
+    # Labels in the first column of files written with one column per resource
+    # or zone (read with header=None, index_col=0)
+    rows: tuple = ()
+
+
+# Files and columns read by each compare_* function in compile_results
+REQUIRED_FILES = {
+    "compare_capacity": [
+        FileSpec(
+            "Results/capacity.csv",
+            columns=("Resource", "Zone", "StartCap", "RetCap", "NewCap", "EndCap"),
+        ),
+    ],
+    "compare_energy": [
+        FileSpec("Results/power.csv", rows=("Resource", "Zone", "Sum")),
+    ],
+    "compare_emissions": [
+        FileSpec("Results/emissions.csv", rows=("Zone", "Sum")),
+    ],
+    "compare_costs": [
+        FileSpec(
+            "Results/costs.csv",
+            rows=("Costs", "cFix", "cVar", "cNSE", "cStart"),
+        ),
+    ],
+    "compare_rps_ces_prices": [
+        FileSpec("Results/RPS_CES.csv", columns=("Zone",)),
+    ],
+    "compare_tx_build": [
+        FileSpec(
+            "Results/network_expansion.csv",
+            columns=("Line", "New_Trans_Capacity", "Cost_Trans_Capacity"),
+        ),
+        FileSpec(
+            "Inputs/Network.csv",
+            columns=("Network_zones", "Network_lines", "Transmission Path Name"),
+        ),
+    ],
+    "compare_spur_line_build": [
+        FileSpec("Inputs/Generators_data.csv", columns=tuple(SPUR_LINE_COLUMNS)),
+    ],
+    "compare_demand": [
+        FileSpec("Inputs/Load_data.csv", columns=("Sub_Weights", "Load_MW_z1")),
+        FileSpec("Results/time_weights.csv", columns=("Weight",)),
+    ],
+}
+# RPS_CES.csv is only written for cases with RPS or CES constraints. Time weights
+# are calculated from Load_data.csv if time_weights.csv is missing.
+OPTIONAL_FILES = ["Results/RPS_CES.csv", "Results/time_weights.csv"]
+
+
+class CsvInfo(NamedTuple):
+    columns: list
+    num_rows: int
+    row_labels: list
+
+
+class Problem(NamedTuple):
+    year: int
+    case: str
+    file: str
+    level: str
+    message: str
+
+
+def scan_csv(path, row_labels=False):
+    """Header, number of rows after the header, and (optionally) first column.
+
+    Lines are split on commas without parsing quotes, which is enough for the
+    labels in GenX outputs.
+    """
+    with open(path, newline="") as f:
+        header = f.readline().rstrip("\r\n").split(",")
+        labels = [header[0]] if row_labels else []
+        num_rows = 0
+        for line in f:
+            if not line.strip():
+                continue
+            num_rows += 1
+            if row_labels:
+                labels.append(line.split(",", 1)[0].rstrip("\r\n"))
+
+    return CsvInfo(header, num_rows, labels)
+
+
+def check_case(case):
+    """Problems with the files of a case.
+
+    Returns a list of (file, level, message) where level is "error" or "warning",
+    and a dictionary of counts (resources, hours, zones) used to compare cases.
+    """
+    problems = []
+    files = {}
+    for func, specs in REQUIRED_FILES.items():
+        for spec in specs:
+            path = case.folder / spec.path
+            if spec.path not in files:
+                if not path.exists():
+                    level = "warning" if spec.path in OPTIONAL_FILES else "error"
+                    problems.append((spec.path, level, f"missing (used by {func})"))
+                    files[spec.path] = None
+                    continue
+                try:
+                    files[spec.path] = scan_csv(path, row_labels=bool(spec.rows))
+                except (OSError, UnicodeDecodeError) as e:
+                    problems.append((spec.path, "error", f"can't be read: {e}"))
+                    files[spec.path] = None
+                    continue
+            info = files[spec.path]
+            if info is None:
+                continue
+            missing_cols = [c for c in spec.columns if c not in info.columns]
+            if missing_cols:
+                problems.append(
+                    (spec.path, "error", f"missing columns {missing_cols} ({func})")
+                )
+            missing_rows = [r for r in spec.rows if r not in info.row_labels]
+            if missing_rows:
+                problems.append(
+                    (spec.path, "error", f"missing rows {missing_rows} ({func})")
+                )
+
+    counts = case_counts(files)
+    problems.extend(check_counts(counts))
+
+    return problems, {k: v[0][1] for k, v in counts.items() if v}
+
+
+def case_counts(files):
+    """Number of resources, hours and zones implied by each file of a case.
+
+    Returns a dictionary of count name: list of (file, count).
+    """
+    counts = {"resources": [], "hours": [], "zones": []}
+
+    def add(name, file_name, func):
+        info = files.get(file_name)
+        if info is not None:
+            counts[name].append((file_name, func(info)))
+
+    # capacity.csv and power.csv have a Total row/column
+    add("resources", "Results/capacity.csv", lambda i: i.num_rows - 1)
+    add("resources", "Results/power.csv", lambda i: len(i.columns) - 2)
+    add("resources", "Inputs/Generators_data.csv", lambda i: i.num_rows)
+    # The rows before the hours are Resource, Zone, Sum (power.csv) and Zone, Sum
+    # (emissions.csv)
+    add("hours", "Results/power.csv", lambda i: i.num_rows - 2)
+    add("hours", "Results/emissions.csv", lambda i: i.num_rows - 1)
+    add("hours", "Results/time_weights.csv", lambda i: i.num_rows)
+    add("hours", "Inputs/Load_data.csv", lambda i: i.num_rows)
+    add("zones", "Results/emissions.csv", lambda i: len(i.columns) - 2)
+    add(
+        "zones",
+        "Inputs/Load_data.csv",
+        lambda i: len([c for c in i.columns if c.startswith("Load_MW_z")]),
+    )
+
+    return counts
+
+
+def check_counts(counts):
+    "Values are assigned by position, so counts must match across files"
+    problems = []
+    for name, file_counts in counts.items():
+        if len({count for _, count in file_counts}) > 1:
+            detail = ", ".join(f"{f}: {count}" for f, count in file_counts)
+            problems.append(("", "error", f"number of {name} doesn't match ({detail})"))
+
+    return problems
+
+
+def validate_year(year, workers=VALIDATE_WORKERS):
+    """Problems with the cases of a year, checked in `workers` threads.
+
+    Cases with a different number of resources, hours, or zones than the first
+    case are reported as warnings.
+    """
+    cases = find_cases(year)
+    if len(cases) == 0:
+        return [Problem(year, "", "", "error", "no cases with a Results folder")]
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        results = list(executor.map(check_case, cases))
+
+    problems = []
+    first_case, (_, first_counts) = cases[0], results[0]
+    for case, (case_problems, counts) in zip(cases, results):
+        problems.extend(Problem(year, case.folder.name, *p) for p in case_problems)
+        for name, count in counts.items():
+            if name in first_counts and count != first_counts[name]:
+                problems.append(
+                    Problem(
+                        year,
+                        case.folder.name,
+                        "",
+                        "warning",
+                        f"{count} {name}, {first_case.folder.name} has "
+                        f"{first_counts[name]}",
+                    )
+                )
+
+    return problems
+
+
+def validate_years(years=None, workers=VALIDATE_WORKERS):
+    "Dataframe of problems with the cases of every year"
+    years = find_years() if years is None else years
+    problems = [p for year in years for p in validate_year(year, workers)]
+
+    return pd.DataFrame(problems, columns=Problem._fields)
+
+
+def print_problems(problems):
+    if problems.empty:
+        print("No problems found")
+        return
+    for (year, case), case_problems in problems.groupby(["year", "case"], sort=False):
+        print(f"{year} {case}")
+        for p in case_problems.itertuples():
+            print(f"  {p.level}: {p.file + ' ' if p.file else ''}{p.message}")
+    num_errors = (problems["level"] == "error").sum()
+    print(f"{num_errors} errors, {len(problems) - num_errors} warnings")
+
+
+@app.command()
+def main(year: Optional[int] = None, workers: int = VALIDATE_WORKERS):
+    "Check the files of every case before compiling results"
+    problems = validate_years(None if year is None else [year], workers)
+    print_problems(problems)
+    if (problems["level"] == "error").any():
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -1,198 +1,330 @@
-"Calculate region-specific costs from imports/exports/RPS/CES"
+"""Calculate region-specific costs from imports/exports/RPS/CES.
 
+Costs of every zone are calculated one case at a time, and the costs of each
+case are saved to a checkpoint file in CHECKPOINT_DIR as soon as they are done.
+A run that stops part way through resumes from the checkpoints, and the final
+results are assembled from them.
+"""
+
+import hashlib
+import json
 import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-import yaml
-
-
-def find_results_folders(year):
-    cwd = Path.cwd()
-
-    results_folders = list((cwd / f"{year}").rglob("Results"))
-    results_folders.sort()
+import typer
 
-    return results_folders
+from case_registry import find_cases
+from input_store import read_input_csv
+from network_topology import case_topology, check_topologies
+from prefetch import case_sizes
+from progress import Progress
+from results_store import case_fingerprint
+from stage_hash import STAGE_SOURCES, TRADE_COSTS_FILE, source_hash
+from time_weights import hour_weights
 
+app = typer.Typer()
 
-def clean_case_name(name):
-    clean_name = " ".join(name.split("_")[2:]).replace("with", "w/").strip()
-
-    return clean_name
+CHECKPOINT_DIR = ".trade_costs"
+TRADE_COST_WORKERS = 4
 
 
 def find_years():
 
     years = [
-        int(f.name)
-        for f in os.scandir(Path.cwd())
-        if f.is_dir() and "__" not in f.name and "." not in f.name
+        int(f.name) for f in os.scandir(Path.cwd()) if f.is_dir() and f.name.isdigit()
     ]
 
     return years
 
 
-def find_region_lines():
-    "Returns a dictionary of zone number: list of "
-    network_file_path = list(Path.cwd().rglob("Network.csv"))[0]
+def find_region_lines(years=None):
+    """Returns a dictionary of zone: list of lines connected to the zone.
+
+    Zones are of the form "z<x>" where x is an integer. Network.csv files from
+    every case are checked and a warning is printed if cases have different
+    topologies. In that case the lines are from the topology used by the most
+    cases, and the import/export calculations use each case's own topology.
+    """
+    if years is None:
+        years = find_years()
+    cases = [case for year in years for case in find_cases(year)]
+    groups = check_topologies(cases)
+    topologies = {
+        case_topology(case).topology_key: case_topology(case) for case in cases
+    }
+    most_common = max(groups, key=lambda key: len(groups[key]))
+
+    return topologies[most_common].region_lines
+
 
-    network_df = pd.read_csv(network_file_path)
-    network_df = network_df.set_index("Network_lines")
+TRADE_FILES = ["Results/flow.csv", "Results/prices.csv", "Results/time_weights.csv"]
 
-    # Zones should be of form "z<x>" where x is an integer
-    zones = network_df["Network_zones"].dropna().to_list()
-    if "Region description" in network_df.columns:
-        zone_names = network_df["Region description"].dropna().to_list()
-    else:
-        zone_names = zones
-    zone_lines = {}
-    for zone, name in zip(zones, zone_names):
-        zone_lines[name] = network_df.loc[network_df[zone] != 0, :].index.to_list()
 
-    return zone_lines
+def read_flow_and_prices(case):
+    flow = pd.read_csv(case.results_folder / "flow.csv", index_col=0)
+    prices = pd.read_csv(case.results_folder / "prices.csv", index_col=0)
+    weights = hour_weights(case, len(prices))
 
+    return flow, prices, weights
 
-def calc_import_export_costs(year, zone, lines):
+
+def calc_import_export_costs(case, zone, flow, prices, weights, lines=None):
+    """Import costs and export revenues of a zone in a case.
+
+    If `lines` is None the lines connected to the zone are found from the case's
+    Network.csv. Hourly flow times price is weighted by the hours each modeled
+    hour represents (see `time_weights.hour_weights`), and every line is
+    calculated at once.
+    """
     zone_num = int(zone[1:])
-    results_folders = find_results_folders(year)
-    input_folders = [folder.parent / "Inputs" for folder in results_folders]
-    # col_order = [clean_case_name(folder.parent.stem) for folder in results_folders]
-
-    imports_dict = {}
-    exports_dict = {}
-    for i_folder, r_folder in zip(input_folders, results_folders):
-        case_name = clean_case_name(i_folder.parent.stem)
-        flow = pd.read_csv(r_folder / "flow.csv", index_col=0)
-        prices = pd.read_csv(r_folder / "prices.csv", index_col=0)
-        network = pd.read_csv(i_folder / "Network.csv")
-
-        network_direction = network.set_index("Network_lines")[zone]
-
-        imports = 0
-        exports = 0
-
-        # print(case_name)
-        for line in lines:
-            line_imports = flow.loc[
-                network_direction[line] * flow[f"{line}"] < 0, f"{line}"
-            ]
-            line_exports = flow.loc[
-                network_direction[line] * flow[f"{line}"] > 0, f"{line}"
-            ]
-
-            line_import_costs = (
-                -1
-                * network_direction[line]
-                * (line_imports * prices[f"{zone_num}"]).dropna().sum()
-            )
-            imports += line_import_costs
+    topology = case_topology(case)
 
-            line_export_revenues = (
-                -1
-                * network_direction[line]
-                * (line_exports * prices[f"{zone_num}"]).dropna().sum()
-            )
-            exports += line_export_revenues
+    case_lines = topology.zone_lines(zone) if lines is None else lines
+    direction = topology.direction(zone)[case_lines].to_numpy()
 
-        imports_dict[case_name] = imports
-        exports_dict[case_name] = exports
+    # Hourly flows (the Sum row isn't in prices.csv) and weighted prices
+    line_flow = (
+        flow.reindex(prices.index)[[f"{line}" for line in case_lines]]
+        .to_numpy(dtype=float)
+    )
+    weighted_price = prices[f"{zone_num}"].to_numpy(dtype=float) * weights
+    flow_value = np.nan_to_num(line_flow * weighted_price[:, None])
 
-    import_export_df = pd.DataFrame(
-        [imports_dict, exports_dict], index=["Import Costs", "Export Revenues"]
-    ).T
-    import_export_df["Net Trade Costs"] = import_export_df.sum(axis=1)
-    import_export_df = import_export_df.astype(int)
-    # import_export_df["Zone"] = year
+    # Flows into the zone have the opposite sign of the line direction
+    directed_flow = direction * line_flow
+    imports = -direction @ np.where(directed_flow < 0, flow_value, 0).sum(axis=0)
+    exports = -direction @ np.where(directed_flow > 0, flow_value, 0).sum(axis=0)
+
+    return imports, exports
+
+
+RPS_CES_FILES = [
+    "GenX_settings.yml",
+    "Results/RPS_CES.csv",
+    "Inputs/Generators_data.csv",
+    "Results/power.csv",
+]
 
-    return import_export_df
 
+def read_rps_ces_files(case):
+    import yaml
 
-def calc_rps_ces_costs(year, zone):
+    i_folder, r_folder = case.inputs_folder, case.results_folder
+    with open(case.folder / "GenX_settings.yml", "r") as f:
+        settings = yaml.safe_load(f)
+    rps_ces_prices = pd.read_csv(r_folder / "RPS_CES.csv", index_col=0)
+    generators = read_input_csv(i_folder / "Generators_data.csv")
+    energy = pd.read_csv(r_folder / "power.csv", index_col=0)
+
+    return settings, rps_ces_prices, generators, energy
+
+
+def calc_rps_ces_costs(case, zone, settings, rps_ces_prices, generators, energy):
+    "RPS and CES costs of a zone in a case"
     zone_num = int(zone[1:])
-    results_folders = find_results_folders(year)
-    input_folders = [folder.parent / "Inputs" for folder in results_folders]
-    # col_order = [clean_case_name(folder.parent.stem) for folder in results_folders]
-
-    rps_dict = {}
-    ces_dict = {}
-    for i_folder, r_folder in zip(input_folders, results_folders):
-        case_name = clean_case_name(i_folder.parent.stem)
-        # print(case_name, year)
-
-        genx_settings_path = i_folder.parent / "GenX_settings.yml"
-        with open(genx_settings_path, "r") as f:
-            settings = yaml.safe_load(f)
-        rps_adjustment = settings["RPS_Adjustment"]
-        ces_adjustment = settings["CES_Adjustment"]
-
-        rps_ces_prices = pd.read_csv(r_folder / "RPS_CES.csv", index_col=0)
-        rps_price = rps_ces_prices.loc[zone_num, "RPS_Price"]
-        ces_price = rps_ces_prices.loc[zone_num, "CES_Price"]
-
-        generators = pd.read_csv(i_folder / "Generators_data.csv")
-        resource_rps_value = generators.loc[generators["zone"] == zone_num, "RPS"]
-        resource_ces_value = generators.loc[generators["zone"] == zone_num, "CES"]
-
-        energy = pd.read_csv(r_folder / "Power.csv", index_col=0)
-
-        # Calculate the weighted generation for every resources
-        weighted_gen = energy.loc["Sum", :].reset_index(drop=True)
-
-        # Credits from in-region generation by qualifying resources
-        region_rps_credits = (weighted_gen * resource_rps_value).sum()
-        region_ces_credits = (weighted_gen * resource_ces_value).sum()
-
-        network = pd.read_csv(i_folder / "Network.csv", index_col=1)
-
-        # Calculate how many credits are needed in a region
-        qualifying_resources = generators.loc[
-            (generators["zone"] == zone_num)
-            & (generators["STOR"] == 0)
-            & (generators["DR"] == 0)
-            & (generators["HEAT"] == 0),
-            :,
-        ].index
-        qualifying_energy = weighted_gen.loc[qualifying_resources].sum()
-        region_rps_requirement = (
-            network.loc[zone, "RPS"] * qualifying_energy
-        ) - rps_adjustment
-        region_ces_requirement = (
-            network.loc[zone, "CES"] * qualifying_energy
-        ) - ces_adjustment
-
-        rps_credit_difference = region_rps_requirement - region_rps_credits
-        ces_credit_difference = region_ces_requirement - region_ces_credits
-
-        rps_cost = rps_credit_difference * rps_price
-        ces_cost = ces_credit_difference * ces_price
-
-        rps_dict[case_name] = rps_cost
-        ces_dict[case_name] = ces_cost
+
+    rps_adjustment = settings["RPS_Adjustment"]
+    ces_adjustment = settings["CES_Adjustment"]
+
+    rps_price = rps_ces_prices.loc[zone_num, "RPS_Price"]
+    ces_price = rps_ces_prices.loc[zone_num, "CES_Price"]
+
+    resource_rps_value = generators.loc[generators["zone"] == zone_num, "RPS"]
+    resource_ces_value = generators.loc[generators["zone"] == zone_num, "CES"]
+
+    # Calculate the weighted generation for every resources
+    weighted_gen = energy.loc["Sum", :].reset_index(drop=True)
+
+    # Credits from in-region generation by qualifying resources
+    region_rps_credits = (weighted_gen * resource_rps_value).sum()
+    region_ces_credits = (weighted_gen * resource_ces_value).sum()
+
+    network = case_topology(case).zone_data
+
+    # Calculate how many credits are needed in a region
+    qualifying_resources = generators.loc[
+        (generators["zone"] == zone_num)
+        & (generators["STOR"] == 0)
+        & (generators["DR"] == 0)
+        & (generators["HEAT"] == 0),
+        :,
+    ].index
+    qualifying_energy = weighted_gen.loc[qualifying_resources].sum()
+    region_rps_requirement = (
+        network.loc[zone, "RPS"] * qualifying_energy
+    ) - rps_adjustment
+    region_ces_requirement = (
+        network.loc[zone, "CES"] * qualifying_energy
+    ) - ces_adjustment
+
+    rps_credit_difference = region_rps_requirement - region_rps_credits
+    ces_credit_difference = region_ces_requirement - region_ces_credits
+
+    rps_cost = rps_credit_difference * rps_price
+    ces_cost = ces_credit_difference * ces_price
+
+    return rps_cost, ces_cost
+
+
+def calc_case_costs(case, zones):
+    """Trade and RPS/CES costs of every zone in a case.
+
+    The result files of the case are read once for all zones. Returns a
+    dataframe of integer costs indexed by Zone.
+    """
+    flow, prices, weights = read_flow_and_prices(case)
+    rps_ces_files = read_rps_ces_files(case)
+
+    import_export_df = pd.DataFrame(
+        {
+            zone: calc_import_export_costs(case, zone, flow, prices, weights)
+            for zone in zones
+        },
+        index=["Import Costs", "Export Revenues"],
+    ).T
+    import_export_df["Net Trade Costs"] = import_export_df.sum(axis=1)
+    import_export_df = import_export_df.astype(int)
 
     rps_ces_df = (
-        pd.DataFrame([rps_dict, ces_dict], index=["RPS Costs", "CES Costs"])
+        pd.DataFrame(
+            {zone: calc_rps_ces_costs(case, zone, *rps_ces_files) for zone in zones},
+            index=["RPS Costs", "CES Costs"],
+        )
         .T.fillna(0)
         .astype(int)
     )
-    # rps_ces_df["Zone"] = zone
 
-    return rps_ces_df
+    combined_df = pd.concat([import_export_df, rps_ces_df], axis=1)
+    combined_df["Total Extra Costs"] = combined_df[
+        ["Net Trade Costs", "RPS Costs", "CES Costs"]
+    ].sum(axis=1)
+    combined_df.index.name = "Zone"
+
+    return combined_df
+
+
+def checkpoint_path(checkpoint_dir, case):
+    return Path(checkpoint_dir) / str(case.year) / f"{case.folder.name}.pkl"
+
+
+def checkpoint_key(case, zones):
+    """Hash of the case files, the zones, and the code used to calculate costs.
+
+    A checkpoint is only used if its key matches, so cases with new results (or
+    runs after the calculation has changed) are calculated again.
+    """
+    key_hash = hashlib.sha1()
+    key_hash.update(case_fingerprint(case).encode())
+    key_hash.update(json.dumps(list(zones)).encode())
+    key_hash.update(source_hash(STAGE_SOURCES["trade-costs"]).encode())
+
+    return key_hash.hexdigest()
 
 
-def calc_all_costs():
-    years = find_years()
-    zone_dict = find_region_lines()
+def read_checkpoint(checkpoint_dir, case, key):
+    "Costs of a case saved by an earlier run, or None if they are out of date"
+    path = checkpoint_path(checkpoint_dir, case)
+    try:
+        with open(path, "rb") as f:
+            checkpoint = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    if checkpoint.get("key") != key:
+        return None
+
+    return checkpoint["costs"]
+
+
+def write_checkpoint(checkpoint_dir, case, key, costs):
+    """Save the costs of a case.
+
+    The checkpoint is written to a temporary file and then renamed so that a run
+    that is stopped never leaves a partial checkpoint.
+    """
+    path = checkpoint_path(checkpoint_dir, case)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(
+            {"folder": case.folder.name, "key": key, "costs": costs},
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    tmp_path.replace(path)
+
+
+def checkpoint_case_costs(case, zones, key, checkpoint_dir=CHECKPOINT_DIR):
+    "Calculate the costs of a case and save them to a checkpoint"
+    costs = calc_case_costs(case, zones)
+    write_checkpoint(checkpoint_dir, case, key, costs)
+
+    return costs
+
+
+def calc_all_costs(
+    years=None, checkpoint_dir=CHECKPOINT_DIR, workers=TRADE_COST_WORKERS, resume=True
+):
+    """Trade and RPS/CES costs of every zone and case, indexed by Year and Case.
+
+    Cases with an up to date checkpoint in `checkpoint_dir` aren't calculated
+    again unless `resume` is False. Other cases are calculated in `workers`
+    processes and saved as each one finishes.
+    """
+    years = find_years() if years is None else years
+    # Check that all cases have the same zones. Lines for each zone are found from
+    # each case's own network.
+    zones = list(find_region_lines(years))
+    year_cases = {year: find_cases(year) for year in years}
+
+    case_costs = {}
+    todo = []
+    for year in years:
+        for case in year_cases[year]:
+            key = checkpoint_key(case, zones)
+            costs = read_checkpoint(checkpoint_dir, case, key) if resume else None
+            if costs is None:
+                todo.append((case, key))
+            else:
+                case_costs[case] = costs
+
+    sizes = case_sizes([case for case, _ in todo], TRADE_FILES + RPS_CES_FILES)
+    with Progress("Zone trade costs", len(todo)) as tracker:
+        if case_costs:
+            tracker.write(
+                f"Resuming with {len(case_costs)} cases from {checkpoint_dir}"
+            )
+        if workers < 2:
+            for (case, key), size in zip(todo, sizes):
+                case_costs[case] = checkpoint_case_costs(
+                    case, zones, key, checkpoint_dir
+                )
+                tracker.update(bytes_read=size, item=case.folder.name)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(
+                        checkpoint_case_costs, case, zones, key, checkpoint_dir
+                    ): i
+                    for i, (case, key) in enumerate(todo)
+                }
+                for future in as_completed(futures):
+                    i = futures[future]
+                    case = todo[i][0]
+                    case_costs[case] = future.result()
+                    tracker.update(bytes_read=sizes[i], item=case.folder.name)
+
     results_list = []
     for year in years:
-        for zone, zone_lines in zone_dict.item():
-            import_export_df = calc_import_export_costs(year, zone, zone_lines)
-            rps_ces_df = calc_rps_ces_costs(year, zone)
-
-            combined_df = pd.concat([import_export_df, rps_ces_df], axis=1)
-            combined_df["Total Extra Costs"] = combined_df[
-                ["Net Trade Costs", "RPS Costs", "CES Costs"]
-            ].sum(axis=1)
+        cases = year_cases[year]
+        for zone in zones:
+            combined_df = pd.DataFrame(
+                [case_costs[case].loc[zone] for case in cases],
+                index=[case.description for case in cases],
+            )
             combined_df["Year"] = year
             combined_df["Zone"] = zone
 
@@ -205,11 +337,24 @@ def calc_all_costs():
     return final_costs
 
 
-def main():
-    final_costs = calc_all_costs()
+@app.command()
+def main(
+    workers: int = TRADE_COST_WORKERS,
+    checkpoint_dir: Path = Path(CHECKPOINT_DIR),
+    resume: bool = True,
+):
+    """Write the costs of every zone and case to "Zone specific costs.csv".
+
+    Costs of each case are saved in `checkpoint_dir` as they are calculated, so
+    running the script again after it stops only calculates the remaining cases.
+    Use --no-resume to calculate every case again.
+    """
+    final_costs = calc_all_costs(
+        checkpoint_dir=checkpoint_dir, workers=workers, resume=resume
+    )
 
-    final_costs.to_csv("Zone specific costs.csv")
+    final_costs.to_csv(TRADE_COSTS_FILE)
 
 
 if __name__ == "__main__":
-    main()
+    app()